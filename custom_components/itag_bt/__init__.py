@@ -0,0 +1,120 @@
+# custom_components/itag_bt/__init__.py
+from __future__ import annotations
+import asyncio
+import logging
+import time
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.core import HomeAssistant
+from homeassistant.helpers import config_validation as cv
+from homeassistant.helpers.typing import ConfigType
+
+DOMAIN = "itag_bt"
+PLATFORMS = ["binary_sensor", "event", "switch", "sensor"]
+
+CONF_KEEPALIVE_INTERVAL = "keepalive_interval"
+DEFAULT_KEEPALIVE_INTERVAL = 20  # сек
+# без постоянного GATT: присутствие/RSSI по рекламе, подключение по требованию
+CONF_ADVERT_ONLY = "advert_only"
+CONF_RSSI_DEADBAND = "rssi_deadband"
+DEFAULT_RSSI_DEADBAND = 2  # dBm
+CONF_BATTERY_MAX_AGE = "battery_max_age"
+DEFAULT_BATTERY_MAX_AGE = 24  # ч
+# дублировать события тега на шину HA (itag_bt_button_<MAC> и т.п.)
+CONF_BUS_EVENTS = "bus_events"
+CONF_MULTI_PRESS_WINDOW = "multi_press_window"
+DEFAULT_MULTI_PRESS_WINDOW = 400  # мс
+# порядок подключения после старта HA (меньше — раньше)
+CONF_STARTUP_ORDER = "startup_order"
+# присутствие: «ушёл» после стольких секунд без рекламы и соединения
+CONF_CONSIDER_AWAY = "consider_away"
+DEFAULT_CONSIDER_AWAY = 180  # сек
+# запись BLE-трафика тега в <config>/itag_bt_capture/ (capture.py)
+CONF_CAPTURE = "capture"
+
+_LOGGER = logging.getLogger(__name__)
+
+CONFIG_SCHEMA = cv.config_entry_only_config_schema(DOMAIN)
+
+async def async_setup(hass: HomeAssistant, config: ConfigType) -> bool:
+    from .services import async_setup_services
+
+    # сервисы домена (itag_bt.beep_group) — один раз, независимо от числа записей
+    async_setup_services(hass)
+    return True
+
+async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
+    started = time.monotonic()
+    # модули интеграции — лениво; BLE-стек (bleak) грузится только при первом connect()
+    from .runtime import ITagRuntimeData, async_get_shared, create_client
+
+    store = await async_get_shared(hass)
+    forwarded: set[str] = store.setdefault("forwarded_entries", set())
+
+    client = create_client(hass, entry, store)
+    entry.runtime_data = ITagRuntimeData(client, store)
+
+    # первое подключение — в фоне, через очередь прогрева; дальше — по рекламе
+    if not client.is_connected:
+        store["warmup"].async_add(client)
+    # постоянный мониторинг рекламы + автоконнект при появлении ADV
+    client.start_advert_watch(store["adverts"])
+    store["presence"].async_add(client)
+
+    if entry.entry_id not in forwarded:
+        await hass.config_entries.async_forward_entry_setups(entry, PLATFORMS)
+        forwarded.add(entry.entry_id)
+
+        def _on_unload() -> None:
+            store.get("forwarded_entries", set()).discard(entry.entry_id)
+        entry.async_on_unload(_on_unload)
+        entry.async_on_unload(entry.add_update_listener(_async_options_updated))
+
+    store["warmup"].setup_time += time.monotonic() - started
+    return True
+
+async def _async_options_updated(hass: HomeAssistant, entry: ConfigEntry) -> None:
+    """Интервалы и мёртвая зона RSSI применяются без перезагрузки записи; смена режима — с перезагрузкой."""
+    from .runtime import apply_options
+
+    data = getattr(entry, "runtime_data", None)
+    if data is None:
+        return
+    client = data.client
+    if client.advert_only != entry.options.get(CONF_ADVERT_ONLY, False):
+        # смена режима — проще перезагрузить запись
+        await hass.config_entries.async_reload(entry.entry_id)
+        return
+    apply_options(client, entry, data.shared)
+    if client.is_connected:
+        data.shared["keepalive"].async_add(client)
+
+async def async_unload_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
+    mac = entry.data["mac"].upper()
+    store = hass.data.get(DOMAIN, {})
+    clients = store.get("clients", {})
+    forwarded: set[str] = store.get("forwarded_entries", set())
+
+    ok = await hass.config_entries.async_unload_platforms(entry, PLATFORMS)
+
+    client = clients.pop(mac, None)
+    if client:
+        store["battery"].async_unregister(mac)
+        store["state"].async_unregister(mac)
+        store["signals"].async_forget(mac)
+        store["warmup"].async_remove(mac)
+        store["presence"].async_remove(mac)
+        client.stop_advert_watch()
+        await client.disconnect()
+
+    forwarded.discard(entry.entry_id)
+    if not clients:
+        # объекты домена уходят вместе с hass.data — их отложенные сохранения пишем сейчас
+        await asyncio.gather(
+            *(store[key].async_flush() for key in ("battery", "gatt", "state") if key in store)
+        )
+        for key in ("adverts", "keepalive", "broker", "battery", "warmup", "presence", "group_beep", "capture"):
+            shared = store.get(key)
+            if shared is not None:
+                shared.async_shutdown()
+        hass.data.pop(DOMAIN, None)
+    return ok
\ No newline at end of file
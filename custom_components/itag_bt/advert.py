@@ -0,0 +1,110 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+from typing import Callable, Dict, Optional
+
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.components import bluetooth
+from homeassistant.components.bluetooth import (
+    BluetoothCallbackMatcher,
+    BluetoothChange,
+    BluetoothScanningMode,
+    BluetoothServiceInfoBleak,
+)
+
+_LOGGER = logging.getLogger(__name__)
+
+AdvertTarget = Callable[[BluetoothServiceInfoBleak], None]
+
+# шаг общего обхода истории рекламы HA: ADV, у которых изменился только RSSI, колбэк не вызывают
+SWEEP_INTERVAL = 10.0
+
+
+class AdvertDispatcher:
+    """Общий для домена приёмник рекламы: ADV -> ITagClient через dict по MAC.
+
+    Регистрация в HA идёт с матчером по адресу, поэтому фильтрацию делает
+    индекс bluetooth-менеджера, а здесь остаётся один lookup на ADV. Матчер
+    принимает и неподключаемые сканеры (connectable=False), как и PresenceEngine.
+
+    Для данных, которые колбэк не обновляет (RSSI по каждому сканеру), тег может
+    передать sweep — его вызывает один общий таймер раз в SWEEP_INTERVAL.
+    """
+
+    def __init__(self, hass: HomeAssistant) -> None:
+        self.hass = hass
+        self._targets: Dict[str, AdvertTarget] = {}
+        self._unsubs: Dict[str, Callable[[], None]] = {}
+        self._sweeps: Dict[str, Callable[[], None]] = {}
+        self._sweep_timer: Optional[asyncio.TimerHandle] = None
+
+    @callback
+    def _async_on_advert(self, service_info: BluetoothServiceInfoBleak, _change: BluetoothChange) -> None:
+        target = self._targets.get(service_info.address.upper())
+        if target is not None:
+            target(service_info)
+
+    @callback
+    def async_attach(
+        self, mac: str, target: AdvertTarget, sweep: Callable[[], None] | None = None
+    ) -> Callable[[], None]:
+        """Подключить тег к потоку рекламы; возвращает функцию отписки."""
+        mac = mac.upper()
+        self._targets[mac] = target
+        if sweep is not None:
+            self._sweeps[mac] = sweep
+            if self._sweep_timer is None:
+                self._sweep_timer = self.hass.loop.call_later(SWEEP_INTERVAL, self._async_sweep)
+        else:
+            self._sweeps.pop(mac, None)
+        if mac not in self._unsubs:
+            self._unsubs[mac] = bluetooth.async_register_callback(
+                self.hass,
+                self._async_on_advert,
+                # и пассивные сканеры/прокси: RSSI, last_seen и присутствие — по любому ADV
+                BluetoothCallbackMatcher(address=mac, connectable=False),
+                BluetoothScanningMode.PASSIVE,
+            )
+        _LOGGER.debug("ADV dispatcher: attach %s (%d tags)", mac, len(self._targets))
+
+        @callback
+        def _detach() -> None:
+            self.async_detach(mac, target)
+
+        return _detach
+
+    @callback
+    def async_detach(self, mac: str, target: AdvertTarget | None = None) -> None:
+        mac = mac.upper()
+        if target is not None and self._targets.get(mac) is not target:
+            return
+        self._targets.pop(mac, None)
+        self._sweeps.pop(mac, None)
+        unsub = self._unsubs.pop(mac, None)
+        if unsub:
+            unsub()
+        _LOGGER.debug("ADV dispatcher: detach %s (%d tags)", mac, len(self._targets))
+
+    @callback
+    def async_shutdown(self) -> None:
+        for unsub in self._unsubs.values():
+            unsub()
+        self._unsubs.clear()
+        self._targets.clear()
+        self._sweeps.clear()
+        if self._sweep_timer is not None:
+            self._sweep_timer.cancel()
+            self._sweep_timer = None
+
+    @callback
+    def _async_sweep(self) -> None:
+        self._sweep_timer = None
+        if not self._sweeps:
+            return
+        for sweep in list(self._sweeps.values()):
+            sweep()
+        self._sweep_timer = self.hass.loop.call_later(SWEEP_INTERVAL, self._async_sweep)
+
+    def __len__(self) -> int:
+        return len(self._targets)
@@ -0,0 +1,134 @@
+from __future__ import annotations
+
+import logging
+import time
+from datetime import timedelta
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.helpers.event import async_track_time_interval
+from homeassistant.helpers.storage import Store
+
+_LOGGER = logging.getLogger(__name__)
+
+STORAGE_VERSION = 1
+STORAGE_KEY = "itag_bt.battery"
+SAVE_DELAY = 60  # сек, сохранения объединяются
+SWEEP_INTERVAL = timedelta(minutes=15)
+
+
+class BatteryManager:
+    """Кэш уровня батареи всех тегов: хранится в Store, читается одним фоновым проходом.
+
+    Значения берутся из уведомлений 2A19, при подключении (если устарели) и из
+    периодического прохода. Проход читает только уже подключённые теги, кроме
+    режима «только реклама», где подключение по требованию и есть способ чтения.
+    """
+
+    def __init__(self, hass: HomeAssistant) -> None:
+        self.hass = hass
+        self._store: Store = Store(hass, STORAGE_VERSION, STORAGE_KEY)
+        self._data: Dict[str, List[float]] = {}
+        self._clients: Dict[str, Any] = {}
+        self._listeners: Dict[str, List[Callable[[], None]]] = {}
+        self._unsub_sweep: Optional[Callable[[], None]] = None
+        self._sweeping = False
+        self._pending = False
+
+    async def async_load(self) -> None:
+        data = await self._store.async_load()
+        if isinstance(data, dict):
+            self._data = {mac: list(v) for mac, v in data.items()}
+        self._unsub_sweep = async_track_time_interval(self.hass, self._async_sweep, SWEEP_INTERVAL)
+
+    @callback
+    def async_shutdown(self) -> None:
+        if self._unsub_sweep is not None:
+            self._unsub_sweep()
+            self._unsub_sweep = None
+        self._clients.clear()
+        self._listeners.clear()
+
+    # -------- теги / подписчики --------
+    @callback
+    def async_register(self, client: Any) -> None:
+        self._clients[client.mac] = client
+
+    @callback
+    def async_unregister(self, mac: str) -> None:
+        self._clients.pop(mac, None)
+
+    @callback
+    def async_subscribe(self, mac: str, listener: Callable[[], None]) -> Callable[[], None]:
+        listeners = self._listeners.setdefault(mac, [])
+        listeners.append(listener)
+
+        @callback
+        def _unsub() -> None:
+            if listener in listeners:
+                listeners.remove(listener)
+
+        return _unsub
+
+    # -------- значения --------
+    def get(self, mac: str) -> Tuple[Optional[int], Optional[float]]:
+        """(уровень, unix time чтения)."""
+        rec = self._data.get(mac)
+        if rec is None:
+            return None, None
+        return int(rec[0]), rec[1]
+
+    def is_stale(self, mac: str, max_age: float) -> bool:
+        rec = self._data.get(mac)
+        return rec is None or time.time() - rec[1] >= max_age
+
+    @callback
+    def async_set(self, mac: str, level: int) -> None:
+        rec = self._data.get(mac)
+        changed = rec is None or int(rec[0]) != level
+        self._data[mac] = [level, time.time()]
+        self._pending = True
+        self._store.async_delay_save(self._data_to_save, SAVE_DELAY)
+        if changed:
+            _LOGGER.debug("ITag[%s] battery -> %s", mac, level)
+            for listener in self._listeners.get(mac, ()):
+                listener()
+
+    def _data_to_save(self) -> Dict[str, List[float]]:
+        self._pending = False
+        return self._data
+
+    async def async_flush(self) -> None:
+        """Записать отложенное сохранение сразу (выгрузка последней записи)."""
+        if self._pending:
+            await self._store.async_save(self._data_to_save())
+
+    # -------- чтение --------
+    @callback
+    def async_connected(self, client: Any) -> None:
+        """Соединение уже есть — прочитать, если значение устарело."""
+        if self.is_stale(client.mac, client.battery_max_age):
+            self.hass.async_create_background_task(
+                self._async_read(client), f"itag_bt battery {client.mac}"
+            )
+
+    async def _async_read(self, client: Any) -> None:
+        try:
+            # read_battery сам кладёт значение в кэш
+            await client.read_battery()
+        except Exception as e:
+            _LOGGER.debug("ITag[%s] battery read failed: %s", client.mac, e)
+
+    async def _async_sweep(self, _now=None) -> None:
+        """Один низкоприоритетный проход по всем тегам, по очереди."""
+        if self._sweeping:
+            return
+        self._sweeping = True
+        try:
+            for mac, client in list(self._clients.items()):
+                if not self.is_stale(mac, client.battery_max_age):
+                    continue
+                if client.is_connected or (client.advert_only and client.available):
+                    await self._async_read(client)
+        finally:
+            self._sweeping = False
@@ -0,0 +1,117 @@
+from __future__ import annotations
+from typing import TYPE_CHECKING
+from homeassistant.components.binary_sensor import BinarySensorDeviceClass, BinarySensorEntity
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.helpers.entity import DeviceInfo
+from . import DOMAIN
+from .signals import SIGNAL_BTN, SIGNAL_CONN, SIGNAL_DISC, SIGNAL_PRESENCE
+
+if TYPE_CHECKING:
+    from .coordinator import ITagClient
+
+async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry, async_add_entities):
+    mac = entry.data["mac"].upper()
+    client = entry.runtime_data.client
+    async_add_entities([ITagButton(hass, mac, client), ITagPresence(mac, client)])
+
+class ITagButton(BinarySensorEntity):
+    _attr_should_poll = False
+    _attr_translation_key = "itag_button"
+
+    def __init__(self, hass: HomeAssistant, mac: str, client: ITagClient):
+        self.hass = hass
+        self._mac = mac
+        self._client = client
+        self._attr_name = f"iTag Button {mac}"
+        self._attr_unique_id = f"itag_btn_{mac.replace(':','_')}_v2"
+        self._attr_is_on = False
+        self._attr_available = False
+        self._unsub_btn = None
+        self._unsub_conn = None
+        self._unsub_disc = None
+        self._off_timer = None
+
+    async def async_added_to_hass(self):
+        signals = self._client.signals
+        self._unsub_btn = signals.async_subscribe(self._mac, SIGNAL_BTN, self._on_press)
+        self._unsub_conn = signals.async_subscribe(self._mac, SIGNAL_CONN, self._on_connected)
+        self._unsub_disc = signals.async_subscribe(self._mac, SIGNAL_DISC, self._on_disconnected)
+        self._client.button_entity_id = self.entity_id
+        # подключение — в фоне (очередь прогрева); до него сущность недоступна
+        self._attr_available = self._client.is_connected
+
+    async def async_will_remove_from_hass(self):
+        for u in (self._unsub_btn, self._unsub_conn, self._unsub_disc):
+            if u:
+                u()
+        if self._off_timer is not None:
+            self._off_timer.cancel()
+            self._off_timer = None
+
+    @callback
+    def _on_connected(self):
+        self._attr_available = True
+        self.async_write_ha_state()
+
+    @callback
+    def _on_disconnected(self):
+        self._attr_available = False
+        self.async_write_ha_state()
+
+    @callback
+    def _on_press(self):
+        # серия нажатий продлевает импульс, а не плодит таймеры
+        if self._off_timer is not None:
+            self._off_timer.cancel()
+        else:
+            self._attr_is_on = True
+            self.async_write_ha_state()
+        self._off_timer = self.hass.loop.call_later(0.2, self._auto_off)
+
+    @callback
+    def _auto_off(self):
+        self._off_timer = None
+        self._attr_is_on = False
+        self.async_write_ha_state()
+
+    @property
+    def device_info(self) -> DeviceInfo:
+        return DeviceInfo(identifiers={(DOMAIN, self._mac)}, name=f"iTag {self._mac}")
+
+class ITagPresence(BinarySensorEntity):
+    """Дома/ушёл из PresenceEngine: «ушёл» — consider_away без рекламы и соединения."""
+
+    _attr_should_poll = False
+    _attr_device_class = BinarySensorDeviceClass.PRESENCE
+
+    def __init__(self, mac: str, client: ITagClient):
+        self._mac = mac
+        self._client = client
+        self._attr_name = f"iTag Presence {mac}"
+        self._attr_unique_id = f"itag_presence_{mac.replace(':','_')}_v2"
+
+    async def async_added_to_hass(self):
+        self.async_on_remove(
+            self._client.signals.async_subscribe(self._mac, SIGNAL_PRESENCE, self._on_presence)
+        )
+
+    @property
+    def is_on(self) -> bool | None:
+        # None — ещё не решено (после старта ждём рекламу или consider_away)
+        return self._client.presence_home
+
+    @property
+    def extra_state_attributes(self):
+        return {
+            "last_seen": self._client.last_seen_timestamp,
+            "consider_away": self._client.consider_away,
+        }
+
+    @callback
+    def _on_presence(self, _home: bool):
+        self.async_write_ha_state()
+
+    @property
+    def device_info(self) -> DeviceInfo:
+        return DeviceInfo(identifiers={(DOMAIN, self._mac)}, name=f"iTag {self._mac}")
@@ -0,0 +1,345 @@
+from __future__ import annotations
+
+import asyncio
+import heapq
+import itertools
+import logging
+import random
+import time
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from homeassistant.core import HomeAssistant, callback
+
+_LOGGER = logging.getLogger(__name__)
+
+# если адаптер/прокси не сообщает число слотов
+DEFAULT_SLOTS_PER_SOURCE = 3
+# экспоненциальная задержка между неудачными попытками (сек)
+BACKOFF_BASE = 3.0
+BACKOFF_MAX = 300.0
+# после стольких неудач подряд тег «паркуется» и не переподключается PARK_DURATION
+PARK_AFTER = 8
+PARK_DURATION = 1800.0
+# одновременных попыток подключения на все теги
+MAX_CONNECTING = 2
+# сколько async_connect() ждёт слота в очереди; идущую попытку ограничивает CONNECT_TIMEOUT клиента
+QUEUE_WAIT_MAX = 20.0
+# переподключение без нового колбэка рекламы (HA не зовёт его, если изменился только RSSI):
+# ждущие теги сверяются с историей рекламы HA (client.last_heard) с этим шагом
+RETRY_RECHECK = 5.0
+# тег считается «в эфире», если слышен не раньше стольких секунд назад
+RETRY_HEARD_WITHIN = 10.0
+
+# Состояния переподключения тега
+STATE_CONNECTED = "connected"
+STATE_WAITING = "waiting_for_advert"
+STATE_BACKING_OFF = "backing_off"
+STATE_PARKED = "parked"
+
+
+
+def _reported_allocation(source: str) -> Optional[Any]:
+    """Слоты адаптера/прокси по данным habluetooth (free учитывает и чужие соединения)."""
+    try:
+        from habluetooth import get_manager
+
+        allocations = get_manager().async_current_allocations(source)
+    except Exception:
+        return None
+    if not allocations or not allocations[0].slots:
+        return None
+    return allocations[0]
+
+
+class ConnectionBroker:
+    """Очередь connect() для всех тегов с учётом слотов каждого адаптера/прокси.
+
+    Приоритет: срочные запросы (писк, чтение) -> теги с автоматизациями на кнопке
+    -> недавно виденные -> с лучшим RSSI. Неудачи дают экспоненциальную задержку с джиттером.
+
+    Переподключение: после дисконнекта тег ждёт свежую рекламу (waiting_for_advert),
+    после неудачи — backoff (backing_off), после PARK_AFTER неудач подряд — parked.
+    Срочные запросы пользователя проходят в любом состоянии.
+
+    Ждущие и отложенные теги лежат в куче дедлайнов с одним таймером: по дедлайну
+    (конец backoff или шаг RETRY_RECHECK) тег снова ставится в очередь, если HA
+    недавно слышал его рекламу, — колбэк рекламы для этого не нужен.
+    """
+
+    def __init__(self, hass: HomeAssistant) -> None:
+        self.hass = hass
+        self._counter = itertools.count()
+        self._heap: List[Tuple[tuple, int, str, Any, float]] = []
+        self._queued: Set[str] = set()
+        self._pending: Dict[str, asyncio.Future] = {}
+        self._held: Dict[str, str] = {}            # mac -> source (занятый слот)
+        self._by_source: Dict[str, int] = {}
+        self._failures: Dict[str, int] = {}
+        self._not_before: Dict[str, float] = {}
+        self._state: Dict[str, str] = {}
+        self._connecting: Set[str] = set()
+        # идущие попытки: async_forget (выгрузка/перезагрузка записи) их отменяет
+        self._tasks: Dict[str, asyncio.Task] = {}
+        self._clients: Dict[str, Any] = {}
+        # перепроверки переподключения: (дедлайн, seq, mac), устаревший seq пропускается
+        self._retry_heap: List[Tuple[float, int, str]] = []
+        self._retry_seq: Dict[str, int] = {}
+        self._retry_timer: Optional[asyncio.TimerHandle] = None
+        self._retry_at = float("inf")
+        # диагностика
+        self.granted = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+        self.expired = 0
+        self.retries = 0
+
+    # -------- запросы --------
+    @callback
+    def async_request(self, client: Any, urgent: bool = False) -> Optional[asyncio.Future]:
+        """Поставить connect() тега в очередь; None — если не нужно или рано (backoff)."""
+        mac = client.mac
+        fut = self._pending.get(mac)
+        if fut is not None:
+            if urgent and mac in self._queued:
+                # поднять приоритет: старая запись в куче будет пропущена
+                self._push(client, True)
+                self._pump()
+            return fut
+        if client.is_connected:
+            return None
+        if not urgent and time.monotonic() < self._not_before.get(mac, 0.0):
+            return None
+        fut = self.hass.loop.create_future()
+        self._pending[mac] = fut
+        self._push(client, urgent)
+        self._pump()
+        return fut
+
+    async def async_connect(self, client: Any, urgent: bool = True) -> bool:
+        """Дождаться своей очереди и попытки подключения.
+
+        Если за QUEUE_WAIT_MAX слот так и не освободился, запрос снимается с очереди
+        и возвращается False — писк/чтение не висят, пока заняты все адаптеры.
+        """
+        fut = self.async_request(client, urgent)
+        if fut is None:
+            return client.is_connected
+        try:
+            await asyncio.wait_for(asyncio.shield(fut), QUEUE_WAIT_MAX)
+        except asyncio.TimeoutError:
+            if client.mac in self._connecting:
+                # слот уже выдан, попытка идёт — её ограничивает CONNECT_TIMEOUT
+                await asyncio.shield(fut)
+            else:
+                self._expire(client.mac)
+        return client.is_connected
+
+    def _expire(self, mac: str) -> None:
+        # запись в куче остаётся, но без mac в _queued будет пропущена
+        self._queued.discard(mac)
+        self.expired += 1
+        _LOGGER.debug("ITag[%s] no free connection slot in %.0fs, request dropped", mac, QUEUE_WAIT_MAX)
+        fut = self._pending.pop(mac, None)
+        if fut is not None and not fut.done():
+            fut.set_result(None)
+
+    @callback
+    def async_release(self, mac: str) -> None:
+        """Слот свободен (дисконнект/выгрузка); следующая попытка — по свежей рекламе."""
+        if self._state.get(mac) == STATE_CONNECTED:
+            self._state[mac] = STATE_WAITING
+            self._schedule_retry(mac, time.monotonic() + RETRY_RECHECK)
+        source = self._held.pop(mac, None)
+        if source is not None:
+            self._by_source[source] -= 1
+            self._pump()
+
+    @callback
+    def async_forget(self, mac: str) -> None:
+        task = self._tasks.pop(mac, None)
+        if task is not None:
+            # клиент сам закроет уже установленное соединение (см. _async_connect_now)
+            task.cancel()
+        fut = self._pending.pop(mac, None)
+        if fut is not None and not fut.done():
+            fut.set_result(None)
+        self._queued.discard(mac)
+        self._failures.pop(mac, None)
+        self._not_before.pop(mac, None)
+        self._state.pop(mac, None)
+        self._clients.pop(mac, None)
+        self._retry_seq.pop(mac, None)
+        self.async_release(mac)
+
+    @callback
+    def async_shutdown(self) -> None:
+        if self._retry_timer is not None:
+            self._retry_timer.cancel()
+        self._retry_timer = None
+        self._retry_at = float("inf")
+        self._retry_heap.clear()
+        self._retry_seq.clear()
+        self._clients.clear()
+        for task in self._tasks.values():
+            task.cancel()
+        self._tasks.clear()
+
+    def state(self, mac: str) -> str:
+        return self._state.get(mac, STATE_WAITING)
+
+    # -------- очередь --------
+    def _priority(self, client: Any, urgent: bool) -> tuple:
+        now = time.monotonic()
+        heard = client.last_heard
+        seen_ago = int(now - heard) if heard else 1 << 20
+        rssi = client.last_rssi if client.last_rssi is not None else -127
+        return (not urgent, not self._has_automation(client), seen_ago, -rssi)
+
+    def _has_automation(self, client: Any) -> bool:
+        entity_id = client.button_entity_id
+        if not entity_id:
+            return False
+        try:
+            from homeassistant.components.automation import automations_with_entity
+
+            return bool(automations_with_entity(self.hass, entity_id))
+        except Exception:
+            return False
+
+    def _push(self, client: Any, urgent: bool) -> None:
+        self._queued.add(client.mac)
+        self._clients[client.mac] = client
+        heapq.heappush(
+            self._heap,
+            (self._priority(client, urgent), next(self._counter), client.mac, client, time.monotonic()),
+        )
+
+    def _has_capacity(self, source: str) -> bool:
+        allocation = _reported_allocation(source)
+        if allocation is None:
+            return self._by_source.get(source, 0) < DEFAULT_SLOTS_PER_SOURCE
+        # выданные брокером слоты, которых habluetooth ещё не видит (подключение идёт)
+        allocated = set(allocation.allocated)
+        granting = sum(1 for mac, held in self._held.items() if held == source and mac not in allocated)
+        return allocation.free - granting > 0
+
+    def _pump(self) -> None:
+        blocked = []
+        while self._heap and len(self._connecting) < MAX_CONNECTING:
+            item = heapq.heappop(self._heap)
+            _, _, mac, client, enqueued = item
+            if mac not in self._queued:
+                continue
+            # лучший по RSSI адаптер/прокси, у которого есть свободный слот
+            source = client.select_source(self._has_capacity)
+            if source is None:
+                blocked.append(item)
+                continue
+            self._queued.discard(mac)
+            self._connecting.add(mac)
+            self._held[mac] = source
+            self._by_source[source] = self._by_source.get(source, 0) + 1
+            wait = time.monotonic() - enqueued
+            self.granted += 1
+            self.wait_total += wait
+            self.wait_max = max(self.wait_max, wait)
+            self._tasks[mac] = self.hass.async_create_background_task(
+                self._async_run(mac, client), f"itag_bt connect {mac}"
+            )
+        for item in blocked:
+            heapq.heappush(self._heap, item)
+
+    async def _async_run(self, mac: str, client: Any) -> None:
+        try:
+            await client._async_connect_now()
+        finally:
+            self._connecting.discard(mac)
+            # тег, забытый во время попытки (async_forget), не получает ни состояния, ни backoff
+            if self._tasks.get(mac) is asyncio.current_task():
+                del self._tasks[mac]
+                self._async_record_result(mac, client)
+            self._pump()
+
+    def _async_record_result(self, mac: str, client: Any) -> None:
+        if client.is_connected:
+            self._failures.pop(mac, None)
+            self._not_before.pop(mac, None)
+            self._retry_seq.pop(mac, None)
+            self._state[mac] = STATE_CONNECTED
+        else:
+            failures = self._failures.get(mac, 0) + 1
+            self._failures[mac] = failures
+            if failures >= PARK_AFTER:
+                self._state[mac] = STATE_PARKED
+                self._not_before[mac] = time.monotonic() + PARK_DURATION
+                _LOGGER.debug("ITag[%s] parked after %d failed connects", mac, failures)
+            else:
+                self._state[mac] = STATE_BACKING_OFF
+                delay = min(BACKOFF_MAX, BACKOFF_BASE * (2 ** (failures - 1)))
+                self._not_before[mac] = time.monotonic() + random.uniform(delay / 2, delay)
+            self._schedule_retry(mac, self._not_before[mac])
+            self.async_release(mac)
+        fut = self._pending.pop(mac, None)
+        if fut is not None and not fut.done():
+            fut.set_result(None)
+
+    # -------- переподключение по истории рекламы --------
+    def _schedule_retry(self, mac: str, at: float) -> None:
+        seq = next(self._counter)
+        self._retry_seq[mac] = seq
+        heapq.heappush(self._retry_heap, (at, seq, mac))
+        self._arm_retry()
+
+    def _arm_retry(self) -> None:
+        if not self._retry_heap:
+            return
+        at = self._retry_heap[0][0]
+        if self._retry_timer is not None:
+            if at >= self._retry_at:
+                return
+            self._retry_timer.cancel()
+        self._retry_at = at
+        self._retry_timer = self.hass.loop.call_later(max(0.0, at - time.monotonic()), self._async_retry)
+
+    @callback
+    def _async_retry(self) -> None:
+        self._retry_timer = None
+        self._retry_at = float("inf")
+        now = time.monotonic()
+        heap = self._retry_heap
+        while heap and heap[0][0] <= now:
+            _, seq, mac = heapq.heappop(heap)
+            if self._retry_seq.get(mac) != seq:
+                continue
+            del self._retry_seq[mac]
+            client = self._clients.get(mac)
+            if client is None or client.is_connected or mac in self._pending or not client.auto_reconnect:
+                # подключён, уже в очереди (исход попытки перепланирует) или переподключать не нужно
+                continue
+            not_before = self._not_before.get(mac, 0.0)
+            if now < not_before:
+                self._schedule_retry(mac, not_before)
+                continue
+            # прогрев после старта ещё не дошёл до тега — он подключит сам
+            if not client.warmup_pending and now - client.last_heard < RETRY_HEARD_WITHIN:
+                if self.async_request(client) is not None:
+                    self.retries += 1
+                    _LOGGER.debug("ITag[%s] heard recently, reconnect queued", mac)
+                    continue
+            self._schedule_retry(mac, now + RETRY_RECHECK)
+        self._arm_retry()
+
+    @property
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "queue_depth": len(self._queued),
+            "in_flight": len(self._connecting),
+            "states": {st: sum(1 for v in self._state.values() if v == st) for st in
+                       (STATE_CONNECTED, STATE_WAITING, STATE_BACKING_OFF, STATE_PARKED)},
+            "connections": dict(self._by_source),
+            "granted": self.granted,
+            "wait_avg": self.wait_total / self.granted if self.granted else 0.0,
+            "wait_max": self.wait_max,
+            "expired": self.expired,
+            "retries": self.retries,
+        }
@@ -0,0 +1,350 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+import os
+import struct
+import time
+from types import SimpleNamespace
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from homeassistant.core import HomeAssistant, callback
+
+_LOGGER = logging.getLogger(__name__)
+
+CAPTURE_DIR = "itag_bt_capture"
+CAPTURE_FILE = "capture.bin"
+CAPTURE_MAX_BYTES = 4 * 1024 * 1024  # размер файла до ротации
+CAPTURE_FILES = 4                    # capture.bin + capture.bin.1..3
+FLUSH_INTERVAL = 5.0                 # сек: буфер пишется на диск пачкой
+FLUSH_BYTES = 64 * 1024              # ...или раньше, если набралось столько
+
+MAGIC = b"ITAGCAP1"
+
+# Типы записей. Заголовок: тип (u8), unix time (f64), MAC (6 байт), затем тело
+REC_SOURCE = 0      # u16 id, u8 длина, имя сканера — словарь источников
+REC_ADVERT = 1      # i8 rssi, u16 id источника
+REC_NOTIFY = 2      # u8 длина, данные FFE1
+REC_WRITE = 3       # u8 характеристика (0 — 2A06, 1 — FFE2), u8 ok, u8 значение, f32 задержка
+REC_READ = 4        # u8 ok, u8 значение (батарея)
+REC_CONNECT = 5     # u16 id источника (0xFFFF — прямой BleakClient), f32 establish
+REC_DISCONNECT = 6  # без тела
+REC_NAMES = {
+    REC_SOURCE: "source",
+    REC_ADVERT: "advert",
+    REC_NOTIFY: "notify",
+    REC_WRITE: "write",
+    REC_READ: "read",
+    REC_CONNECT: "connect",
+    REC_DISCONNECT: "disconnect",
+}
+
+_HEADER = struct.Struct("<Bd6s")
+_SOURCE = struct.Struct("<HB")
+_ADVERT = struct.Struct("<bH")
+_WRITE = struct.Struct("<BBBf")
+_READ = struct.Struct("<BB")
+_CONNECT = struct.Struct("<Hf")
+_LEN = struct.Struct("<B")
+
+DIRECT_SOURCE = 0xFFFF
+WRITE_ALERT = 0
+WRITE_LINK_LOSS = 1
+
+
+def _mac_bytes(mac: str) -> bytes:
+    return bytes.fromhex(mac.replace(":", ""))
+
+
+class TrafficCapture:
+    """Запись BLE-трафика тегов (включается опцией записи) в компактный бинарный файл.
+
+    Записи копятся в bytearray и пишутся на диск в executor раз в FLUSH_INTERVAL;
+    при CAPTURE_MAX_BYTES файл ротируется, хранится не более CAPTURE_FILES файлов.
+    Имена сканеров пишутся один раз (REC_SOURCE), дальше — двухбайтовый id.
+    """
+
+    def __init__(self, hass: HomeAssistant, path: Optional[str] = None) -> None:
+        self.hass = hass
+        self.path = path or hass.config.path(CAPTURE_DIR, CAPTURE_FILE)
+        self._buf = bytearray()
+        self._sources: Dict[str, int] = {}
+        self._macs: Dict[str, bytes] = {}
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._flushing: Optional[asyncio.Future] = None
+        # диагностика
+        self.records = 0
+        self.bytes_written = 0
+        self.rotations = 0
+
+    # -------- запись событий (в цикле событий HA) --------
+    def _header(self, rec: int, mac: str) -> None:
+        # буфер сейчас содержит только целые записи — можно сбросить
+        if len(self._buf) >= FLUSH_BYTES:
+            self._async_flush()
+        if self._timer is None:
+            self._timer = self.hass.loop.call_later(FLUSH_INTERVAL, self._async_flush)
+        raw = self._macs.get(mac)
+        if raw is None:
+            raw = self._macs[mac] = _mac_bytes(mac)
+        self._buf += _HEADER.pack(rec, time.time(), raw)
+        self.records += 1
+
+    def _source_id(self, mac: str, source: Optional[str]) -> int:
+        if source is None:
+            return DIRECT_SOURCE
+        sid = self._sources.get(source)
+        if sid is None:
+            sid = self._sources[source] = len(self._sources)
+            name = source.encode()[:255]
+            self._header(REC_SOURCE, mac)
+            self._buf += _SOURCE.pack(sid, len(name)) + name
+        return sid
+
+    def advert(self, mac: str, rssi: int, source: str) -> None:
+        sid = self._source_id(mac, source)
+        self._header(REC_ADVERT, mac)
+        self._buf += _ADVERT.pack(max(-128, min(127, rssi)), sid)
+
+    def notify(self, mac: str, data: bytes) -> None:
+        data = data[:255]
+        self._header(REC_NOTIFY, mac)
+        self._buf += _LEN.pack(len(data)) + data
+
+    def write(self, mac: str, char: int, ok: bool, value: int, latency: float) -> None:
+        self._header(REC_WRITE, mac)
+        self._buf += _WRITE.pack(char, ok, value & 0xFF, latency)
+
+    def read(self, mac: str, ok: bool, value: int) -> None:
+        self._header(REC_READ, mac)
+        self._buf += _READ.pack(ok, value & 0xFF)
+
+    def connected(self, mac: str, source: Optional[str], established_in: float) -> None:
+        sid = self._source_id(mac, source)
+        self._header(REC_CONNECT, mac)
+        self._buf += _CONNECT.pack(sid, established_in)
+
+    def disconnected(self, mac: str) -> None:
+        self._header(REC_DISCONNECT, mac)
+
+    # -------- диск --------
+    @callback
+    def _async_flush(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        if not self._buf or (self._flushing is not None and not self._flushing.done()):
+            # предыдущая запись ещё идёт — следующая пачка уйдёт по таймеру
+            if self._buf and self._timer is None:
+                self._timer = self.hass.loop.call_later(FLUSH_INTERVAL, self._async_flush)
+            return
+        chunk, self._buf = bytes(self._buf), bytearray()
+        self._flushing = self.hass.async_add_executor_job(self._write, chunk)
+
+    def _write(self, chunk: bytes) -> None:
+        try:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            if os.path.exists(self.path) and os.path.getsize(self.path) + len(chunk) > CAPTURE_MAX_BYTES:
+                self._rotate()
+            new = not os.path.exists(self.path)
+            with open(self.path, "ab") as f:
+                if new:
+                    f.write(MAGIC)
+                    # словарь источников начинается заново в каждом файле
+                    chunk = self._source_table() + chunk
+                f.write(chunk)
+            self.bytes_written += len(chunk)
+        except OSError as e:
+            _LOGGER.warning("itag_bt capture: write to %s failed: %s", self.path, e)
+
+    def _source_table(self) -> bytes:
+        out = bytearray()
+        now = time.time()
+        for name, sid in list(self._sources.items()):
+            raw = name.encode()[:255]
+            out += _HEADER.pack(REC_SOURCE, now, bytes(6)) + _SOURCE.pack(sid, len(raw)) + raw
+        return bytes(out)
+
+    def _rotate(self) -> None:
+        for i in range(CAPTURE_FILES - 1, 0, -1):
+            src = self.path if i == 1 else f"{self.path}.{i - 1}"
+            if os.path.exists(src):
+                os.replace(src, f"{self.path}.{i}")
+        self.rotations += 1
+
+    @callback
+    def async_shutdown(self) -> None:
+        self._async_flush()
+
+    @property
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "path": self.path,
+            "records": self.records,
+            "buffered": len(self._buf),
+            "bytes_written": self.bytes_written,
+            "rotations": self.rotations,
+        }
+
+
+# -------- чтение и воспроизведение --------
+Record = Tuple[int, float, str, tuple]
+
+
+# фиксированная часть тела записи по типу (REC_DISCONNECT — без тела)
+_BODIES = {
+    REC_SOURCE: _SOURCE,
+    REC_ADVERT: _ADVERT,
+    REC_NOTIFY: _LEN,
+    REC_WRITE: _WRITE,
+    REC_READ: _READ,
+    REC_CONNECT: _CONNECT,
+}
+
+
+def iter_records(path: str) -> Iterator[Record]:
+    """(тип, unix time, MAC, поля) из файла захвата; источники уже раскрыты в имена.
+
+    Оборванная последняя запись (сбой дозаписи, падение HA) не ошибка: чтение
+    останавливается на ней с предупреждением в логе.
+    """
+    with open(path, "rb") as f:
+        data = f.read()
+    if not data.startswith(MAGIC):
+        raise ValueError(f"{path}: not an itag_bt capture")
+    sources: Dict[int, str] = {DIRECT_SOURCE: None}  # type: ignore[dict-item]
+    pos = len(MAGIC)
+    end = len(data)
+    while pos < end:
+        start = pos
+        if pos + _HEADER.size > end:
+            break
+        rec, ts, raw = _HEADER.unpack_from(data, pos)
+        pos += _HEADER.size
+        body = _BODIES.get(rec)
+        if body is None and rec != REC_DISCONNECT:
+            raise ValueError(f"{path}: unknown record type {rec} at {start}")
+        if body is not None and pos + body.size > end:
+            break
+        mac = ":".join(f"{b:02X}" for b in raw)
+        if rec == REC_SOURCE:
+            sid, n = _SOURCE.unpack_from(data, pos)
+            pos += _SOURCE.size
+            if pos + n > end:
+                break
+            sources[sid] = data[pos:pos + n].decode(errors="replace")
+            pos += n
+            continue
+        if rec == REC_ADVERT:
+            rssi, sid = _ADVERT.unpack_from(data, pos)
+            pos += _ADVERT.size
+            fields: tuple = (rssi, sources.get(sid))
+        elif rec == REC_NOTIFY:
+            (n,) = _LEN.unpack_from(data, pos)
+            pos += _LEN.size
+            if pos + n > end:
+                break
+            fields = (data[pos:pos + n],)
+            pos += n
+        elif rec == REC_WRITE:
+            fields = _WRITE.unpack_from(data, pos)
+            pos += _WRITE.size
+        elif rec == REC_READ:
+            fields = _READ.unpack_from(data, pos)
+            pos += _READ.size
+        elif rec == REC_CONNECT:
+            sid, established = _CONNECT.unpack_from(data, pos)
+            pos += _CONNECT.size
+            fields = (sources.get(sid), established)
+        else:
+            fields = ()
+        yield rec, ts, mac, fields
+    else:
+        return
+    _LOGGER.warning("%s: truncated record at offset %d (%d bytes), rest ignored", path, start, end - start)
+
+
+def _replay_client(hass: HomeAssistant, mac: str, live: Any) -> Any:
+    """Отдельный клиент для воспроизведения: без брокера, keepalive, моста на шину и записи.
+
+    Сигналы — собственный TagSignals клиента, поэтому сущности, автоматизации и
+    живые клиенты воспроизведения не видят. Опции (мёртвая зона, окно жестов) — как у живого.
+    """
+    from .coordinator import ITagClient
+
+    client = ITagClient(hass, mac)
+    # ADV не запускает connect()
+    client.advert_only = True
+    if live is not None:
+        client.rssi.deadband = live.rssi.deadband
+        client.gestures.window = live.gestures.window
+    return client
+
+
+async def async_replay(
+    hass: HomeAssistant, path: str, live_clients: Dict[str, Any], speed: float = 1.0
+) -> Dict[str, Any]:
+    """Подать захват (ADV и нажатия) в изолированные клиенты со скоростью speed (0 — без пауз).
+
+    GATT-записи/чтения и соединения только считаются: для их воспроизведения нужен
+    подменный BLE-клиент. Возвращает время в цикле событий и число обновлений, которые
+    получили бы сущности itag_bt (RSSI, кнопка, жесты). При speed=0 нажатия сливаются в серии.
+    """
+    from .signals import SIGNAL_BTN, SIGNAL_GESTURE
+
+    updates = {"rssi": 0, "button": 0, "gesture": 0}
+
+    def _counter(key: str):
+        def _count(*_args: Any) -> None:
+            updates[key] += 1
+
+        return _count
+
+    clients: Dict[str, Any] = {}
+    counts: Dict[str, int] = {}
+    loop_time = 0.0
+    first: Optional[float] = None
+    started = time.monotonic()
+    records: List[Record] = await hass.async_add_executor_job(lambda: list(iter_records(path)))
+    try:
+        for rec, ts, mac, fields in records:
+            counts[REC_NAMES[rec]] = counts.get(REC_NAMES[rec], 0) + 1
+            if rec not in (REC_ADVERT, REC_NOTIFY):
+                continue
+            client = clients.get(mac)
+            if client is None:
+                client = clients[mac] = _replay_client(hass, mac, live_clients.get(mac))
+                client.async_subscribe_rssi(_counter("rssi"))
+                client.signals.async_subscribe(mac, SIGNAL_BTN, _counter("button"))
+                client.signals.async_subscribe(mac, SIGNAL_GESTURE, _counter("gesture"))
+            if first is None:
+                first = ts
+            if speed > 0:
+                delay = (ts - first) / speed - (time.monotonic() - started)
+                if delay > 0:
+                    await asyncio.sleep(delay)
+            t0 = time.perf_counter()
+            if rec == REC_ADVERT:
+                client._on_advert(
+                    SimpleNamespace(
+                        address=mac, rssi=fields[0], source=fields[1] or "replay", time=time.monotonic()
+                    )
+                )
+            elif rec == REC_NOTIFY:
+                client._on_button(fields[0], time.monotonic())
+            loop_time += time.perf_counter() - t0
+        if clients:
+            # последняя серия нажатий закрывается по окну жестов
+            await asyncio.sleep(max(c.gestures.window for c in clients.values()))
+    finally:
+        for client in clients.values():
+            client.gestures.cancel()
+    return {
+        "records": len(records),
+        "tags": len(clients),
+        "by_type": counts,
+        "wall_time_s": round(time.monotonic() - started, 3),
+        "loop_time_ms": round(loop_time * 1000, 3),
+        "entity_updates": sum(updates.values()),
+        "updates": updates,
+    }
@@ -0,0 +1,182 @@
+from __future__ import annotations
+import re
+import voluptuous as vol
+from homeassistant import config_entries
+from homeassistant.components import bluetooth
+from homeassistant.components.bluetooth import BluetoothServiceInfoBleak
+from homeassistant.core import callback
+
+from . import (
+    DOMAIN,
+    CONF_ADVERT_ONLY,
+    CONF_BATTERY_MAX_AGE,
+    CONF_BUS_EVENTS,
+    CONF_CAPTURE,
+    CONF_CONSIDER_AWAY,
+    CONF_MULTI_PRESS_WINDOW,
+    CONF_KEEPALIVE_INTERVAL,
+    CONF_RSSI_DEADBAND,
+    CONF_STARTUP_ORDER,
+    DEFAULT_BATTERY_MAX_AGE,
+    DEFAULT_CONSIDER_AWAY,
+    DEFAULT_KEEPALIVE_INTERVAL,
+    DEFAULT_MULTI_PRESS_WINDOW,
+    DEFAULT_RSSI_DEADBAND,
+)
+
+# Матчер manifest.json: имя iTAG/iTag/ITAG и сервис FFE0 в рекламе. FFE0 сам по себе
+# есть у любого модуля HM-10/CC254x, поэтому без имени тег принимается только вместе с 0x1802
+ITAG_NAMES = ("itag",)
+UUID_SVC_BUTTON = "0000ffe0-0000-1000-8000-00805f9b34fb"
+UUID_SVC_IMMEDIATE_ALERT = "00001802-0000-1000-8000-00805f9b34fb"
+
+ADD_ALL = "__all__"
+MANUAL = "__manual__"
+
+_MAC_RE = re.compile(r"^([0-9A-F]{2}:){5}[0-9A-F]{2}$")
+
+
+def is_itag(info: BluetoothServiceInfoBleak) -> bool:
+    name = (info.name or "").lower()
+    if name.startswith(ITAG_NAMES):
+        return True
+    # безымянная реклама клона: FFE0 + Immediate Alert
+    uuids = info.service_uuids
+    return UUID_SVC_BUTTON in uuids and UUID_SVC_IMMEDIATE_ALERT in uuids
+
+
+class ConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
+    VERSION = 1
+
+    def __init__(self) -> None:
+        self._discovery: BluetoothServiceInfoBleak | None = None
+        self._discovered: dict[str, str] = {}
+
+    def _entry(self, mac: str):
+        return self.async_create_entry(title=f"iTag {mac}", data={"mac": mac})
+
+    async def async_step_bluetooth(self, discovery_info: BluetoothServiceInfoBleak):
+        """Найден по рекламе (матчер manifest.json)."""
+        mac = discovery_info.address.upper()
+        await self.async_set_unique_id(mac)
+        self._abort_if_unique_id_configured()
+        if not is_itag(discovery_info):
+            return self.async_abort(reason="not_supported")
+        self._discovery = discovery_info
+        self.context["title_placeholders"] = {"name": discovery_info.name or mac}
+        return await self.async_step_bluetooth_confirm()
+
+    async def async_step_bluetooth_confirm(self, user_input=None):
+        assert self._discovery is not None
+        mac = self._discovery.address.upper()
+        if user_input is not None:
+            return self._entry(mac)
+        self._set_confirm_only()
+        return self.async_show_form(
+            step_id="bluetooth_confirm",
+            description_placeholders={"name": self._discovery.name or mac, "mac": mac},
+        )
+
+    async def async_step_user(self, user_input=None):
+        """Выбор из найденных брелков, «добавить все» или ввод MAC."""
+        if user_input is not None:
+            choice = user_input["address"]
+            if choice == MANUAL:
+                return await self.async_step_manual()
+            if choice == ADD_ALL:
+                return await self._async_add_all()
+            await self.async_set_unique_id(choice, raise_on_progress=False)
+            self._abort_if_unique_id_configured()
+            return self._entry(choice)
+
+        configured = self._async_current_ids()
+        self._discovered = {}
+        for info in bluetooth.async_discovered_service_info(self.hass, connectable=True):
+            mac = info.address.upper()
+            if mac in configured or mac in self._discovered or not is_itag(info):
+                continue
+            self._discovered[mac] = f"{info.name or 'iTag'} ({mac}, {info.rssi} dBm)"
+        if not self._discovered:
+            return await self.async_step_manual()
+
+        choices: dict[str, str] = {}
+        if len(self._discovered) > 1:
+            choices[ADD_ALL] = f"All discovered ({len(self._discovered)})"
+        choices.update(self._discovered)
+        choices[MANUAL] = "Enter MAC manually"
+        schema = vol.Schema({vol.Required("address"): vol.In(choices)})
+        return self.async_show_form(step_id="user", data_schema=schema)
+
+    async def _async_add_all(self):
+        """Одно действие на весь парк: эта запись + фоновые import-потоки для остальных."""
+        macs = list(self._discovered)
+        first, rest = macs[0], macs[1:]
+        await self.async_set_unique_id(first, raise_on_progress=False)
+        self._abort_if_unique_id_configured()
+        for mac in rest:
+            self.hass.async_create_task(
+                self.hass.config_entries.flow.async_init(
+                    DOMAIN, context={"source": config_entries.SOURCE_IMPORT}, data={"mac": mac}
+                )
+            )
+        return self._entry(first)
+
+    async def async_step_import(self, import_data):
+        mac = import_data["mac"].upper()
+        # запущен «добавить все» — забирает уже открытое обнаружение этого же тега
+        await self.async_set_unique_id(mac, raise_on_progress=False)
+        self._abort_if_unique_id_configured()
+        return self._entry(mac)
+
+    async def async_step_manual(self, user_input=None):
+        errors: dict[str, str] = {}
+        if user_input is not None:
+            mac = user_input["mac"].strip().upper()
+            if not _MAC_RE.match(mac):
+                errors["mac"] = "invalid_mac"
+            else:
+                await self.async_set_unique_id(mac, raise_on_progress=False)
+                self._abort_if_unique_id_configured()
+                return self._entry(mac)
+        schema = vol.Schema({vol.Required("mac"): str})
+        return self.async_show_form(step_id="manual", data_schema=schema, errors=errors)
+
+    @staticmethod
+    @callback
+    def async_get_options_flow(config_entry):
+        return OptionsFlow()
+
+class OptionsFlow(config_entries.OptionsFlow):
+    async def async_step_init(self, user_input=None):
+        if user_input is not None:
+            return self.async_create_entry(data=user_input)
+        options = self.config_entry.options
+        schema = vol.Schema({
+            vol.Required(
+                CONF_KEEPALIVE_INTERVAL,
+                default=options.get(CONF_KEEPALIVE_INTERVAL, DEFAULT_KEEPALIVE_INTERVAL),
+            ): vol.All(vol.Coerce(int), vol.Range(min=5, max=600)),
+            vol.Required(CONF_ADVERT_ONLY, default=options.get(CONF_ADVERT_ONLY, False)): bool,
+            vol.Required(
+                CONF_RSSI_DEADBAND,
+                default=options.get(CONF_RSSI_DEADBAND, DEFAULT_RSSI_DEADBAND),
+            ): vol.All(vol.Coerce(int), vol.Range(min=0, max=20)),
+            vol.Required(
+                CONF_BATTERY_MAX_AGE,
+                default=options.get(CONF_BATTERY_MAX_AGE, DEFAULT_BATTERY_MAX_AGE),
+            ): vol.All(vol.Coerce(int), vol.Range(min=1, max=24 * 30)),
+            vol.Required(
+                CONF_MULTI_PRESS_WINDOW,
+                default=options.get(CONF_MULTI_PRESS_WINDOW, DEFAULT_MULTI_PRESS_WINDOW),
+            ): vol.All(vol.Coerce(int), vol.Range(min=100, max=2000)),
+            vol.Required(CONF_BUS_EVENTS, default=options.get(CONF_BUS_EVENTS, False)): bool,
+            vol.Required(
+                CONF_STARTUP_ORDER, default=options.get(CONF_STARTUP_ORDER, 0)
+            ): vol.All(vol.Coerce(int), vol.Range(min=0, max=1000)),
+            vol.Required(
+                CONF_CONSIDER_AWAY,
+                default=options.get(CONF_CONSIDER_AWAY, DEFAULT_CONSIDER_AWAY),
+            ): vol.All(vol.Coerce(int), vol.Range(min=30, max=3600)),
+            vol.Required(CONF_CAPTURE, default=options.get(CONF_CAPTURE, False)): bool,
+        })
+        return self.async_show_form(step_id="init", data_schema=schema)
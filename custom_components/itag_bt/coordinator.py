@@ -0,0 +1,963 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+import time
+from typing import TYPE_CHECKING, Callable, Optional, Any
+
+from homeassistant.core import HomeAssistant
+from homeassistant.components import bluetooth
+
+from . import DEFAULT_BATTERY_MAX_AGE, DEFAULT_CONSIDER_AWAY, DEFAULT_KEEPALIVE_INTERVAL
+from .advert import AdvertDispatcher
+from .battery import BatteryManager
+from .capture import WRITE_ALERT, WRITE_LINK_LOSS, TrafficCapture
+from .broker import ConnectionBroker
+from .keepalive import KeepaliveScheduler
+from .metrics import TagMetrics
+from .presence import PresenceEngine
+from .rssi import RssiTracker
+from .gatt_cache import ROLES, GattCache
+from .gatt_queue import SLOT_ALERT, SLOT_LINK_LOSS, GattWriteQueue
+from .gesture import GestureDecoder
+from .signals import SIGNAL_BEEP, SIGNAL_BTN, SIGNAL_CONN, SIGNAL_DISC, SIGNAL_GESTURE, TagSignals
+from .state_store import (
+    F_CHARACTERISTICS,
+    F_CONNECTED_SOURCE,
+    F_LAST_SEEN,
+    F_LAST_SOURCE,
+    F_LINK_ALERT,
+    F_RSSI,
+    TagStateStore,
+)
+
+if TYPE_CHECKING:
+    from bleak_retry_connector import BleakClientWithServiceCache
+
+_LOGGER = logging.getLogger(__name__)
+
+# Services
+SVC_IMMEDIATE_ALERT = "00001802-0000-1000-8000-00805f9b34fb"  # писк по команде
+"""SVC_LINK_LOSS       = "00001803-0000-1000-8000-00805f9b34fb"  # писк при потере связи"""
+SVC_LINK_LOSS       = "0000ffe0-0000-1000-8000-00805f9b34fb"    #新的uuid
+SVC_BATTERY         = "0000180f-0000-1000-8000-00805f9b34fb"  # справочно
+
+# Characteristics
+UUID_BTN   = "0000ffe1-0000-1000-8000-00805f9b34fb"  # notify (кнопка) — FFE0/FFE1
+UUID_ALERT = "00002a06-0000-1000-8000-00805f9b34fb"  # Alert Level (write 0x00/0x01/0x02)
+UUID_BATT  = "00002a19-0000-1000-8000-00805f9b34fb"  # Battery Level (read)
+
+# 厂商自定义服务/特征值 UUID（用于断线报警）
+UUID_LINK_LOSS_CHAR = "0000ffe2-0000-1000-8000-00805f9b34fb" #Link Loss (write 0x01/0x00)
+
+
+"""
+0x00 : 关
+0x01 : 开
+"""
+#开启响铃的值
+BEEP_ON_VALUE = b"\x01"
+#关闭响铃的值
+BEEP_OFF_VALUE = b"\x00"
+
+# Режим «только реклама»: тег доступен, пока HA видит его рекламу (advert_present)
+ADVERT_ONLY_IDLE_TIMEOUT = 30.0  # сек простоя -> отключаемся после писка/чтения
+
+# Переподключение
+FRESH_ADVERT_AGE = 10.0              # сек: реклама старше не запускает connect()
+CONNECT_TIMEOUT = 15.0
+CONNECT_RESULT_TTL = 2.0             # сек: неудачная попытка отвечает всплеску вызовов без новой
+DIRECT_FALLBACK_MAX_FAILURES = 3     # после стольких неудач прямой BleakClient не пробуем...
+DIRECT_FALLBACK_RETRY_AFTER = 3600.0 # ...в течение часа
+
+# Выбор адаптера/прокси
+MIGRATE_HYSTERESIS = 10              # dBm: другой сканер должен быть лучше на столько...
+MIGRATE_MIN_INTERVAL = 600.0         # ...и не чаще раза в 10 мин
+UNKNOWN_SOURCE = "unknown"
+
+# столько неудачных записей подряд на живом соединении -> раскладка GATT считается устаревшей
+GATT_INVALIDATE_AFTER = 2
+
+class _GattHandles:
+    """Характеристики, найденные при connect(); живут до дисконнекта."""
+
+    __slots__ = ("alert", "link_loss", "button", "battery")
+
+    def __init__(self) -> None:
+        self.alert: Any = None
+        self.link_loss: Any = None
+        self.button: Any = None
+        self.battery: Any = None
+
+
+_ROLE_UUIDS = {
+    "alert": UUID_ALERT,
+    "link_loss": UUID_LINK_LOSS_CHAR,
+    "button": UUID_BTN,
+    "battery": UUID_BATT,
+}
+
+
+class ITagClient:
+    def __init__(
+        self,
+        hass: HomeAssistant,
+        mac: str,
+        keepalive: KeepaliveScheduler | None = None,
+        keepalive_interval: float = DEFAULT_KEEPALIVE_INTERVAL,
+        broker: ConnectionBroker | None = None,
+    ) -> None:
+        self.hass = hass
+        self.mac = mac.upper()
+        self.client: Optional[BleakClientWithServiceCache] = None
+        self._connect_lock = asyncio.Lock()
+        self._keepalive = keepalive
+        self.keepalive_interval = keepalive_interval
+        # последний обмен по GATT (monotonic), включая сам keepalive
+        self.last_activity = 0.0
+        # последний обмен по GATT кроме keepalive — по нему KeepaliveScheduler пропускает запись
+        self.last_traffic = 0.0
+        self._adv_remove = None
+        self._unavailable_remove = None
+        # тег в эфире по данным HA: ADV с одним лишь новым RSSI колбэк не вызывает,
+        # поэтому «пропал» берём из async_track_unavailable, а не из last_seen
+        self.advert_present = False
+        # антишторм: очередь и backoff ведёт общий ConnectionBroker (broker.py)
+        self._broker = broker
+        self.last_seen = 0.0
+        self.last_source: str | None = None
+        # RSSI по каждому адаптеру/прокси (source -> dBm) и через кого подключены
+        self.scanner_rssi: dict[str, int] = {}
+        # то, что видят атрибуты сущности RSSI: публикуется заново при сдвиге на мёртвую зону
+        self._scanners_published: dict[str, int] = {}
+        self.connected_source: str | None = None
+        self.last_connected_source: str | None = None
+        self._target_device: Any = None
+        self._target_source: str | None = None
+        self._migrated_at = 0.0
+        # прогрев после старта HA: порядок (опция) и флаг «ждёт очереди»
+        self.startup_order = 0
+        self.warmup_pending = False
+        # entity_id кнопки — брокер поднимает приоритет тегов с автоматизациями
+        self.button_entity_id: str | None = None
+        # «только реклама»: без постоянного GATT, подключение по требованию
+        self.advert_only: bool = False
+        self._idle_timer: Optional[asyncio.TimerHandle] = None
+        # кэш/расписание чтения батареи — общий BatteryManager (battery.py)
+        self.battery_manager: BatteryManager | None = None
+        self.battery_max_age: float = DEFAULT_BATTERY_MAX_AGE * 3600.0
+        # события кнопки/коннекта; __init__ подставляет общий реестр домена
+        self.signals = TagSignals(hass)
+        # одиночное/двойное/тройное/долгое нажатие
+        self.gestures = GestureDecoder(hass.loop, self._on_gesture)
+
+        # писк включён (переключатель Beep или сервис beep_group) — состояние для переключателя
+        self.beeping = False
+        # Политика Link Loss (по умолчанию — ВЫКЛ, чтобы не пищал на дисконнекте)
+        self._link_alert_enabled: bool = False
+        # 保存最新的信号强度 (RSSI)：кольцевой буфер + сглаживание, публикация по мёртвой зоне
+        self.rssi = RssiTracker()
+        self._rssi_listeners: list[Callable[[], None]] = []
+        # кэш характеристик текущего соединения
+        self._handles: Optional[_GattHandles] = None
+        # раскладка GATT между перезапусками (gatt_cache.py); подставляет __init__
+        self.gatt_cache: GattCache | None = None
+        # у тега нет FFE2 — больше не ищем
+        self._link_loss_missing: bool = False
+        # неудачные записи подряд при живом соединении (разрыв связи сюда не считается)
+        self._write_failures = 0
+        # записи GATT: по одной, со слиянием (gatt_queue.py)
+        self._queue = GattWriteQueue(self)
+        self._ready = False
+        self._link_loss_level: int | None = None
+        self._direct_failures = 0
+        self._direct_retry_at = 0.0
+        # одна попытка подключения на тег: все вызовы connect() ждут её future
+        self._connect_fut: Optional[asyncio.Future] = None
+        self._connect_done_at = 0.0
+        # соединение (bleak-клиент), которому брокер выдал текущий слот
+        self._slot_holder: Any = None
+        # запись BLE-трафика (capture.py), только если включена в Параметрах
+        self.capture: TrafficCapture | None = None
+        # дома/ушёл (presence.py): движок подставляет себя и ведёт presence_home
+        self.presence: PresenceEngine | None = None
+        self.presence_home: bool | None = None
+        self.consider_away: float = DEFAULT_CONSIDER_AWAY
+        # последнее известное состояние между перезапусками (state_store.py); подставляет __init__
+        self.state_store: TagStateStore | None = None
+        self._characteristics: int | None = None
+        # счётчики/гистограммы жизненного цикла (diagnostics.py)
+        self.metrics = TagMetrics()
+
+    # -------- мониторинг рекламы и автоконнект --------
+    def start_advert_watch(self, dispatcher: AdvertDispatcher) -> None:
+        if self._adv_remove is not None:
+            return
+        # фильтр по MAC делает общий диспетчер домена (см. advert.py)
+        self._adv_remove = dispatcher.async_attach(self.mac, self._on_advert, self.refresh_scanners)
+        self.advert_present = bluetooth.async_address_present(self.hass, self.mac, connectable=False)
+        self._unavailable_remove = bluetooth.async_track_unavailable(
+            self.hass, self._on_unavailable, self.mac, connectable=False
+        )
+
+    def _on_unavailable(self, _service_info: Any) -> None:
+        self.advert_present = False
+        self._notify_rssi()
+
+    def _notify_rssi(self) -> None:
+        self._scanners_published = dict(self.scanner_rssi)
+        for listener in self._rssi_listeners:
+            listener()
+
+    def _on_advert(self, service_info: Any) -> None:
+        now = self.last_seen = time.monotonic()
+        source = self.last_source = service_info.source
+        self.scanner_rssi[source] = service_info.rssi
+        if self.capture is not None:
+            self.capture.advert(self.mac, service_info.rssi, source)
+        # === 新增：保存当前广告的 RSSI（信号强度） ===
+        returned = not self.advert_present
+        self.advert_present = True
+        if self.rssi.add(service_info.rssi):
+            self._notify_rssi()
+            self._state_changed()
+        elif returned or self._scanners_moved():
+            # значение в мёртвой зоне, но сущность RSSI снова доступна или сдвинулся RSSI на одном из сканеров
+            self._notify_rssi()
+        # ===========================================
+        # пока тег «дома», ADV движок присутствия не трогает
+        if not self.presence_home and self.presence is not None:
+            self.presence.async_advert(self, now)
+
+        # ADV от пассивного сканера: через него не подключиться и не переехать
+        if not getattr(service_info, "connectable", True):
+            return
+        if self.client and getattr(self.client, "is_connected", False):
+            if source != self.connected_source:
+                self._maybe_migrate(now, source, service_info.rssi)
+            return
+        if self.advert_only:
+            return
+        # после старта HA подключение ведёт очередь прогрева (warmup.py)
+        if self.warmup_pending:
+            return
+        # HA повторяет последнюю известную рекламу при регистрации — это не повод для попытки
+        if now - getattr(service_info, "time", now) > FRESH_ADVERT_AGE:
+            return
+        self.metrics.advert_while_disconnected(now)
+        self._request_connect()
+
+    def _request_connect(self) -> None:
+        if self._broker is not None:
+            if self._broker.async_request(self) is not None:
+                _LOGGER.debug("ITag[%s] ADV seen, connect queued", self.mac)
+            return
+        if self._connect_fut is not None and not self._connect_fut.done():
+            # попытка уже идёт — новая задача не нужна
+            self.metrics.connects_coalesced += 1
+            return
+        _LOGGER.debug("ITag[%s] ADV seen, scheduling connect", self.mac)
+        self.hass.async_create_task(self.connect())
+
+    # -------- выбор адаптера/прокси --------
+    def select_source(self, has_capacity: Callable[[str], bool]) -> str | None:
+        """Лучший по RSSI подключаемый сканер со свободным слотом; None — все заняты.
+
+        Запоминает его BLEDevice для следующего connect().
+        """
+        best_rssi = -1000
+        best = None
+        for dev in bluetooth.async_scanner_devices_by_address(self.hass, self.mac, connectable=True):
+            source = dev.scanner.source
+            rssi = dev.advertisement.rssi
+            self.scanner_rssi[source] = rssi
+            if rssi > best_rssi and has_capacity(source):
+                best_rssi = rssi
+                best = dev
+        if best is not None:
+            self._target_device = best.ble_device
+            self._target_source = best.scanner.source
+            return self._target_source
+        self._target_device = None
+        self._target_source = None
+        source = self.last_source or UNKNOWN_SOURCE
+        return source if has_capacity(source) else None
+
+    def _maybe_migrate(self, now: float, source: str, rssi: int) -> None:
+        """Реклама во время соединения пришла через другой сканер — переехать, если он заметно лучше."""
+        # разрыв запускает Link Loss — с включённым Link Alert брелок запищит
+        if self._link_alert_enabled or self._broker is None:
+            return
+        if now - self._migrated_at < MIGRATE_MIN_INTERVAL:
+            return
+        # RSSI текущего сканера — из истории HA, а не из последнего дошедшего до колбэка ADV
+        self.refresh_scanners()
+        current = self.scanner_rssi.get(self.connected_source or "")
+        if current is None or rssi < current + MIGRATE_HYSTERESIS:
+            return
+        self._migrated_at = now
+        _LOGGER.debug(
+            "ITag[%s] migrating %s (%s dBm) -> %s (%s dBm)",
+            self.mac, self.connected_source, current, source, rssi,
+        )
+        self.hass.async_create_task(self._async_migrate())
+
+    async def _async_migrate(self) -> None:
+        await self.disconnect()
+        await self.connect()
+
+    def refresh_scanners(self) -> None:
+        """RSSI по всем сканерам (и пассивным) из истории HA; публикация — при сдвиге на мёртвую зону."""
+        self.scanner_rssi = {
+            dev.scanner.source: dev.advertisement.rssi
+            for dev in bluetooth.async_scanner_devices_by_address(self.hass, self.mac, connectable=False)
+        }
+        if self._scanners_moved():
+            self._notify_rssi()
+
+    def _scanners_moved(self) -> bool:
+        published = self._scanners_published
+        current = self.scanner_rssi
+        if published.keys() != current.keys():
+            return True
+        deadband = self.rssi.deadband
+        return any(abs(rssi - published[source]) >= deadband for source, rssi in current.items())
+
+    def scanner_rssi_by_name(self) -> dict[str, int]:
+        """RSSI по сканерам с человекочитаемыми именами (для атрибутов/диагностики)."""
+        result: dict[str, int] = {}
+        for source, rssi in self.scanner_rssi.items():
+            scanner = bluetooth.async_scanner_by_source(self.hass, source)
+            result[scanner.name if scanner is not None else source] = rssi
+        return result
+
+    def stop_advert_watch(self) -> None:
+        if self._adv_remove:
+            try:
+                self._adv_remove()
+            except Exception:
+                pass
+            self._adv_remove = None
+        if self._unavailable_remove is not None:
+            self._unavailable_remove()
+            self._unavailable_remove = None
+
+    # -------- разрешение характеристик (один раз на соединение) --------
+    def _services(self) -> Any:
+        return getattr(self.client, "services", None) if self.client else None
+
+    def _resolve_handles(self) -> _GattHandles:
+        """После connect(): раскладка из GattCache по handle, иначе один проход по сервисам."""
+        services = self._services()
+        layout = self.gatt_cache.get(self.mac) if self.gatt_cache is not None else None
+        if layout is not None and services is not None:
+            handles = self._handles_from_layout(services, layout)
+            if handles is not None:
+                return handles
+        handles = self._scan_handles(services)
+        if self.gatt_cache is not None and services is not None:
+            self.gatt_cache.async_set(
+                self.mac, {role: getattr(getattr(handles, role), "handle", None) for role in _ROLE_UUIDS}
+            )
+        return handles
+
+    def _handles_from_layout(self, services: Any, layout: dict) -> Optional[_GattHandles]:
+        handles = _GattHandles()
+        for role, uuid in _ROLE_UUIDS.items():
+            handle = layout.get(role)
+            if handle is None:
+                continue
+            ch = services.get_characteristic(handle)
+            if ch is None or ch.uuid.lower() != uuid:
+                # раскладка устарела (другая прошивка/кэш адаптера) — полный проход
+                return None
+            setattr(handles, role, ch)
+        if handles.link_loss is None:
+            self._link_loss_missing = True
+        return handles
+
+    def _scan_handles(self, services: Any) -> _GattHandles:
+        handles = _GattHandles()
+        try:
+            if services is not None:
+                for srv in services:
+                    srv_uuid = str(srv.uuid).lower()
+                    for ch in srv.characteristics:
+                        ch_uuid = ch.uuid.lower()
+                        if ch_uuid == UUID_ALERT:
+                            if srv_uuid == SVC_IMMEDIATE_ALERT and handles.alert is None:
+                                handles.alert = ch
+                        elif ch_uuid == UUID_LINK_LOSS_CHAR:
+                            if srv_uuid == SVC_LINK_LOSS and handles.link_loss is None:
+                                handles.link_loss = ch
+                        elif ch_uuid == UUID_BTN:
+                            if handles.button is None:
+                                handles.button = ch
+                        elif ch_uuid == UUID_BATT:
+                            if handles.battery is None:
+                                handles.battery = ch
+        except Exception:
+            pass
+        if services is not None:
+            # запоминаем, чтобы не искать Link Loss на каждом write
+            self._link_loss_missing = handles.link_loss is None
+            if self._link_loss_missing:
+                _LOGGER.debug("ITag[%s] no Link Loss characteristic (FFE2)", self.mac)
+        return handles
+
+    # -------- точные операции над Immediate Alert и Link Loss --------
+    async def _write_immediate_alert(self, payload: bytes) -> bool:
+        """Сброс/включение немедленного писка (0x1802:2A06). Фолбэк по UUID допустим."""
+        if not self.client or not getattr(self.client, "is_connected", False):
+            return False
+        handles = self._handles
+        # Если сервисы не распарсились — пишем по UUID характеристики
+        target = handles.alert if handles is not None and handles.alert is not None else UUID_ALERT
+        started = time.monotonic()
+        try:
+            # Для Immediate Alert обычно write without response; response=False
+            await self.client.write_gatt_char(target, payload, response=False)  # type: ignore[attr-defined]
+            self.last_activity = time.monotonic()
+            self._write_failures = 0
+            self.metrics.write(self.last_activity - started, True)
+            if self.capture is not None:
+                self.capture.write(self.mac, WRITE_ALERT, True, payload[0], self.last_activity - started)
+            return True
+        except Exception as e:
+            self.metrics.write(0.0, False)
+            if self.capture is not None:
+                self.capture.write(self.mac, WRITE_ALERT, False, payload[0], time.monotonic() - started)
+            _LOGGER.warning("ITag[%s] 写入失败，准备重连: %s", self.mac, e)
+            self._ready = False
+            await self._async_write_failed()
+            try:
+                if self.client and getattr(self.client, "is_connected", False):
+                    await self.client.disconnect()
+            except Exception:
+                pass
+            return False
+
+    async def _async_write_failed(self) -> None:
+        """Запись не прошла. Разрыв связи (в т.ч. посреди keepalive) раскладку не трогает;
+        устаревшей она считается после GATT_INVALIDATE_AFTER отказов подряд на живом соединении."""
+        if not self.is_connected:
+            return
+        self._write_failures += 1
+        if self._write_failures >= GATT_INVALIDATE_AFTER:
+            self._write_failures = 0
+            await self._invalidate_gatt_cache()
+
+    async def _invalidate_gatt_cache(self) -> None:
+        """Раскладка устарела: сбросить свой кэш и кэш сервисов клиента."""
+        if self.gatt_cache is not None:
+            self.gatt_cache.async_invalidate(self.mac)
+        clear_cache = getattr(self.client, "clear_cache", None)
+        if clear_cache is not None:
+            try:
+                await clear_cache()
+            except Exception:
+                pass
+
+    async def _write_link_loss_exact(self, level_byte: int) -> bool:
+        """
+        Строго записать уровень в Link Loss (0x1803:2A06) с write-with-response и прочитать обратно.
+        Возвращает True, если запись подтверждена/совпала при чтении.
+        """
+        if not self.client or not getattr(self.client, "is_connected", False):
+            return False
+        if self._link_loss_missing:
+            return False
+        handles = self._handles
+        if handles is None or handles.link_loss is None:
+            _LOGGER.debug("ITag[%s] Link Loss 2A06 not found in services", self.mac)
+            return False
+        payload = bytes([level_byte & 0xFF])
+        started = time.monotonic()
+        try:
+            await self.client.write_gatt_char(handles.link_loss, payload, response=True)  # type: ignore[attr-defined]
+            self.last_activity = time.monotonic()
+            self._write_failures = 0
+            self.metrics.write(self.last_activity - started, True)
+            if self.capture is not None:
+                self.capture.write(self.mac, WRITE_LINK_LOSS, True, level_byte, self.last_activity - started)
+            _LOGGER.debug("ITag[%s] link-loss write %s (Write-Only mode, no readback)", self.mac, payload.hex())
+            return True
+        except Exception as e:
+            self.metrics.write(0.0, False)
+            if self.capture is not None:
+                self.capture.write(self.mac, WRITE_LINK_LOSS, False, level_byte, time.monotonic() - started)
+            _LOGGER.debug("ITag[%s] _write_link_loss_exact failed: %s", self.mac, e)
+            await self._async_write_failed()
+            return False
+
+    async def _apply_link_alert_policy(self) -> None:
+        """Применить текущую политику к 0x1803:2A06 (строго)."""
+        level = 0x01 if self._link_alert_enabled else 0x00
+        ok = await self._write_link_loss_exact(level)
+        self._link_loss_level = level if ok else None
+        if not ok:
+            _LOGGER.debug("ITag[%s] failed to apply link-loss policy (enabled=%s)", self.mac, self._link_alert_enabled)
+
+    # -------- батарея --------
+    async def _start_battery_watch(self) -> None:
+        """Подписка на 2A19 (если тег умеет notify) и чтение, если кэш устарел."""
+        handles = self._handles
+        if handles is not None and handles.battery is not None:
+            if "notify" in getattr(handles.battery, "properties", ()):
+                try:
+                    await self.client.start_notify(handles.battery, self._cb_battery)  # type: ignore[union-attr]
+                except Exception as e:
+                    _LOGGER.debug("ITag[%s] battery notify not available: %s", self.mac, e)
+        if self.battery_manager is not None:
+            self.battery_manager.async_connected(self)
+
+    def _cb_battery(self, _handle, data: bytes):
+        self.last_activity = self.last_traffic = time.monotonic()
+        if data and self.battery_manager is not None:
+            self.hass.loop.call_soon_threadsafe(self.battery_manager.async_set, self.mac, int(data[0]))
+
+    # -------- сохранённое состояние (state_store.py) --------
+    def restore_state(self, record: list) -> None:
+        """Последнее известное состояние до первого ADV/подключения."""
+        self._link_alert_enabled = bool(record[F_LINK_ALERT])
+        if record[F_RSSI] is not None:
+            self.rssi.seed(int(record[F_RSSI]))
+        if record[F_LAST_SEEN]:
+            # unix time -> monotonic той же шкалы, что и у свежих ADV
+            self.last_seen = time.monotonic() - max(0.0, time.time() - record[F_LAST_SEEN])
+        self.last_source = self.last_source or record[F_LAST_SOURCE]
+        self.last_connected_source = record[F_CONNECTED_SOURCE]
+        chars = record[F_CHARACTERISTICS]
+        if chars is not None:
+            self._characteristics = chars
+            self._link_loss_missing = not chars & (1 << ROLES.index("link_loss"))
+
+    def state_snapshot(self) -> list:
+        handles = self._handles
+        if handles is not None:
+            self._characteristics = sum(
+                1 << i for i, role in enumerate(ROLES) if getattr(handles, role) is not None
+            )
+        return [
+            int(self._link_alert_enabled),
+            self.rssi.value,
+            round(self.last_seen_timestamp) if self.last_seen_timestamp else None,
+            self.last_source,
+            self.last_connected_source,
+            self._characteristics,
+        ]
+
+    def _state_changed(self) -> None:
+        if self.state_store is not None:
+            self.state_store.async_mark_dirty()
+
+    # -------- keepalive --------
+    async def async_keepalive(self) -> None:
+        """Вызывается общим KeepaliveScheduler (см. keepalive.py)."""
+        # ТОЛЬКО Immediate Alert; Link Loss НЕ трогаем. Low priority: поглощается писком в очереди
+        self.metrics.keepalive_writes += 1
+        await self._queue.submit(SLOT_ALERT, b"\x00", low_priority=True)
+
+    def _start_keepalive(self):
+        # в режиме «только реклама» соединение короткое — keepalive не нужен
+        if self._keepalive is not None and not self.advert_only:
+            self._keepalive.async_add(self)
+
+    def _stop_keepalive(self):
+        if self._keepalive is not None:
+            self._keepalive.async_remove(self.mac)
+
+    # -------- connect / disconnect --------
+    def _on_disconnected(self, client):
+        current = self.client
+        if current is not None and client is not None and client is not current:
+            # колбэк прежнего соединения (миграция): слот и состояние уже принадлежат новому
+            _LOGGER.debug("ITag[%s] stale disconnect callback ignored", self.mac)
+            return
+        _LOGGER.debug("ITag[%s] disconnected", self.mac)
+        self.metrics.disconnected(time.monotonic())
+        self.connected_source = None
+        self._ready = False
+        self._link_loss_level = None
+        self._handles = None
+        self._stop_keepalive()
+        self.hass.loop.call_soon_threadsafe(self._async_after_disconnect, client or current)
+
+    def _async_after_disconnect(self, client: Any = None) -> None:
+        if self.capture is not None:
+            self.capture.disconnected(self.mac)
+        self.signals.async_send(self.mac, SIGNAL_DISC)
+        # слот возвращает только соединение, которое его держало: после disconnect()
+        # его уже вернул async_forget, а при миграции слот может принадлежать новому
+        if self._broker is not None and client is not None and client is self._slot_holder:
+            self._slot_holder = None
+            self._broker.async_release(self.mac)
+        self._cancel_idle_disconnect()
+        if self._broker is None and self._adv_remove is not None and not self.advert_only:
+            self._request_connect()
+        # с брокером переподключение начнётся по следующей свежей рекламе (_on_advert)
+
+    # -------- режим «только реклама»: отключение по простою --------
+    def _arm_idle_disconnect(self) -> None:
+        if not self.advert_only:
+            return
+        self._cancel_idle_disconnect()
+        self._idle_timer = self.hass.loop.call_later(
+            ADVERT_ONLY_IDLE_TIMEOUT, self._async_idle_expired
+        )
+
+    def _cancel_idle_disconnect(self) -> None:
+        if self._idle_timer is not None:
+            self._idle_timer.cancel()
+            self._idle_timer = None
+
+    def _async_idle_expired(self) -> None:
+        self._idle_timer = None
+        if self.advert_only and self.is_connected:
+            _LOGGER.debug("ITag[%s] idle, disconnecting (advert-only)", self.mac)
+            self.hass.async_create_task(self.disconnect())
+
+    async def connect(self) -> bool:
+        """Подключиться вне очереди ADV (писк, чтение и т.п.) — через брокер, если он есть.
+
+        Одновременные вызовы ждут одну общую попытку; неудачный результат ещё
+        CONNECT_RESULT_TTL секунд отдаётся сразу, без новой попытки.
+        """
+        if self.client and getattr(self.client, "is_connected", False):
+            return True
+        fut = self._connect_fut
+        if fut is not None:
+            if not fut.done():
+                self.metrics.connects_coalesced += 1
+                return await asyncio.shield(fut)
+            if not fut.result() and time.monotonic() - self._connect_done_at < CONNECT_RESULT_TTL:
+                self.metrics.connects_coalesced += 1
+                return False
+        fut = self._connect_fut = self.hass.loop.create_future()
+        try:
+            if self._broker is not None:
+                await self._broker.async_connect(self)
+            else:
+                await self._async_connect_now()
+        finally:
+            self._connect_done_at = time.monotonic()
+            fut.set_result(self.is_connected)
+        return fut.result()
+
+    async def _async_connect_now(self):
+        # BLE-стек грузится только здесь: теги «только реклама» и config flow его не импортируют
+        from bleak.exc import BleakError
+        from bleak_retry_connector import BleakClientWithServiceCache, establish_connection
+
+        async with self._connect_lock:
+            if self.client and getattr(self.client, "is_connected", False):
+                return
+            _LOGGER.debug("ITag[%s] connect() start", self.mac)
+
+            # устройство от выбранного брокером сканера, иначе — какое даст HA
+            ble_device = self._target_device or bluetooth.async_ble_device_from_address(
+                self.hass, self.mac, connectable=True
+            )
+            source = self._target_source or self.last_source
+            self._target_device = self._target_source = None
+
+            if ble_device:
+                try:
+                    started = time.monotonic()
+                    self.client = await establish_connection(
+                        BleakClientWithServiceCache, ble_device, self.mac, timeout=CONNECT_TIMEOUT
+                    )
+                    established_in = time.monotonic() - started
+                    try:
+                        self.client.set_disconnected_callback(self._on_disconnected)  # type: ignore[attr-defined]
+                    except Exception:
+                        pass
+                    self._handles = self._resolve_handles()
+                    await self.client.start_notify(self._handles.button or UUID_BTN, self._cb_notify)        # type: ignore[attr-defined]
+
+                    # Сразу гасим Immediate Alert и применяем политику Link Loss (строго 0x1803)
+                    await self._write_immediate_alert(b"\x00")
+                    await self._apply_link_alert_policy()
+                    await self._start_battery_watch()
+
+                    self._start_keepalive()
+                    _LOGGER.debug("ITag[%s] connected + notify", self.mac)
+                    self.metrics.connected(time.monotonic(), established_in, False)
+                    if self.capture is not None:
+                        self.capture.connected(self.mac, source, established_in)
+                    self.connected_source = source
+                    self.last_connected_source = source
+                    self._slot_holder = self.client
+                    self._ready = True
+                    self._state_changed()
+                    self.signals.async_send(self.mac, SIGNAL_CONN)
+                    return
+                except BleakError as e:
+                    _LOGGER.debug("ITag[%s] manager connect failed: %s", self.mac, e)
+                    self.client = None
+                    self._handles = None
+                except asyncio.CancelledError:
+                    await self._async_abort_connect()
+                    raise
+
+            # Fallback: прямой Bleak без менеджера HA (не держим адаптер, если он раз за разом не помогает)
+            if (
+                self._direct_failures >= DIRECT_FALLBACK_MAX_FAILURES
+                and time.monotonic() < self._direct_retry_at
+            ):
+                _LOGGER.debug("ITag[%s] direct fallback disabled after %d failures", self.mac, self._direct_failures)
+                self.metrics.connect_failures += 1
+                return
+            self.metrics.fallback_attempts += 1
+            try:
+                started = time.monotonic()
+                # тот же класс с кэшем сервисов, что и у менеджера HA
+                direct = BleakClientWithServiceCache(self.mac, timeout=CONNECT_TIMEOUT)
+                await direct.__aenter__()
+                established_in = time.monotonic() - started
+                self.client = direct  # type: ignore[assignment]
+                try:
+                    self.client.set_disconnected_callback(self._on_disconnected)  # type: ignore[attr-defined]
+                except Exception:
+                    pass
+                self._handles = self._resolve_handles()
+                await self.client.start_notify(self._handles.button or UUID_BTN, self._cb_notify)          # type: ignore[attr-defined]
+
+                await self._write_immediate_alert(b"\x00")
+                await self._apply_link_alert_policy()
+                await self._start_battery_watch()
+
+                self._start_keepalive()
+                _LOGGER.debug("ITag[%s] connected (direct) + notify", self.mac)
+                self.metrics.connected(time.monotonic(), established_in, True)
+                if self.capture is not None:
+                    self.capture.connected(self.mac, None, established_in)
+                self.connected_source = None
+                self._slot_holder = self.client
+                self._direct_failures = 0
+                self._ready = True
+                self._state_changed()
+                self.signals.async_send(self.mac, SIGNAL_CONN)
+            except asyncio.CancelledError:
+                await self._async_abort_connect()
+                raise
+            except Exception as e:
+                _LOGGER.debug("ITag[%s] direct connect failed: %s", self.mac, e)
+                self.metrics.connect_failures += 1
+                self._direct_failures += 1
+                if self._direct_failures >= DIRECT_FALLBACK_MAX_FAILURES:
+                    self._direct_retry_at = time.monotonic() + DIRECT_FALLBACK_RETRY_AFTER
+                self.client = None
+                self._handles = None
+
+    async def _async_abort_connect(self) -> None:
+        """Попытку отменили (брокер забыл тег при выгрузке/перезагрузке) — соединение не оставляем."""
+        client, self.client = self.client, None
+        self._handles = None
+        self._ready = False
+        self._stop_keepalive()
+        if client is not None:
+            _LOGGER.debug("ITag[%s] connect cancelled, dropping the link", self.mac)
+            try:
+                await client.disconnect()  # type: ignore[attr-defined]
+            except Exception:
+                pass
+
+    async def disconnect(self):
+        _LOGGER.debug("ITag[%s] disconnect()", self.mac)
+        self._cancel_idle_disconnect()
+        self.gestures.cancel()
+        self._queue.cancel()
+        self._ready = False
+        self._stop_keepalive()
+        if self.client:
+            try:
+                await self._write_immediate_alert(b"\x00")
+            except Exception:
+                pass
+            try:
+                await self.client.stop_notify(UUID_BTN)  # type: ignore[attr-defined]
+            except Exception:
+                pass
+            try:
+                await self.client.disconnect()           # type: ignore[attr-defined]
+            except Exception:
+                try:
+                    await self.client.__aexit__(None, None, None)  # type: ignore[attr-defined]
+                except Exception:
+                    pass
+            self.client = None
+            self._handles = None
+        if self._broker is not None:
+            self._slot_holder = None
+            self._broker.async_forget(self.mac)
+
+    # -------- события / API --------
+    def _cb_notify(self, _handle, data: bytes):
+        now = self.last_activity = self.last_traffic = time.monotonic()
+        self.hass.loop.call_soon_threadsafe(self._on_button, bytes(data), now)
+
+    def _on_button(self, data: bytes, ts: float) -> None:
+        if self.capture is not None:
+            self.capture.notify(self.mac, data)
+        self.signals.async_send(self.mac, SIGNAL_BTN)
+        self.gestures.feed(data, ts)
+
+    def _on_gesture(self, gesture: str, meta: dict) -> None:
+        _LOGGER.debug("ITag[%s] gesture %s %s", self.mac, gesture, meta)
+        self.signals.async_send(self.mac, SIGNAL_GESTURE, gesture, meta)
+
+    async def beep(self, on: bool, level: bytes | None = None) -> bool:
+        """Писк (level — уровень Alert Level, по умолчанию BEEP_ON_VALUE); True, если запись прошла."""
+        if on:
+            payload = level or BEEP_ON_VALUE
+        else:
+            payload = BEEP_OFF_VALUE
+        # очередь сама подключится (если нужно) и повторит запись на новом соединении
+        ok = await self._queue.submit(SLOT_ALERT, payload)
+        if not ok:
+            _LOGGER.error("ITag[%s] Beep 失败: 设备未连接", self.mac)
+            return False
+        self._arm_idle_disconnect()
+        return True
+
+    def async_set_beeping(self, on: bool) -> None:
+        """Отметить, что тег пищит/перестал; переключатель Beep обновится по SIGNAL_BEEP."""
+        if self.beeping is not on:
+            self.beeping = on
+            self.signals.async_send(self.mac, SIGNAL_BEEP)
+
+    async def set_link_alert(self, enabled: bool):
+        """Включить/выключить писк при потере связи (строго 0x1803:2A06, с readback)."""
+        self._link_alert_enabled = enabled
+        level = 0x01 if enabled else 0x00
+        if self._ready and self._link_loss_level == level:
+            # уже записано на этом соединении
+            self._state_changed()
+            return
+        ok = await self._queue.submit(SLOT_LINK_LOSS, bytes([level]))
+        # Если устройство не подтвердило — считаем выключенным (безопасно)
+        if not ok and self.is_connected:
+            self._link_alert_enabled = False
+        self._state_changed()
+        self._arm_idle_disconnect()
+
+    async def _async_execute_write(self, slot: str, payload: bytes, low_priority: bool) -> bool:
+        """Исполнитель GattWriteQueue: одна запись, при необходимости — с подключением."""
+        if not self._ready:
+            if low_priority:
+                # keepalive имеет смысл только на живом соединении
+                return False
+            await self.connect()
+        # тот же замок, что и у connect(): запись не пересекается с настройкой соединения
+        async with self._connect_lock:
+            if not self._ready:
+                return False
+            if slot == SLOT_ALERT:
+                ok = await self._write_immediate_alert(payload)
+            else:
+                ok = await self._write_link_loss_exact(payload[0])
+                self._link_loss_level = payload[0] if ok else None
+            if ok and not low_priority:
+                # сам keepalive не откладывает следующий keepalive
+                self.last_traffic = self.last_activity
+            return ok
+
+    @property
+    def ready(self) -> bool:
+        """Соединение установлено и настроено (notify, политика)."""
+        return self._ready
+
+    @property
+    def link_alert_enabled(self) -> bool:
+        return self._link_alert_enabled
+
+    @property
+    def is_connected(self) -> bool:
+        return bool(self.client and getattr(self.client, "is_connected", False))
+
+    @property
+    def available(self) -> bool:
+        """Подключён или HA видит рекламу тега (см. async_track_unavailable)."""
+        return self.is_connected or self.advert_present
+
+    @property
+    def auto_reconnect(self) -> bool:
+        """Переподключать ли тег без запроса пользователя (брокер, по истории рекламы)."""
+        return self._adv_remove is not None and not self.advert_only
+
+    @property
+    def last_heard(self) -> float:
+        """Последняя реклама (monotonic) с учётом ADV, для которых колбэк не вызывался.
+
+        HA не зовёт колбэк, если в рекламе изменился только RSSI, поэтому last_seen
+        у неподвижного тега стоит на месте; история bluetooth-менеджера обновляется всегда.
+        """
+        info = bluetooth.async_last_service_info(self.hass, self.mac, connectable=False)
+        if info is None:
+            return self.last_seen
+        return max(self.last_seen, info.time)
+
+    @property
+    def last_active(self) -> float:
+        """Последняя реклама или обмен по GATT (monotonic)."""
+        return max(self.last_heard, self.last_activity)
+
+    @property
+    def last_seen_timestamp(self) -> float | None:
+        """Время последней рекламы (unix time)."""
+        heard = self.last_heard
+        if not heard:
+            return None
+        return time.time() - (time.monotonic() - heard)
+
+    @property
+    def write_queue_stats(self) -> dict:
+        return self._queue.stats
+
+    @property
+    def reconnect_state(self) -> str:
+        """connected / waiting_for_advert / backing_off / parked (см. broker.py)."""
+        if self._broker is None:
+            return "connected" if self.is_connected else "waiting_for_advert"
+        return self._broker.state(self.mac)
+
+    @property
+    def link_loss_supported(self) -> bool:
+        return not self._link_loss_missing
+
+    @property
+    def last_rssi(self) -> int | None:
+        """获取最后一次接收到的信号强度 (сглаженное)."""
+        return self.rssi.value
+
+    def async_subscribe_rssi(self, listener: Callable[[], None]) -> Callable[[], None]:
+        """Подписка на изменение сглаженного RSSI (вне мёртвой зоны) и на пропажу/возврат тега в эфире."""
+        self._rssi_listeners.append(listener)
+
+        def _unsub() -> None:
+            if listener in self._rssi_listeners:
+                self._rssi_listeners.remove(listener)
+
+        return _unsub
+
+    async def read_battery(self) -> Optional[int]:
+        if not self.client or not getattr(self.client, "is_connected", False):
+            await self.connect()
+        if not self.client or not getattr(self.client, "is_connected", False):
+            return None
+        handles = self._handles
+        target = handles.battery if handles is not None and handles.battery is not None else UUID_BATT
+        try:
+            v = await self.client.read_gatt_char(target)  # type: ignore[attr-defined]
+        except Exception:
+            if self.capture is not None:
+                self.capture.read(self.mac, False, 0)
+            raise
+        self.last_activity = self.last_traffic = time.monotonic()
+        if self.capture is not None:
+            self.capture.read(self.mac, bool(v), v[0] if v else 0)
+        self._arm_idle_disconnect()
+        if v and self.battery_manager is not None:
+            self.battery_manager.async_set(self.mac, int(v[0]))
+        return int(v[0]) if v else None
@@ -0,0 +1,46 @@
+from __future__ import annotations
+from typing import Any
+
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.core import HomeAssistant
+
+from . import DOMAIN
+
+async def async_get_config_entry_diagnostics(hass: HomeAssistant, entry: ConfigEntry) -> dict[str, Any]:
+    mac = entry.data["mac"].upper()
+    store = hass.data.get(DOMAIN, {})
+    broker = store.get("broker")
+    keepalive = store.get("keepalive")
+    warmup = store.get("warmup")
+    presence = store.get("presence")
+    capture = store.get("capture")
+    data = getattr(entry, "runtime_data", None)
+    client = data.client if data is not None else None
+    tag: dict[str, Any] | None = None
+    if client is not None:
+        tag = {
+            "connected": client.is_connected,
+            "reconnect_state": client.reconnect_state,
+            "available": client.available,
+            "advert_only": client.advert_only,
+            "last_source": client.last_source,
+            "connected_source": client.connected_source,
+            "scanner_rssi": client.scanner_rssi_by_name(),
+            "last_seen": client.last_seen_timestamp,
+            "rssi": client.last_rssi,
+            "rssi_samples": client.rssi.samples(),
+            "link_loss_supported": client.link_loss_supported,
+            "presence_home": client.presence_home,
+            "metrics": client.metrics.as_dict(),
+            "write_queue": client.write_queue_stats,
+        }
+    return {
+        "mac": mac,
+        "options": dict(entry.options),
+        "tag": tag,
+        "broker": broker.stats if broker is not None else None,
+        "keepalive": keepalive.stats if keepalive is not None else None,
+        "startup": warmup.stats if warmup is not None else None,
+        "presence": presence.stats if presence is not None else None,
+        "capture": capture.stats if capture is not None else None,
+    }
@@ -0,0 +1,45 @@
+from __future__ import annotations
+from typing import TYPE_CHECKING
+from homeassistant.components.event import EventEntity
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.helpers.entity import DeviceInfo
+
+from . import DOMAIN
+from .gesture import GESTURES
+from .signals import SIGNAL_GESTURE
+
+if TYPE_CHECKING:
+    from .coordinator import ITagClient
+
+async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry, async_add_entities):
+    mac = entry.data["mac"].upper()
+    client = entry.runtime_data.client
+    async_add_entities([ITagGesture(mac, client)])
+
+class ITagGesture(EventEntity):
+    """Жесты кнопки: single / double / triple / long_press (с задержкой в атрибутах)."""
+
+    _attr_should_poll = False
+    _attr_translation_key = "itag_gesture"
+    _attr_event_types = GESTURES
+
+    def __init__(self, mac: str, client: ITagClient):
+        self._mac = mac
+        self._client = client
+        self._attr_name = f"iTag Gesture {mac}"
+        self._attr_unique_id = f"itag_gesture_{mac.replace(':','_')}_v2"
+
+    async def async_added_to_hass(self):
+        self.async_on_remove(
+            self._client.signals.async_subscribe(self._mac, SIGNAL_GESTURE, self._on_gesture)
+        )
+
+    @callback
+    def _on_gesture(self, gesture: str, meta: dict):
+        self._trigger_event(gesture, meta)
+        self.async_write_ha_state()
+
+    @property
+    def device_info(self) -> DeviceInfo:
+        return DeviceInfo(identifiers={(DOMAIN, self._mac)}, name=f"iTag {self._mac}")
@@ -0,0 +1,62 @@
+from __future__ import annotations
+
+import logging
+from typing import Dict, Optional
+
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.helpers.storage import Store
+
+_LOGGER = logging.getLogger(__name__)
+
+STORAGE_VERSION = 1
+STORAGE_KEY = "itag_bt.gatt"
+SAVE_DELAY = 30  # сек
+
+# роли характеристик, которые запоминаем (handle или None — «у тега нет»)
+ROLES = ("alert", "link_loss", "button", "battery")
+
+
+class GattCache:
+    """Раскладка GATT (handle каждой нужной характеристики) по MAC, переживает перезапуск HA.
+
+    При переподключении характеристики берутся по handle за O(1) без обхода сервисов;
+    при ошибках записи запись тега сбрасывается.
+    """
+
+    def __init__(self, hass: HomeAssistant) -> None:
+        self.hass = hass
+        self._store: Store = Store(hass, STORAGE_VERSION, STORAGE_KEY)
+        self._data: Dict[str, Dict[str, Optional[int]]] = {}
+        self._pending = False
+
+    async def async_load(self) -> None:
+        data = await self._store.async_load()
+        if isinstance(data, dict):
+            self._data = data
+
+    def get(self, mac: str) -> Optional[Dict[str, Optional[int]]]:
+        return self._data.get(mac)
+
+    @callback
+    def async_set(self, mac: str, layout: Dict[str, Optional[int]]) -> None:
+        if self._data.get(mac) == layout:
+            return
+        self._data[mac] = layout
+        self._pending = True
+        self._store.async_delay_save(self._data_to_save, SAVE_DELAY)
+
+    @callback
+    def async_invalidate(self, mac: str) -> None:
+        if self._data.pop(mac, None) is not None:
+            _LOGGER.debug("ITag[%s] GATT cache invalidated", mac)
+            self._pending = True
+            self._store.async_delay_save(self._data_to_save, SAVE_DELAY)
+
+    def _data_to_save(self) -> Dict[str, Dict[str, Optional[int]]]:
+        self._pending = False
+        return self._data
+
+    async def async_flush(self) -> None:
+        """Записать отложенное сохранение сразу (выгрузка последней записи)."""
+        if self._pending:
+            await self._store.async_save(self._data_to_save())
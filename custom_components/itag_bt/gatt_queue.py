@@ -0,0 +1,105 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+from typing import Any, Dict, List, Optional
+
+_LOGGER = logging.getLogger(__name__)
+
+# Слоты записи (одна ожидающая команда на слот)
+SLOT_ALERT = "alert"          # Immediate Alert 2A06: писк / keepalive 0x00
+SLOT_LINK_LOSS = "link_loss"  # FFE2: политика Link Loss
+
+# повторов после разрыва (на новом соединении)
+MAX_RETRIES = 2
+
+
+class _Pending:
+    __slots__ = ("payload", "futures", "low", "retries")
+
+    def __init__(self, payload: bytes, fut: asyncio.Future, low: bool) -> None:
+        self.payload = payload
+        self.futures: List[asyncio.Future] = [fut]
+        self.low = low
+        self.retries = 0
+
+
+class GattWriteQueue:
+    """Очередь записей GATT одного тега: одна запись за раз, слияние по слотам.
+
+    Ожидающая запись в слот заменяется новой (последняя побеждает), а keepalive
+    (low priority) поглощается любой ожидающей командой и сам её не вытесняет.
+    Если запись оборвала соединение, команда повторяется на новом соединении.
+    """
+
+    def __init__(self, client: Any) -> None:
+        self._client = client
+        self._pending: Dict[str, _Pending] = {}
+        self._task: Optional[asyncio.Task] = None
+        # диагностика
+        self.submitted = 0
+        self.coalesced = 0
+        self.retried = 0
+
+    def submit(self, slot: str, payload: bytes, low_priority: bool = False) -> asyncio.Future:
+        """Поставить запись; future -> True, если запись прошла."""
+        loop = self._client.hass.loop
+        fut = loop.create_future()
+        self.submitted += 1
+        pending = self._pending.get(slot)
+        if pending is None:
+            self._pending[slot] = _Pending(payload, fut, low_priority)
+        else:
+            self.coalesced += 1
+            pending.futures.append(fut)
+            if not low_priority:
+                pending.payload = payload
+                pending.low = False
+        if self._task is None or self._task.done():
+            self._task = self._client.hass.async_create_background_task(
+                self._async_run(), f"itag_bt gatt {self._client.mac}"
+            )
+        return fut
+
+    def cancel(self) -> None:
+        """Выгрузка: ожидающие команды завершаются с False."""
+        for pending in self._pending.values():
+            for fut in pending.futures:
+                if not fut.done():
+                    fut.set_result(False)
+        self._pending.clear()
+
+    async def _async_run(self) -> None:
+        client = self._client
+        while self._pending:
+            slot = next(iter(self._pending))
+            pending = self._pending.pop(slot)
+            try:
+                ok = await client._async_execute_write(slot, pending.payload, pending.low)
+            except Exception as e:
+                _LOGGER.debug("ITag[%s] queued write %s failed: %s", client.mac, slot, e)
+                ok = False
+            if (
+                not ok
+                and not pending.low
+                and not client.ready
+                and pending.retries < MAX_RETRIES
+                and slot not in self._pending
+            ):
+                # соединение оборвалось — повторить на новом, а не терять команду
+                pending.retries += 1
+                self.retried += 1
+                self._pending[slot] = pending
+                continue
+            for fut in pending.futures:
+                if not fut.done():
+                    fut.set_result(ok)
+
+    @property
+    def stats(self) -> Dict[str, int]:
+        return {
+            "pending": len(self._pending),
+            "submitted": self.submitted,
+            "coalesced": self.coalesced,
+            "retried": self.retried,
+        }
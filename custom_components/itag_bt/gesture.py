@@ -0,0 +1,88 @@
+from __future__ import annotations
+
+import asyncio
+import time
+from typing import Callable, Dict, Optional
+
+GESTURE_SINGLE = "single"
+GESTURE_DOUBLE = "double"
+GESTURE_TRIPLE = "triple"
+GESTURE_LONG = "long_press"
+GESTURES = [GESTURE_SINGLE, GESTURE_DOUBLE, GESTURE_TRIPLE, GESTURE_LONG]
+
+_BY_COUNT = {1: GESTURE_SINGLE, 2: GESTURE_DOUBLE, 3: GESTURE_TRIPLE}
+
+# часть клонов при удержании шлёт в FFE1 не 0x01, а 0x02
+LONG_PRESS_CODE = 0x02
+# окно между нажатиями одной серии (опция записи, см. __init__.py)
+DEFAULT_WINDOW = 0.4  # сек
+
+GestureListener = Callable[[str, Dict[str, int]], None]
+
+
+class GestureDecoder:
+    """Автомат жестов кнопки по меткам времени уведомлений FFE1.
+
+    На каждое уведомление — O(1): один таймер окна серии, старый отменяется.
+    """
+
+    __slots__ = ("_loop", "_emit", "window", "_count", "_first", "_last", "_timer")
+
+    def __init__(
+        self,
+        loop: asyncio.AbstractEventLoop,
+        emit: GestureListener,
+        window: float = DEFAULT_WINDOW,
+    ) -> None:
+        self._loop = loop
+        self._emit = emit
+        self.window = window
+        self._count = 0
+        self._first = 0.0
+        self._last = 0.0
+        self._timer: Optional[asyncio.TimerHandle] = None
+
+    def feed(self, data: bytes, ts: float) -> None:
+        """Уведомление кнопки; ts — time.monotonic() момента прихода."""
+        if data and data[0] == LONG_PRESS_CODE:
+            # удержание завершает текущую серию и сообщается сразу
+            self._flush()
+            self._emit(GESTURE_LONG, self._meta(1, ts, ts))
+            return
+        if self._count == 0:
+            self._first = ts
+        self._count += 1
+        self._last = ts
+        if self._count >= 3:
+            self._flush()
+            return
+        if self._timer is not None:
+            self._timer.cancel()
+        self._timer = self._loop.call_later(self.window, self._flush)
+
+    def _flush(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        count = self._count
+        if not count:
+            return
+        self._count = 0
+        self._emit(_BY_COUNT[count], self._meta(count, self._first, self._last))
+
+    @staticmethod
+    def _meta(presses: int, first: float, last: float) -> Dict[str, int]:
+        now = time.monotonic()
+        return {
+            "presses": presses,
+            # от первого нажатия серии до события
+            "latency_ms": int((now - first) * 1000),
+            # от последнего уведомления до события (ожидание окна)
+            "decode_ms": int((now - last) * 1000),
+        }
+
+    def cancel(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        self._count = 0
@@ -0,0 +1,120 @@
+from __future__ import annotations
+
+import asyncio
+import heapq
+import itertools
+import logging
+import random
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+from homeassistant.core import HomeAssistant, callback
+
+_LOGGER = logging.getLogger(__name__)
+
+# дедлайны, наступающие в этом окне, обрабатываются за одно пробуждение
+_BATCH_WINDOW = 0.05
+
+
+class KeepaliveScheduler:
+    """Единый keepalive для всех тегов: куча дедлайнов и один таймер.
+
+    Запись 0x00 в Immediate Alert пропускается, если тег недавно и так
+    общался по GATT (кнопка, батарея, писк) или пищит прямо сейчас — такие записи
+    считаются сэкономленными.
+    """
+
+    def __init__(self, hass: HomeAssistant) -> None:
+        self.hass = hass
+        self._heap: List[Tuple[float, int, str]] = []
+        self._clients: Dict[str, Any] = {}
+        self._seq: Dict[str, int] = {}
+        self._counter = itertools.count()
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._timer_at = float("inf")
+        self.writes = 0
+        self.writes_saved = 0
+
+    @callback
+    def async_add(self, client: Any) -> None:
+        """Поставить тег в расписание (повторный вызов перепланирует его)."""
+        mac = client.mac
+        seq = next(self._counter)
+        self._clients[mac] = client
+        self._seq[mac] = seq
+        # случайная фаза в пределах интервала — теги не пишут в один момент
+        delay = client.keepalive_interval * random.uniform(0.1, 1.0)
+        self._push(time.monotonic() + delay, seq, mac)
+        self._arm()
+
+    @callback
+    def async_remove(self, mac: str) -> None:
+        # запись в куче остаётся, но с устаревшим seq и будет пропущена
+        self._clients.pop(mac, None)
+        self._seq.pop(mac, None)
+
+    @callback
+    def async_shutdown(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+        self._timer = None
+        self._timer_at = float("inf")
+        self._heap.clear()
+        self._clients.clear()
+        self._seq.clear()
+
+    @property
+    def stats(self) -> Dict[str, int]:
+        return {
+            "tags": len(self._clients),
+            "writes": self.writes,
+            "writes_saved": self.writes_saved,
+        }
+
+    def _push(self, deadline: float, seq: int, mac: str) -> None:
+        heapq.heappush(self._heap, (deadline, seq, mac))
+
+    def _arm(self) -> None:
+        if not self._heap:
+            return
+        at = self._heap[0][0]
+        if self._timer is not None:
+            if at >= self._timer_at:
+                return
+            self._timer.cancel()
+        self._timer_at = at
+        self._timer = self.hass.loop.call_later(max(0.0, at - time.monotonic()), self._async_fire)
+
+    @callback
+    def _async_fire(self) -> None:
+        self._timer = None
+        self._timer_at = float("inf")
+        now = time.monotonic()
+        heap = self._heap
+        while heap and heap[0][0] <= now + _BATCH_WINDOW:
+            _, seq, mac = heapq.heappop(heap)
+            if self._seq.get(mac) != seq:
+                continue
+            client = self._clients[mac]
+            if not client.is_connected:
+                self.async_remove(mac)
+                continue
+            interval = client.keepalive_interval
+            if client.beeping:
+                # 0x00 в Immediate Alert заглушил бы идущий писк (переключатель, beep_group)
+                self.writes_saved += 1
+                self._push(now + interval, seq, mac)
+                continue
+            # только «чужой» трафик: last_activity обновляет и сама запись keepalive
+            last = client.last_traffic
+            if now - last < interval:
+                # тег недавно был активен — keepalive не нужен
+                self.writes_saved += 1
+                self._push(max(last + interval, now + 1.0), seq, mac)
+                continue
+            self.writes += 1
+            self.hass.async_create_background_task(
+                client.async_keepalive(), f"itag_bt keepalive {mac}"
+            )
+            self._push(now + interval, seq, mac)
+        self._arm()
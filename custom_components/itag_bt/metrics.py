@@ -0,0 +1,127 @@
+from __future__ import annotations
+
+import time
+from array import array
+from bisect import bisect_right
+from typing import Any, Dict
+
+# верхние границы корзин гистограммы, мс (последняя корзина — «больше»)
+BUCKETS_MS = (10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000, 15000)
+
+
+class Histogram:
+    """Гистограмма задержек на заранее выделенном array — без аллокаций на событие."""
+
+    __slots__ = ("counts", "count", "total_ms", "max_ms", "last_ms")
+
+    def __init__(self) -> None:
+        self.counts = array("L", bytes(array("L").itemsize * (len(BUCKETS_MS) + 1)))
+        self.count = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+        self.last_ms = 0.0
+
+    def observe(self, seconds: float) -> None:
+        ms = seconds * 1000.0
+        self.counts[bisect_right(BUCKETS_MS, ms)] += 1
+        self.count += 1
+        self.total_ms += ms
+        self.last_ms = ms
+        if ms > self.max_ms:
+            self.max_ms = ms
+
+    def as_dict(self) -> Dict[str, Any]:
+        labels = [f"<={b}" for b in BUCKETS_MS] + [f">{BUCKETS_MS[-1]}"]
+        return {
+            "count": self.count,
+            "avg_ms": round(self.total_ms / self.count, 1) if self.count else None,
+            "max_ms": round(self.max_ms, 1),
+            "last_ms": round(self.last_ms, 1),
+            "buckets": dict(zip(labels, self.counts.tolist())),
+        }
+
+
+class TagMetrics:
+    """Счётчики жизненного цикла соединения одного тега."""
+
+    __slots__ = (
+        "connects", "connect_failures", "reconnects", "disconnects",
+        "fallback_attempts", "fallback_connects",
+        "writes", "write_failures", "keepalive_writes", "connects_coalesced",
+        "advert_to_connect", "establish", "write_latency",
+        "_advert_pending", "_disconnected_since", "disconnected_total",
+    )
+
+    def __init__(self) -> None:
+        self.connects = 0
+        self.connect_failures = 0
+        self.reconnects = 0
+        self.disconnects = 0
+        self.fallback_attempts = 0
+        self.fallback_connects = 0
+        self.writes = 0
+        self.write_failures = 0
+        self.keepalive_writes = 0
+        # вызовы connect()/задачи, обслуженные уже идущей (или только что неудачной) попыткой
+        self.connects_coalesced = 0
+        self.advert_to_connect = Histogram()
+        self.establish = Histogram()
+        self.write_latency = Histogram()
+        self._advert_pending = 0.0
+        self._disconnected_since = time.monotonic()
+        self.disconnected_total = 0.0
+
+    def advert_while_disconnected(self, now: float) -> None:
+        if not self._advert_pending:
+            self._advert_pending = now
+
+    def connected(self, now: float, established_in: float, fallback: bool) -> None:
+        if self.connects:
+            self.reconnects += 1
+        self.connects += 1
+        if fallback:
+            self.fallback_connects += 1
+        self.establish.observe(established_in)
+        if self._advert_pending:
+            self.advert_to_connect.observe(now - self._advert_pending)
+            self._advert_pending = 0.0
+        if self._disconnected_since:
+            self.disconnected_total += now - self._disconnected_since
+            self._disconnected_since = 0.0
+
+    def disconnected(self, now: float) -> None:
+        self.disconnects += 1
+        if not self._disconnected_since:
+            self._disconnected_since = now
+
+    def write(self, seconds: float, ok: bool) -> None:
+        self.writes += 1
+        if ok:
+            self.write_latency.observe(seconds)
+        else:
+            self.write_failures += 1
+
+    def time_disconnected(self, now: float) -> float:
+        if self._disconnected_since:
+            return self.disconnected_total + now - self._disconnected_since
+        return self.disconnected_total
+
+    def as_dict(self) -> Dict[str, Any]:
+        attempts = self.connects + self.connect_failures
+        return {
+            "connects": self.connects,
+            "connect_failures": self.connect_failures,
+            "reconnects": self.reconnects,
+            "disconnects": self.disconnects,
+            "fallback_attempts": self.fallback_attempts,
+            "fallback_connects": self.fallback_connects,
+            "fallback_rate": round(self.fallback_attempts / attempts, 3) if attempts else None,
+            "writes": self.writes,
+            "write_failures": self.write_failures,
+            "keepalive_writes": self.keepalive_writes,
+            "connects_coalesced": self.connects_coalesced,
+            "time_disconnected_s": round(self.time_disconnected(time.monotonic()), 1),
+            "advert_to_connect": self.advert_to_connect.as_dict(),
+            "establish_connection": self.establish.as_dict(),
+            "gatt_write": self.write_latency.as_dict(),
+        }
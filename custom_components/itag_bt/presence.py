@@ -0,0 +1,197 @@
+from __future__ import annotations
+
+import asyncio
+import heapq
+import logging
+import math
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from homeassistant.core import HomeAssistant, callback
+
+from .signals import SIGNAL_CONN, SIGNAL_PRESENCE, TagSignals
+
+_LOGGER = logging.getLogger(__name__)
+
+# дедлайны округляются вверх до этого шага: теги с близкими дедлайнами проверяются за одно пробуждение
+PRESENCE_RESOLUTION = 5.0
+# «вернулся»: столько ADV в пределах окна (или подключение) — одиночный ADV издалека не считается
+HOME_CONFIRM_ADVERTS = 2
+HOME_CONFIRM_WINDOW = 30.0
+# ушедший тег: ADV с прежним содержимым колбэк не вызывают, поэтому история HA
+# проверяется с этим шагом (вдвое чаще окна — два свежих ADV успевают подтвердить возврат)
+AWAY_RECHECK = HOME_CONFIRM_WINDOW / 2
+
+
+class _Tag:
+    __slots__ = ("client", "seq", "confirm_at", "confirm_count", "heard", "unsub")
+
+    def __init__(self, client: Any, seq: int, unsub: Callable[[], None]) -> None:
+        self.client = client
+        self.seq = seq
+        self.confirm_at = 0.0
+        self.confirm_count = 0
+        # последний уже засчитанный ADV (monotonic) — один ADV не считается дважды
+        self.heard = 0.0
+        self.unsub = unsub
+
+
+class PresenceEngine:
+    """Дома/ушёл для всех тегов: одна куча дедлайнов «последний ADV + consider_away» и один таймер.
+
+    Разрыв GATT сам по себе присутствие не меняет — решает только отсутствие рекламы
+    дольше consider_away. Пока тег дома, ADV не трогает кучу: дедлайн сверяется с
+    client.last_heard (история bluetooth-менеджера HA) при срабатывании и переносится,
+    если тег был слышен. Ушедшие теги перепроверяются раз в AWAY_RECHECK.
+    """
+
+    def __init__(self, hass: HomeAssistant, signals: TagSignals) -> None:
+        self.hass = hass
+        self._signals = signals
+        self._heap: List[Tuple[float, int, str]] = []
+        self._tags: Dict[str, _Tag] = {}
+        self._seq = 0
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._timer_at = float("inf")
+        # диагностика
+        self.wakeups = 0
+        self.transitions = 0
+
+    # -------- теги --------
+    @callback
+    def async_add(self, client: Any) -> None:
+        old = self._tags.pop(client.mac, None)
+        if old is not None:
+            old.unsub()
+        self._seq += 1
+        unsub = self._signals.async_subscribe(client.mac, SIGNAL_CONN, lambda: self._async_connected(client.mac))
+        self._tags[client.mac] = _Tag(client, self._seq, unsub)
+        client.presence = self
+        client.presence_home = None
+        # до первого решения ждём полный consider_away от сохранённого last_seen (или от старта)
+        now = time.monotonic()
+        self._push(max(client.last_heard, now) + client.consider_away, self._seq, client.mac)
+        self._arm()
+
+    @callback
+    def async_remove(self, mac: str) -> None:
+        # запись в куче остаётся, но с устаревшим seq и будет пропущена
+        tag = self._tags.pop(mac, None)
+        if tag is not None:
+            tag.unsub()
+            tag.client.presence = None
+
+    @callback
+    def async_shutdown(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+        self._timer = None
+        self._timer_at = float("inf")
+        self._heap.clear()
+        for tag in self._tags.values():
+            tag.unsub()
+        self._tags.clear()
+
+    def is_home(self, mac: str) -> Optional[bool]:
+        tag = self._tags.get(mac)
+        return tag.client.presence_home if tag is not None else None
+
+    @property
+    def stats(self) -> Dict[str, Any]:
+        home = sum(1 for t in self._tags.values() if t.client.presence_home)
+        return {
+            "tags": len(self._tags),
+            "home": home,
+            "heap": len(self._heap),
+            "wakeups": self.wakeups,
+            "transitions": self.transitions,
+        }
+
+    # -------- входы --------
+    @callback
+    def async_advert(self, client: Any, now: float) -> None:
+        """ADV тега, который не считается «дома» (клиент вызывает только в этом случае)."""
+        tag = self._tags.get(client.mac)
+        if tag is None or now <= tag.heard:
+            return
+        tag.heard = now
+        if now - tag.confirm_at > HOME_CONFIRM_WINDOW:
+            tag.confirm_at = now
+            tag.confirm_count = 0
+        tag.confirm_count += 1
+        if tag.confirm_count >= HOME_CONFIRM_ADVERTS:
+            self._set(tag, True, now)
+
+    @callback
+    def _async_connected(self, mac: str) -> None:
+        tag = self._tags.get(mac)
+        if tag is not None and not tag.client.presence_home:
+            self._set(tag, True, time.monotonic())
+
+    # -------- переходы --------
+    def _set(self, tag: _Tag, home: bool, now: float) -> None:
+        client = tag.client
+        changed = client.presence_home is not home
+        client.presence_home = home
+        tag.confirm_count = 0
+        if home:
+            # новый дедлайн — с новым seq, старые записи в куче отпадут
+            self._seq += 1
+            tag.seq = self._seq
+            self._push(now + client.consider_away, tag.seq, client.mac)
+            self._arm()
+        if changed:
+            self.transitions += 1
+            _LOGGER.debug("ITag[%s] presence -> %s", client.mac, "home" if home else "away")
+            self._signals.async_send(client.mac, SIGNAL_PRESENCE, home)
+
+    # -------- куча --------
+    def _push(self, deadline: float, seq: int, mac: str) -> None:
+        deadline = math.ceil(deadline / PRESENCE_RESOLUTION) * PRESENCE_RESOLUTION
+        heapq.heappush(self._heap, (deadline, seq, mac))
+
+    def _arm(self) -> None:
+        if not self._heap:
+            return
+        at = self._heap[0][0]
+        if self._timer is not None:
+            if at >= self._timer_at:
+                return
+            self._timer.cancel()
+        self._timer_at = at
+        self._timer = self.hass.loop.call_later(max(0.0, at - time.monotonic()), self._async_fire)
+
+    @callback
+    def _async_fire(self) -> None:
+        self._timer = None
+        self._timer_at = float("inf")
+        self.wakeups += 1
+        now = time.monotonic()
+        heap = self._heap
+        while heap and heap[0][0] <= now:
+            _, seq, mac = heapq.heappop(heap)
+            tag = self._tags.get(mac)
+            if tag is None or tag.seq != seq:
+                continue
+            client = tag.client
+            if client.is_connected:
+                self._set(tag, True, now)
+                continue
+            heard = client.last_heard
+            if client.presence_home is False:
+                if now - heard < AWAY_RECHECK:
+                    self.async_advert(client, heard)
+                if client.presence_home is False:
+                    self._push(now + AWAY_RECHECK, seq, mac)
+                continue
+            deadline = heard + client.consider_away
+            if deadline > now:
+                # тег был слышен — перенести проверку
+                if client.presence_home is None:
+                    self._set(tag, True, now)
+                else:
+                    self._push(deadline, seq, mac)
+                continue
+            self._set(tag, False, now)
+            self._push(now + AWAY_RECHECK, seq, mac)
+        self._arm()
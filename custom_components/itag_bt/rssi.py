@@ -0,0 +1,71 @@
+from __future__ import annotations
+
+from array import array
+from typing import List, Optional
+
+RSSI_WINDOW = 16       # размер кольцевого буфера (последние ADV)
+RSSI_ALPHA = 0.3       # коэффициент EWMA
+DEFAULT_RSSI_DEADBAND = 2.0  # dBm
+
+
+class RssiTracker:
+    """Сырые RSSI в кольцевом буфере (array) + EWMA с мёртвой зоной публикации."""
+
+    __slots__ = ("_buf", "_pos", "_count", "_ewma", "_published", "alpha", "deadband")
+
+    def __init__(
+        self,
+        size: int = RSSI_WINDOW,
+        alpha: float = RSSI_ALPHA,
+        deadband: float = DEFAULT_RSSI_DEADBAND,
+    ) -> None:
+        self._buf = array("b", bytes(size))
+        self._pos = 0
+        self._count = 0
+        self._ewma: Optional[float] = None
+        self._published: Optional[int] = None
+        self.alpha = alpha
+        self.deadband = deadband
+
+    def add(self, rssi: int) -> bool:
+        """Добавить отсчёт; True — если публикуемое значение изменилось."""
+        if rssi < -128:
+            rssi = -128
+        elif rssi > 127:
+            rssi = 127
+        buf = self._buf
+        buf[self._pos] = rssi
+        self._pos = (self._pos + 1) % len(buf)
+        if self._count < len(buf):
+            self._count += 1
+        ewma = self._ewma
+        ewma = rssi if ewma is None else ewma + self.alpha * (rssi - ewma)
+        self._ewma = ewma
+        published = self._published
+        if published is None or abs(ewma - published) >= self.deadband:
+            self._published = round(ewma)
+            return True
+        return False
+
+    def seed(self, value: int) -> None:
+        """Начальное значение (из сохранённого состояния) — без отсчёта в буфере."""
+        if self._ewma is None:
+            self._ewma = float(value)
+            self._published = value
+
+    @property
+    def value(self) -> Optional[int]:
+        return self._published
+
+    @property
+    def last(self) -> Optional[int]:
+        if not self._count:
+            return None
+        return self._buf[self._pos - 1]
+
+    def samples(self) -> List[int]:
+        """Отсчёты от старых к новым (для диагностики)."""
+        size = len(self._buf)
+        if self._count < size:
+            return self._buf[: self._count].tolist()
+        return (self._buf[self._pos:] + self._buf[: self._pos]).tolist()
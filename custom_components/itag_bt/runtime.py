@@ -0,0 +1,127 @@
+from __future__ import annotations
+
+import asyncio
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Any, Dict
+
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.core import HomeAssistant
+
+from . import (
+    CONF_ADVERT_ONLY,
+    CONF_BATTERY_MAX_AGE,
+    CONF_BUS_EVENTS,
+    CONF_CAPTURE,
+    CONF_CONSIDER_AWAY,
+    CONF_KEEPALIVE_INTERVAL,
+    CONF_MULTI_PRESS_WINDOW,
+    CONF_RSSI_DEADBAND,
+    CONF_STARTUP_ORDER,
+    DEFAULT_BATTERY_MAX_AGE,
+    DEFAULT_CONSIDER_AWAY,
+    DEFAULT_KEEPALIVE_INTERVAL,
+    DEFAULT_MULTI_PRESS_WINDOW,
+    DEFAULT_RSSI_DEADBAND,
+    DOMAIN,
+)
+
+if TYPE_CHECKING:
+    from .coordinator import ITagClient
+
+
+@dataclass
+class ITagRuntimeData:
+    """entry.runtime_data: клиент записи и общие объекты домена (hass.data[DOMAIN])."""
+
+    client: ITagClient
+    shared: Dict[str, Any]
+
+
+async def async_get_shared(hass: HomeAssistant) -> Dict[str, Any]:
+    """Общие объекты домена: создаются первой записью, хранилища читаются один раз."""
+    from .advert import AdvertDispatcher
+    from .battery import BatteryManager
+    from .broker import ConnectionBroker
+    from .gatt_cache import GattCache
+    from .keepalive import KeepaliveScheduler
+    from .presence import PresenceEngine
+    from .signals import TagSignals
+    from .state_store import TagStateStore
+    from .warmup import WarmupQueue
+
+    store = hass.data.setdefault(DOMAIN, {})
+    store.setdefault("clients", {})
+    if "adverts" not in store:
+        # один приёмник рекламы на весь домен
+        store["adverts"] = AdvertDispatcher(hass)
+    if "keepalive" not in store:
+        store["keepalive"] = KeepaliveScheduler(hass)
+    if "broker" not in store:
+        store["broker"] = ConnectionBroker(hass)
+    if "warmup" not in store:
+        store["warmup"] = WarmupQueue(hass, store["broker"])
+    if "signals" not in store:
+        store["signals"] = TagSignals(hass)
+    if "presence" not in store:
+        store["presence"] = PresenceEngine(hass, store["signals"])
+    if "battery" not in store:
+        store["battery"] = BatteryManager(hass)
+        store["gatt"] = GattCache(hass)
+        store["state"] = TagStateStore(hass)
+        # хранилища читаются один раз на домен, параллельно
+        store["loaded"] = hass.async_create_task(_async_load_stores(store))
+    await store["loaded"]
+    return store
+
+
+async def _async_load_stores(store: Dict[str, Any]) -> None:
+    await asyncio.gather(
+        store["battery"].async_load(), store["gatt"].async_load(), store["state"].async_load()
+    )
+
+
+def create_client(hass: HomeAssistant, entry: ConfigEntry, store: Dict[str, Any]) -> ITagClient:
+    """Единственное место, где создаётся ITagClient (платформы берут его из runtime_data)."""
+    # coordinator тянет за собой только модули интеграции; bleak импортируется при первом connect()
+    from .coordinator import ITagClient
+
+    mac = entry.data["mac"].upper()
+    clients: Dict[str, Any] = store["clients"]
+    client = clients.get(mac)
+    if client is None:
+        interval = entry.options.get(CONF_KEEPALIVE_INTERVAL, DEFAULT_KEEPALIVE_INTERVAL)
+        client = clients[mac] = ITagClient(hass, mac, store["keepalive"], interval, store["broker"])
+        record = store["state"].get(mac)
+        if record is not None:
+            # политика Link Alert, RSSI, last_seen — до первого ADV/подключения
+            client.restore_state(record)
+    client.battery_manager = store["battery"]
+    client.signals = store["signals"]
+    client.gatt_cache = store["gatt"]
+    client.state_store = store["state"]
+    store["battery"].async_register(client)
+    store["state"].async_register(client)
+    apply_options(client, entry, store)
+    return client
+
+
+def apply_options(client: ITagClient, entry: ConfigEntry, store: Dict[str, Any]) -> None:
+    """Параметры записи -> клиент (при настройке и при изменении без перезагрузки)."""
+    options = entry.options
+    client.keepalive_interval = options.get(CONF_KEEPALIVE_INTERVAL, DEFAULT_KEEPALIVE_INTERVAL)
+    client.advert_only = options.get(CONF_ADVERT_ONLY, False)
+    client.rssi.deadband = options.get(CONF_RSSI_DEADBAND, DEFAULT_RSSI_DEADBAND)
+    client.battery_max_age = options.get(CONF_BATTERY_MAX_AGE, DEFAULT_BATTERY_MAX_AGE) * 3600.0
+    client.gestures.window = options.get(CONF_MULTI_PRESS_WINDOW, DEFAULT_MULTI_PRESS_WINDOW) / 1000
+    client.startup_order = options.get(CONF_STARTUP_ORDER, 0)
+    client.consider_away = options.get(CONF_CONSIDER_AWAY, DEFAULT_CONSIDER_AWAY)
+    store["signals"].async_set_bus_bridge(client.mac, options.get(CONF_BUS_EVENTS, False))
+    if options.get(CONF_CAPTURE, False):
+        if "capture" not in store:
+            from .capture import TrafficCapture
+
+            # один файл на все теги, у которых включена запись
+            store["capture"] = TrafficCapture(client.hass)
+        client.capture = store["capture"]
+    else:
+        client.capture = None
@@ -0,0 +1,133 @@
+from __future__ import annotations
+import time
+from typing import TYPE_CHECKING
+from homeassistant.components.sensor import SensorEntity, SensorStateClass
+from homeassistant.const import PERCENTAGE, EntityCategory
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.core import callback
+from homeassistant.helpers.entity import DeviceInfo
+
+from . import DOMAIN
+
+if TYPE_CHECKING:
+    from .coordinator import ITagClient
+
+async def async_setup_entry(hass, entry: ConfigEntry, async_add_entities):
+    mac = entry.data["mac"].upper()
+    client = entry.runtime_data.client
+    async_add_entities([
+        ITagBattery(mac, client),
+        ITagRssi(mac, client),
+        *(ITagMetricSensor(mac, client, key) for key in METRIC_SENSORS),
+    ])
+
+class ITagBattery(SensorEntity):
+    """Значение из кэша BatteryManager; само по себе BLE не трогает."""
+
+    _attr_name = "iTag Battery"
+    _attr_native_unit_of_measurement = PERCENTAGE
+    _attr_should_poll = False
+
+    def __init__(self, mac: str, client: ITagClient):
+        self._mac = mac
+        self._client = client
+        self._attr_unique_id = f"itag_batt_{mac.replace(':','_')}_v2"
+        self._read_at = None
+
+    @property
+    def device_info(self) -> DeviceInfo:
+        return DeviceInfo(
+            identifiers={(DOMAIN, self._mac)},
+            name=f"iTag {self._mac}",
+        )
+
+    async def async_added_to_hass(self):
+        manager = self._client.battery_manager
+        if manager is None:
+            return
+        self._attr_native_value, self._read_at = manager.get(self._mac)
+        self.async_on_remove(manager.async_subscribe(self._mac, self._on_battery))
+
+    @property
+    def extra_state_attributes(self):
+        return {"last_read": self._read_at}
+
+    @callback
+    def _on_battery(self):
+        self._attr_native_value, self._read_at = self._client.battery_manager.get(self._mac)
+        self.async_write_ha_state()
+
+#下面全部ai添加的信号功能
+class ITagRssi(SensorEntity):
+    """RSSI по рекламе: push от клиента, когда сглаженное значение или RSSI одного из сканеров вышли из мёртвой зоны."""
+
+    _attr_name = "iTag RSSI"
+    _attr_native_unit_of_measurement = "dBm"
+    _attr_should_poll = False
+
+    def __init__(self, mac: str, client: ITagClient):
+        self._mac = mac
+        self._client = client
+        self._attr_unique_id = f"itag_rssi_{mac.replace(':','_')}_v2"
+        self._attr_native_value = client.last_rssi
+
+    @property
+    def device_info(self) -> DeviceInfo:
+        return DeviceInfo(
+            identifiers={(DOMAIN, self._mac)},
+            name=f"iTag {self._mac}",
+        )
+
+    @property
+    def available(self) -> bool:
+        # доступность по рекламе (async_track_unavailable в клиенте) — и в режиме «только реклама»
+        return self._client.is_connected or self._client.advert_present
+
+    @property
+    def extra_state_attributes(self):
+        return {
+            "last_seen": self._client.last_seen_timestamp,
+            # RSSI по каждому адаптеру/прокси — грубая локализация по комнатам
+            "scanners": self._client.scanner_rssi_by_name(),
+        }
+
+    async def async_added_to_hass(self):
+        self.async_on_remove(self._client.async_subscribe_rssi(self._on_rssi))
+
+    @callback
+    def _on_rssi(self):
+        self._attr_native_value = self._client.last_rssi
+        self.async_write_ha_state()
+
+# Диагностика соединения (по умолчанию выключены): ключ -> (название, единица, значение)
+METRIC_SENSORS = {
+    "reconnects": ("Reconnects", None, lambda m: m.reconnects),
+    "write_failures": ("GATT Write Failures", None, lambda m: m.write_failures),
+    "connect_time": ("Connect Time", "ms", lambda m: round(m.establish.last_ms) if m.establish.count else None),
+    "time_disconnected": ("Time Disconnected", "s", lambda m: round(m.time_disconnected(time.monotonic()))),
+}
+
+class ITagMetricSensor(SensorEntity):
+    _attr_entity_category = EntityCategory.DIAGNOSTIC
+    _attr_entity_registry_enabled_default = False
+    _attr_should_poll = True
+
+    def __init__(self, mac: str, client: ITagClient, key: str):
+        self._mac = mac
+        self._client = client
+        name, unit, self._value = METRIC_SENSORS[key]
+        self._attr_name = f"iTag {name}"
+        self._attr_native_unit_of_measurement = unit
+        self._attr_unique_id = f"itag_{key}_{mac.replace(':','_')}_v2"
+        if unit is None:
+            self._attr_state_class = SensorStateClass.TOTAL_INCREASING
+
+    @property
+    def device_info(self) -> DeviceInfo:
+        return DeviceInfo(
+            identifiers={(DOMAIN, self._mac)},
+            name=f"iTag {self._mac}",
+        )
+
+    async def async_update(self):
+        self._attr_native_value = self._value(self._client.metrics)
@@ -0,0 +1,237 @@
+from __future__ import annotations
+
+import asyncio
+import itertools
+import logging
+import os
+import time
+from typing import Any, Dict, List, Optional
+
+import voluptuous as vol
+
+from homeassistant.core import HomeAssistant, ServiceCall, ServiceResponse, SupportsResponse, callback
+from homeassistant.components import bluetooth
+from homeassistant.exceptions import HomeAssistantError
+import homeassistant.helpers.config_validation as cv
+
+from . import DOMAIN
+
+_LOGGER = logging.getLogger(__name__)
+
+SERVICE_BEEP_GROUP = "beep_group"
+SERVICE_REPLAY_CAPTURE = "replay_capture"
+
+ATTR_TAGS = "tags"
+ATTR_DURATION = "duration"
+ATTR_PATTERN = "pattern"
+ATTR_FILE = "file"
+ATTR_SPEED = "speed"
+
+# continuous — уровень 0x01 (как переключатель Beep), high — 0x02, pulse — 0x01 вкл/выкл раз в PULSE_PERIOD
+PATTERN_CONTINUOUS = "continuous"
+PATTERN_HIGH = "high"
+PATTERN_PULSE = "pulse"
+PATTERNS = [PATTERN_CONTINUOUS, PATTERN_HIGH, PATTERN_PULSE]
+_PATTERN_LEVEL = {PATTERN_CONTINUOUS: b"\x01", PATTERN_HIGH: b"\x02", PATTERN_PULSE: b"\x01"}
+
+DEFAULT_DURATION = 10  # сек
+PULSE_PERIOD = 1.0     # сек
+# одновременно запускаемых писков; подключения дополнительно ограничивает брокер
+GROUP_CONCURRENCY = 8
+
+# Результат по тегу
+RESULT_BEEPING = "beeping"
+RESULT_NOT_IN_RANGE = "not_in_range"
+RESULT_FAILED = "failed"
+RESULT_UNKNOWN = "unknown_tag"
+
+BEEP_GROUP_SCHEMA = vol.Schema(
+    {
+        vol.Optional(ATTR_TAGS): vol.All(cv.ensure_list, [cv.string]),
+        vol.Optional(ATTR_DURATION, default=DEFAULT_DURATION): vol.All(
+            vol.Coerce(float), vol.Range(min=1, max=300)
+        ),
+        vol.Optional(ATTR_PATTERN, default=PATTERN_CONTINUOUS): vol.In(PATTERNS),
+    }
+)
+
+# файл — только имя внутри <config>/itag_bt_capture (capture.bin, capture.bin.1, ...)
+REPLAY_CAPTURE_SCHEMA = vol.Schema(
+    {
+        vol.Optional(ATTR_FILE, default="capture.bin"): cv.string,
+        vol.Optional(ATTR_SPEED, default=0): vol.All(vol.Coerce(float), vol.Range(min=0, max=100)),
+    }
+)
+
+
+class _Group:
+    """Одна группа писка: общий таймер выключения (и пульса) для всех её тегов."""
+
+    __slots__ = ("group_id", "level", "pulse", "until", "clients", "on", "timer")
+
+    def __init__(self, group_id: int, level: bytes, pulse: bool, until: float) -> None:
+        self.group_id = group_id
+        self.level = level
+        self.pulse = pulse
+        self.until = until
+        self.clients: List[Any] = []
+        self.on = True
+        self.timer: Optional[asyncio.TimerHandle] = None
+
+
+class GroupBeeper:
+    """«Найти все»: писк группы тегов с ограниченным параллелизмом и одним таймером на группу.
+
+    Уже подключённые теги пищат сразу, остальные подключаются через брокер как срочные;
+    теги, которых нет в эфире, не ждут 15 с таймаута, а сразу попадают в not_in_range.
+    Тег принадлежит последней запустившей его группе — старая группа его не выключит.
+    """
+
+    def __init__(self, hass: HomeAssistant) -> None:
+        self.hass = hass
+        self._ids = itertools.count(1)
+        self._owner: Dict[str, int] = {}
+        self._groups: Dict[int, _Group] = {}
+        # диагностика
+        self.runs = 0
+        self.last_run_s: Optional[float] = None
+
+    async def async_beep(
+        self, clients: List[Any], duration: float, pattern: str
+    ) -> Dict[str, Dict[str, Any]]:
+        started = time.monotonic()
+        self.runs += 1
+        group = _Group(next(self._ids), _PATTERN_LEVEL[pattern], pattern == PATTERN_PULSE, started + duration)
+        self._groups[group.group_id] = group
+        results: Dict[str, Dict[str, Any]] = {}
+        sem = asyncio.Semaphore(GROUP_CONCURRENCY)
+
+        async def _one(client: Any) -> None:
+            mac = client.mac
+            if not client.is_connected and not bluetooth.async_address_present(
+                self.hass, mac, connectable=True
+            ):
+                results[mac] = {"result": RESULT_NOT_IN_RANGE}
+                return
+            async with sem:
+                t0 = time.monotonic()
+                was_connected = client.is_connected
+                ok = await client.beep(True, group.level)
+            if not ok:
+                results[mac] = {"result": RESULT_FAILED}
+                return
+            self._owner[mac] = group.group_id
+            group.clients.append(client)
+            client.async_set_beeping(True)
+            results[mac] = {
+                "result": RESULT_BEEPING,
+                "connected": was_connected,
+                "latency_s": round(time.monotonic() - t0, 2),
+            }
+
+        # подключённые — первыми: их писк не ждёт слотов брокера
+        order = sorted(clients, key=lambda c: not c.is_connected)
+        await asyncio.gather(*(_one(c) for c in order))
+        self.last_run_s = time.monotonic() - started
+
+        if group.clients:
+            self._arm(group)
+        else:
+            self._groups.pop(group.group_id, None)
+        return results
+
+    def _arm(self, group: _Group) -> None:
+        now = time.monotonic()
+        at = min(now + PULSE_PERIOD, group.until) if group.pulse else group.until
+        group.timer = self.hass.loop.call_later(max(0.0, at - now), self._async_tick, group)
+
+    @callback
+    def _async_tick(self, group: _Group) -> None:
+        group.timer = None
+        owned = [c for c in group.clients if self._owner.get(c.mac) == group.group_id]
+        if not owned or time.monotonic() >= group.until:
+            self._groups.pop(group.group_id, None)
+            for client in owned:
+                self._owner.pop(client.mac, None)
+                client.async_set_beeping(False)
+            self._submit(group, owned, False)
+            return
+        group.clients = owned
+        group.on = not group.on
+        self._submit(group, owned, group.on)
+        self._arm(group)
+
+    def _submit(self, group: _Group, clients: List[Any], on: bool) -> None:
+        for client in clients:
+            self.hass.async_create_background_task(
+                self._async_write(group, client, on), f"itag_bt beep_group {client.mac}"
+            )
+
+    async def _async_write(self, group: _Group, client: Any, on: bool) -> None:
+        if await client.beep(on, group.level):
+            return
+        # тег пропал — убрать из группы: иначе пульс раз в секунду шёл бы срочным
+        # подключением в обход backoff брокера и ошибкой в журнале
+        if client in group.clients:
+            group.clients.remove(client)
+        if self._owner.get(client.mac) == group.group_id:
+            self._owner.pop(client.mac, None)
+            client.async_set_beeping(False)
+
+    @callback
+    def async_shutdown(self) -> None:
+        for group in self._groups.values():
+            if group.timer is not None:
+                group.timer.cancel()
+        self._groups.clear()
+        self._owner.clear()
+
+
+@callback
+def async_setup_services(hass: HomeAssistant) -> None:
+    """Сервисы домена (регистрируются один раз в async_setup)."""
+
+    async def _async_beep_group(call: ServiceCall) -> ServiceResponse:
+        store = hass.data.get(DOMAIN, {})
+        clients: Dict[str, Any] = store.get("clients", {})
+        wanted = [mac.upper() for mac in call.data.get(ATTR_TAGS) or clients]
+        results: Dict[str, Dict[str, Any]] = {
+            mac: {"result": RESULT_UNKNOWN} for mac in wanted if mac not in clients
+        }
+        targets = [clients[mac] for mac in dict.fromkeys(wanted) if mac in clients]
+        if targets:
+            beeper = store.get("group_beep")
+            if beeper is None:
+                beeper = store["group_beep"] = GroupBeeper(hass)
+            results.update(
+                await beeper.async_beep(targets, call.data[ATTR_DURATION], call.data[ATTR_PATTERN])
+            )
+        _LOGGER.debug("beep_group: %s", results)
+        return {"tags": results}
+
+    async def _async_replay_capture(call: ServiceCall) -> ServiceResponse:
+        from .capture import CAPTURE_DIR, async_replay
+
+        path = hass.config.path(CAPTURE_DIR, os.path.basename(call.data[ATTR_FILE]))
+        if not await hass.async_add_executor_job(os.path.isfile, path):
+            raise HomeAssistantError(f"Capture file not found: {path}")
+        clients: Dict[str, Any] = hass.data.get(DOMAIN, {}).get("clients", {})
+        try:
+            return await async_replay(hass, path, clients, call.data[ATTR_SPEED])
+        except (OSError, ValueError) as e:
+            raise HomeAssistantError(str(e)) from e
+
+    hass.services.async_register(
+        DOMAIN,
+        SERVICE_BEEP_GROUP,
+        _async_beep_group,
+        schema=BEEP_GROUP_SCHEMA,
+        supports_response=SupportsResponse.OPTIONAL,
+    )
+    hass.services.async_register(
+        DOMAIN,
+        SERVICE_REPLAY_CAPTURE,
+        _async_replay_capture,
+        schema=REPLAY_CAPTURE_SCHEMA,
+        supports_response=SupportsResponse.ONLY,
+    )
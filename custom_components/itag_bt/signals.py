@@ -0,0 +1,70 @@
+from __future__ import annotations
+
+from typing import Any, Callable, Dict, List
+
+from homeassistant.core import HomeAssistant, callback
+
+# Сигналы тега (и имена событий на шине HA при включённом мосте: <signal>_<MAC>)
+SIGNAL_BTN  = "itag_bt_button"
+SIGNAL_CONN = "itag_bt_connected"
+SIGNAL_DISC = "itag_bt_disconnected"
+SIGNAL_GESTURE = "itag_bt_gesture"
+SIGNAL_PRESENCE = "itag_bt_presence"
+# только внутри интеграции (на шину не мостится): писк включён/выключен — для переключателя Beep
+SIGNAL_BEEP = "itag_bt_beep"
+
+SignalListener = Callable[..., None]
+
+
+class TagSignals:
+    """Реестр подписчиков событий тегов по MAC — без глобальной шины HA.
+
+    Мост на шину (для автоматизаций на itag_bt_button_<MAC> и т.п.) включается
+    явно для каждого тега; имена событий готовятся один раз при включении.
+    """
+
+    def __init__(self, hass: HomeAssistant) -> None:
+        self.hass = hass
+        self._subs: Dict[str, Dict[str, List[SignalListener]]] = {}
+        self._bridge: Dict[str, Dict[str, str]] = {}
+
+    @callback
+    def async_subscribe(self, mac: str, signal: str, listener: SignalListener) -> Callable[[], None]:
+        listeners = self._subs.setdefault(mac, {}).setdefault(signal, [])
+        listeners.append(listener)
+
+        @callback
+        def _unsub() -> None:
+            if listener in listeners:
+                listeners.remove(listener)
+
+        return _unsub
+
+    @callback
+    def async_send(self, mac: str, signal: str, *args: Any) -> None:
+        subs = self._subs.get(mac)
+        if subs is not None:
+            for listener in subs.get(signal, ()):
+                listener(*args)
+        bridge = self._bridge.get(mac)
+        event = bridge.get(signal) if bridge is not None else None
+        if event is not None:
+            if signal == SIGNAL_GESTURE:
+                # (жест, метаданные) -> данные события
+                self.hass.bus.async_fire(event, {"type": args[0], **args[1]})
+            elif signal == SIGNAL_PRESENCE:
+                self.hass.bus.async_fire(event, {"home": args[0]})
+            else:
+                self.hass.bus.async_fire(event)
+
+    @callback
+    def async_set_bus_bridge(self, mac: str, enabled: bool) -> None:
+        if enabled:
+            self._bridge[mac] = {s: f"{s}_{mac}" for s in (SIGNAL_BTN, SIGNAL_CONN, SIGNAL_DISC, SIGNAL_GESTURE, SIGNAL_PRESENCE)}
+        else:
+            self._bridge.pop(mac, None)
+
+    @callback
+    def async_forget(self, mac: str) -> None:
+        self._subs.pop(mac, None)
+        self._bridge.pop(mac, None)
@@ -0,0 +1,86 @@
+from __future__ import annotations
+
+import logging
+from typing import Any, Dict, List, Optional
+
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.helpers.storage import Store
+
+_LOGGER = logging.getLogger(__name__)
+
+STORAGE_VERSION = 1
+STORAGE_KEY = "itag_bt.state"
+SAVE_DELAY = 60  # сек: изменения всех тегов за это окно пишутся одним сохранением
+
+# Запись тега — список (компактно в .storage):
+# [link_alert 0/1, rssi, last_seen (unix), last_source, last_connected_source, найденные характеристики]
+# Характеристики — битовая маска по gatt_cache.ROLES; None — тег ещё не подключался.
+F_LINK_ALERT = 0
+F_RSSI = 1
+F_LAST_SEEN = 2
+F_LAST_SOURCE = 3
+F_CONNECTED_SOURCE = 4
+F_CHARACTERISTICS = 5
+RECORD_LEN = 6
+
+
+class TagStateStore:
+    """Последнее известное состояние тегов между перезапусками HA (Store, один файл на домен).
+
+    Сущности показывают значения сразу после старта, без BLE. Значения не копируются
+    на каждом ADV: клиент лишь отмечает «есть изменения», а снимок всех тегов
+    снимается в момент отложенного сохранения. Батарея и раскладка GATT хранятся
+    в battery.py и gatt_cache.py.
+    """
+
+    def __init__(self, hass: HomeAssistant) -> None:
+        self.hass = hass
+        self._store: Store = Store(hass, STORAGE_VERSION, STORAGE_KEY)
+        self._data: Dict[str, List[Any]] = {}
+        self._clients: Dict[str, Any] = {}
+        self._pending = False
+        # диагностика
+        self.saves = 0
+
+    async def async_load(self) -> None:
+        data = await self._store.async_load()
+        if isinstance(data, dict):
+            self._data = {
+                mac: list(rec) for mac, rec in data.items() if isinstance(rec, list) and len(rec) == RECORD_LEN
+            }
+
+    def get(self, mac: str) -> Optional[List[Any]]:
+        return self._data.get(mac)
+
+    @callback
+    def async_register(self, client: Any) -> None:
+        self._clients[client.mac] = client
+
+    @callback
+    def async_unregister(self, mac: str) -> None:
+        client = self._clients.pop(mac, None)
+        if client is not None:
+            # последний снимок остаётся в файле
+            self._data[mac] = client.state_snapshot()
+            self.async_mark_dirty()
+
+    @callback
+    def async_mark_dirty(self) -> None:
+        # повторный async_delay_save перезапускает таймер — при частых ADV сохранение
+        # откладывалось бы бесконечно, поэтому ставим его только один раз
+        if self._pending:
+            return
+        self._pending = True
+        self._store.async_delay_save(self._data_to_save, SAVE_DELAY)
+
+    def _data_to_save(self) -> Dict[str, List[Any]]:
+        self._pending = False
+        self.saves += 1
+        for mac, client in self._clients.items():
+            self._data[mac] = client.state_snapshot()
+        return self._data
+
+    async def async_flush(self) -> None:
+        """Записать отложенное сохранение сразу (выгрузка последней записи)."""
+        if self._pending:
+            await self._store.async_save(self._data_to_save())
@@ -1,30 +1,32 @@
 from __future__ import annotations
+from typing import TYPE_CHECKING
 from homeassistant.components.switch import SwitchEntity
 from homeassistant.config_entries import ConfigEntry
+from homeassistant.core import callback
 from homeassistant.helpers.entity import DeviceInfo
 
 from . import DOMAIN
-from .coordinator import ITagClient
+from .signals import SIGNAL_BEEP
+
+if TYPE_CHECKING:
+    from .coordinator import ITagClient
 
 async def async_setup_entry(hass, entry: ConfigEntry, async_add_entities):
     mac = entry.data["mac"].upper()
-    store = hass.data[DOMAIN]
-    clients = store.setdefault("clients", {})
-    client: ITagClient | None = clients.get(mac)
-    if client is None:
-        client = clients[mac] = ITagClient(hass, mac)
+    client = entry.runtime_data.client
     async_add_entities([
         ITagBeepSwitch(mac, client),
         ITagLinkAlertSwitch(mac, client),
     ])
 
 class ITagBeepSwitch(SwitchEntity):
-    """Немедленный писк (Immediate Alert / 0x1802:2A06)."""
+    """Немедленный писк (Immediate Alert / 0x1802:2A06); включается и сервисом beep_group."""
+
+    _attr_should_poll = False
 
     def __init__(self, mac: str, client: ITagClient):
         self._mac = mac
         self._client = client
-        self._state = False
         self._attr_name = f"iTag Beep {mac}"
         self._attr_unique_id = f"itag_beep_{mac.replace(':','_')}_v2"
 
@@ -35,19 +37,28 @@ class ITagBeepSwitch(SwitchEntity):
             name=f"iTag {self._mac}",
         )
 
+    async def async_added_to_hass(self):
+        self.async_on_remove(
+            self._client.signals.async_subscribe(self._mac, SIGNAL_BEEP, self._on_beep)
+        )
+
+    @callback
+    def _on_beep(self):
+        self.async_write_ha_state()
+
     async def async_turn_on(self, **kwargs):
         await self._client.beep(True)
-        self._state = True
+        self._client.async_set_beeping(True)
         self.async_write_ha_state()
 
     async def async_turn_off(self, **kwargs):
         await self._client.beep(False)
-        self._state = False
+        self._client.async_set_beeping(False)
         self.async_write_ha_state()
 
     @property
     def is_on(self) -> bool:
-        return self._state
+        return self._client.beeping
 
 class ITagLinkAlertSwitch(SwitchEntity):
     """Писк при потере связи (Link Loss / 0x1803:2A06, write-with-response + readback)."""
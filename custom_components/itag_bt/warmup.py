@@ -0,0 +1,110 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+import time
+from typing import Any, Dict, Optional
+
+from homeassistant.const import EVENT_HOMEASSISTANT_STARTED
+from homeassistant.core import CoreState, HomeAssistant, callback
+from homeassistant.components import bluetooth
+
+_LOGGER = logging.getLogger(__name__)
+
+# сколько тегов прогревается одновременно (брокер дополнительно ограничивает попытки)
+WARMUP_CONCURRENCY = 2
+# если HA уже запущен (добавили/перезагрузили записи) — собрать пачку записей
+WARMUP_DEBOUNCE = 1.0
+
+
+class WarmupQueue:
+    """Фоновое подключение тегов после старта HA вместо connect() в async_added_to_hass.
+
+    Порядок: опция «порядок запуска», затем недавно активные, затем сильный RSSI.
+    """
+
+    def __init__(self, hass: HomeAssistant, broker: Any) -> None:
+        self.hass = hass
+        self._broker = broker
+        self._clients: Dict[str, Any] = {}
+        self._scheduled = False
+        self._task: Optional[asyncio.Task] = None
+        # диагностика
+        self.setup_time = 0.0          # сколько async_setup_entry держали загрузку HA
+        self.warmup_time: Optional[float] = None  # старт прогрева -> весь парк обработан
+        self.warmed = 0
+        self.connected = 0
+
+    @callback
+    def async_add(self, client: Any) -> None:
+        client.warmup_pending = True
+        self._clients[client.mac] = client
+        if self._scheduled:
+            return
+        self._scheduled = True
+        if self.hass.state is CoreState.running:
+            self.hass.loop.call_later(WARMUP_DEBOUNCE, self._async_kick)
+        else:
+            self.hass.bus.async_listen_once(EVENT_HOMEASSISTANT_STARTED, self._async_kick)
+
+    @callback
+    def async_remove(self, mac: str) -> None:
+        client = self._clients.pop(mac, None)
+        if client is not None:
+            client.warmup_pending = False
+
+    @callback
+    def async_shutdown(self) -> None:
+        if self._task is not None and not self._task.done():
+            self._task.cancel()
+        self._clients.clear()
+
+    @callback
+    def _async_kick(self, _event=None) -> None:
+        self._scheduled = False
+        clients, self._clients = self._clients, {}
+        self._task = self.hass.async_create_background_task(
+            self._async_run(clients), "itag_bt warmup"
+        )
+
+    async def _async_run(self, clients: Dict[str, Any]) -> None:
+        started = time.monotonic()
+        order = sorted(
+            clients.values(),
+            key=lambda c: (
+                c.startup_order,
+                -c.last_active,
+                -(c.last_rssi if c.last_rssi is not None else -127),
+            ),
+        )
+        sem = asyncio.Semaphore(WARMUP_CONCURRENCY)
+
+        async def _warm(client: Any) -> None:
+            async with sem:
+                client.warmup_pending = False
+                if client.advert_only or client.is_connected:
+                    return
+                # не видно в эфире — подключится по первой свежей рекламе
+                if not bluetooth.async_address_present(self.hass, client.mac, connectable=True):
+                    return
+                self.warmed += 1
+                if await self._broker.async_connect(client, urgent=False):
+                    self.connected += 1
+
+        # Semaphore FIFO: теги занимают слоты в порядке сортировки
+        await asyncio.gather(*(_warm(c) for c in order))
+        self.warmup_time = time.monotonic() - started
+        _LOGGER.debug(
+            "warm-up: %d tags, %d tried, %d connected in %.1fs",
+            len(order), self.warmed, self.connected, self.warmup_time,
+        )
+
+    @property
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "setup_time_s": round(self.setup_time, 3),
+            "warmup_time_s": round(self.warmup_time, 1) if self.warmup_time is not None else None,
+            "pending": len(self._clients),
+            "warmed": self.warmed,
+            "connected": self.connected,
+        }
@@ -0,0 +1,101 @@
+"""Общая обвязка бенчмарков: настоящий HomeAssistant во временном каталоге + fakes.py.
+
+Скрипты запускаются напрямую: python tests/benchmarks/bench_<имя>.py
+"""
+from __future__ import annotations
+
+import asyncio
+import inspect
+import logging
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Iterable, List, Sequence
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from fakes import FakeFleet  # noqa: E402,F401
+
+from homeassistant import bootstrap, loader  # noqa: E402
+from homeassistant.config_entries import SOURCE_USER, ConfigEntries, ConfigEntry  # noqa: E402
+from homeassistant.core import HomeAssistant  # noqa: E402
+
+DOMAIN = "itag_bt"
+
+
+def run(main: Callable[[HomeAssistant], Awaitable[Any]]) -> Any:
+    """Выполнить main(hass) на свежем цикле и остановить ядро."""
+
+    async def _wrapper() -> Any:
+        with tempfile.TemporaryDirectory() as config_dir:
+            hass = HomeAssistant(config_dir)
+            try:
+                return await main(hass)
+            finally:
+                await hass.async_stop(force=True)
+
+    return asyncio.run(_wrapper())
+
+
+async def async_setup_ha(hass: HomeAssistant) -> None:
+    """Поднять загрузчик, реестры и ConfigEntries, как bootstrap HA.
+
+    custom_components.itag_bt находится через sys.path (корень репозитория, см. fakes.py);
+    bluetooth помечен загруженным — его API подменяет FakeFleet.
+    """
+    # предупреждение HA о непроверенной custom-интеграции
+    logging.getLogger("homeassistant.loader").setLevel(logging.ERROR)
+    loader.async_setup(hass)
+    hass.config_entries = ConfigEntries(hass, {})
+    await bootstrap.async_load_base_functionality(hass)
+    hass.config.components.add("bluetooth")
+
+
+async def async_add_entry(hass: HomeAssistant, address: str, **options: Any) -> ConfigEntry:
+    """Добавить настоящую запись itag_bt: HA вызовет async_setup_entry и пробросит платформы."""
+    kwargs = dict(
+        version=1,
+        minor_version=1,
+        domain=DOMAIN,
+        title=f"iTag {address}",
+        data={"mac": address},
+        source=SOURCE_USER,
+        options=options,
+        unique_id=address,
+    )
+    # с 2024.10 ConfigEntry требует discovery_keys
+    if "discovery_keys" in inspect.signature(ConfigEntry).parameters:
+        kwargs["discovery_keys"] = {}
+    entry = ConfigEntry(**kwargs)
+    await hass.config_entries.async_add(entry)
+    return entry
+
+
+def mac(i: int) -> str:
+    return f"AA:BB:CC:{i >> 16 & 0xFF:02X}:{i >> 8 & 0xFF:02X}:{i & 0xFF:02X}"
+
+
+def percentile(values: Sequence[float], q: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+def table(header: Iterable[str], rows: List[Iterable[Any]]) -> None:
+    header = list(header)
+    cells = [[str(c) for c in row] for row in rows]
+    widths = [max(len(h), *(len(r[i]) for r in cells)) for i, h in enumerate(header)]
+    print("  ".join(h.rjust(w) for h, w in zip(header, widths)))
+    for row in cells:
+        print("  ".join(c.rjust(w) for c, w in zip(row, widths)))
+
+
+async def wait_until(predicate: Callable[[], bool], timeout: float, step: float = 0.005) -> float:
+    """Ждать predicate(); вернуть прошедшее время (или timeout, если не дождались)."""
+    started = time.perf_counter()
+    while not predicate():
+        elapsed = time.perf_counter() - started
+        if elapsed >= timeout:
+            return timeout
+        await asyncio.sleep(step)
+    return time.perf_counter() - started
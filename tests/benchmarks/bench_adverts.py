@@ -0,0 +1,72 @@
+"""Стоимость одного ADV на цикле событий при росте числа тегов (advert.py + ITagClient._on_advert).
+
+Каждый ADV проходит тот же путь, что и в HA: колбэк диспетчера домена -> dict по MAC ->
+_on_advert клиента (RSSI-фильтр, слушатели). Время на ADV должно оставаться плоским:
+от числа тегов зависит только размер словаря.
+"""
+from __future__ import annotations
+
+import random
+import time
+
+from _harness import FakeFleet, mac, run, table
+
+from custom_components.itag_bt.advert import AdvertDispatcher
+from custom_components.itag_bt.coordinator import ITagClient
+
+SIZES = (10, 100, 1000)
+ADVERTS = 50_000
+
+
+class _Advert:
+    __slots__ = ("address", "rssi", "source", "time")
+
+    def __init__(self, address: str, rssi: int) -> None:
+        self.address = address
+        self.rssi = rssi
+        self.source = "hci0"
+        self.time = time.monotonic()
+
+
+async def _measure(hass, count: int) -> tuple:
+    fleet = FakeFleet(hass).install()
+    try:
+        dispatcher = AdvertDispatcher(hass)
+        clients = []
+        published = [0]
+
+        def _listener() -> None:
+            published[0] += 1
+
+        for i in range(count):
+            tag = fleet.add_tag(mac(i))
+            fleet.advertise(tag.mac)
+            client = ITagClient(hass, tag.mac)
+            client.advert_only = True
+            client.async_subscribe_rssi(_listener)
+            client.start_advert_watch(dispatcher)
+            clients.append(client)
+        # чужие устройства отсекает матчер HA по адресу — сюда попадают только наши теги
+        rng = random.Random(count)
+        adverts = [_Advert(mac(rng.randrange(count)), rng.randint(-90, -40)) for _ in range(ADVERTS)]
+        on_advert = dispatcher._async_on_advert
+        started = time.perf_counter()
+        for advert in adverts:
+            on_advert(advert, None)
+        elapsed = time.perf_counter() - started
+        for client in clients:
+            client.stop_advert_watch()
+        dispatcher.async_shutdown()
+        return count, round(elapsed / ADVERTS * 1e6, 2), published[0]
+    finally:
+        fleet.uninstall()
+
+
+async def main(hass) -> None:
+    rows = [await _measure(hass, count) for count in SIZES]
+    print(f"ADV через диспетчер домена ({ADVERTS} ADV на размер)")
+    table(("tags", "us/advert", "published"), rows)
+
+
+if __name__ == "__main__":
+    run(main)
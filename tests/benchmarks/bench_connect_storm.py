@@ -0,0 +1,110 @@
+"""Массовый разрыв: сходимость переподключения, число задач и память на тег.
+
+N брелков (по DEFAULT_SLOTS_PER_SOURCE на прокси) подключаются через брокер, затем
+fleet.drop_all() рвёт все соединения разом (перезагрузка адаптера). Каждый тег
+«флапает» — несколько свежих ADV подряд, — и параллельно его дёргают вызывающие
+connect() (писк, батарея, кнопка). Меряются время до полного переподключения,
+созданные за шторм задачи, сэкономленные задачи (connects_coalesced) и память
+на тег (tracemalloc) при росте парка.
+"""
+from __future__ import annotations
+
+import asyncio
+import time
+import tracemalloc
+
+from _harness import FakeFleet, run, table, wait_until
+
+from custom_components.itag_bt import broker as broker_mod
+from custom_components.itag_bt.advert import AdvertDispatcher
+from custom_components.itag_bt.broker import ConnectionBroker
+from custom_components.itag_bt.coordinator import ITagClient
+
+SIZES = (10, 50, 200)
+FLAP_ADVERTS = 3
+CALLERS_PER_TAG = 5
+CONNECT_LATENCY = 0.02
+CONVERGE_TIMEOUT = 60.0
+
+
+def _counting_task_factory(loop: asyncio.AbstractEventLoop, counter: list):
+    def _factory(loop_, coro, **kwargs):
+        counter[0] += 1
+        return asyncio.Task(coro, loop=loop_, **kwargs)
+
+    loop.set_task_factory(_factory)
+
+
+def _storm(count: int):
+    async def _main(hass) -> tuple:
+        sources = [f"proxy-{i}" for i in range(-(-count // broker_mod.DEFAULT_SLOTS_PER_SOURCE))]
+        fleet = FakeFleet(hass, count, connect_latency=CONNECT_LATENCY, sources=sources).install()
+        try:
+            tracemalloc.start()
+            before = tracemalloc.take_snapshot()
+            broker = ConnectionBroker(hass)
+            dispatcher = AdvertDispatcher(hass)
+            clients = [ITagClient(hass, tag.mac, broker=broker) for tag in fleet.tags.values()]
+            for client in clients:
+                client.start_advert_watch(dispatcher)
+            for tag in fleet.tags.values():
+                fleet.advertise(tag.mac)
+            first = await wait_until(lambda: all(c.is_connected for c in clients), CONVERGE_TIMEOUT)
+            per_tag = sum(
+                stat.size_diff for stat in tracemalloc.take_snapshot().compare_to(before, "filename")
+            ) / count
+            tracemalloc.stop()
+
+            tasks = [0]
+            _counting_task_factory(hass.loop, tasks)
+            coalesced_before = sum(c.metrics.connects_coalesced for c in clients)
+            fleet.drop_all()
+            await asyncio.sleep(0)
+            callers = []
+            for _ in range(FLAP_ADVERTS):
+                for tag in fleet.tags.values():
+                    fleet.advertise_changed(tag.mac)
+            for client in clients:
+                callers.extend(client.connect() for _ in range(CALLERS_PER_TAG))
+            started = time.perf_counter()
+            results = await asyncio.gather(*callers)
+            await wait_until(lambda: all(c.is_connected for c in clients), CONVERGE_TIMEOUT)
+            reconnect = time.perf_counter() - started
+            converged = all(c.is_connected for c in clients)
+            hass.loop.set_task_factory(None)
+            # задачи самого gather() выше — не интеграции
+            spawned = tasks[0] - len(callers)
+            coalesced = sum(c.metrics.connects_coalesced for c in clients) - coalesced_before
+
+            for client in clients:
+                client.stop_advert_watch()
+                await client.disconnect()
+            dispatcher.async_shutdown()
+            return (
+                count,
+                round(first, 2),
+                round(reconnect, 2) if converged else "timeout",
+                f"{sum(results)}/{len(results)}",
+                spawned,
+                coalesced,
+                round(per_tag / 1024, 1),
+            )
+        finally:
+            fleet.uninstall()
+
+    return _main
+
+
+def main() -> None:
+    print(
+        f"Шторм переподключений: {FLAP_ADVERTS} ADV и {CALLERS_PER_TAG} вызовов connect() на тег, "
+        f"establish_connection {CONNECT_LATENCY * 1000:.0f} мс"
+    )
+    table(
+        ("tags", "first s", "reconnect s", "callers ok", "tasks", "coalesced", "KiB/tag"),
+        [run(_storm(count)) for count in SIZES],
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,151 @@
+"""Задержка нажатия: _cb_notify -> async_write_ha_state настоящих сущностей.
+
+Запись настраивается через hass.config_entries (как в bench_startup.py), сущности —
+кнопка (ITagButton) и жесты (ITagGesture) из платформ интеграции. Подаётся
+удержание (0x02): и кнопка, и жест срабатывают сразу, без окна серии.
+Секундомер останавливается на входе в async_write_ha_state каждой сущности.
+
+«signals» — сущности подписаны на TagSignals (signals.py), как сейчас;
+«bus» — подписки сущностей сняты, включён мост и те же обработчики слушают
+itag_bt_button_<MAC> / itag_bt_gesture_<MAC> через hass.bus.async_listen,
+как было до signals.py.
+"""
+from __future__ import annotations
+
+import asyncio
+import time
+
+from _harness import DOMAIN, FakeFleet, async_add_entry, async_setup_ha, percentile, run, table
+
+from homeassistant.core import callback
+from homeassistant.helpers.entity_platform import async_get_platforms
+
+from custom_components.itag_bt.binary_sensor import ITagButton
+from custom_components.itag_bt.event import ITagGesture
+from custom_components.itag_bt.signals import SIGNAL_BTN, SIGNAL_GESTURE
+
+MAC = "AA:BB:CC:00:00:01"
+PRESSES = 5_000
+LONG_PRESS = b"\x02"
+
+
+def _entity(hass, kind: type):
+    for platform in async_get_platforms(hass, DOMAIN):
+        for entity in platform.entities.values():
+            if isinstance(entity, kind):
+                return entity
+    raise LookupError(kind.__name__)
+
+
+class _Stopwatch:
+    """Останавливается в async_write_ha_state сущности; снимается с экземпляра в close()."""
+
+    def __init__(self, entity) -> None:
+        self.entity = entity
+        self.started = 0.0
+        self.latencies: list = []
+        self.done = asyncio.Event()
+        write = entity.async_write_ha_state
+
+        @callback
+        def _write() -> None:
+            if self.started:
+                self.latencies.append(time.perf_counter() - self.started)
+                self.started = 0.0
+                self.done.set()
+            write()
+
+        entity.async_write_ha_state = _write
+
+    def arm(self, now: float) -> None:
+        self.started = now
+        self.done.clear()
+
+    def close(self) -> None:
+        del self.entity.async_write_ha_state
+
+
+async def _presses(client, button: ITagButton, watches: list) -> None:
+    for _ in range(PRESSES):
+        now = time.perf_counter()
+        for watch in watches:
+            watch.arm(now)
+        # уведомление bleak приходит не из цикла HA — тот же call_soon_threadsafe
+        client._cb_notify(None, LONG_PRESS)
+        for watch in watches:
+            await watch.done.wait()
+        # гасим импульс сразу, чтобы следующее нажатие снова писало состояние
+        if button._off_timer is not None:
+            button._off_timer.cancel()
+            button._auto_off()
+
+
+def _bus_subscribe(hass, button: ITagButton, gesture: ITagGesture) -> list:
+    @callback
+    def _on_press(_event) -> None:
+        button._on_press()
+
+    @callback
+    def _on_gesture(event) -> None:
+        data = dict(event.data)
+        gesture._on_gesture(data.pop("type"), data)
+
+    return [
+        hass.bus.async_listen(f"{SIGNAL_BTN}_{MAC}", _on_press),
+        hass.bus.async_listen(f"{SIGNAL_GESTURE}_{MAC}", _on_gesture),
+    ]
+
+
+async def main(hass) -> None:
+    await async_setup_ha(hass)
+    fleet = FakeFleet(hass).install()
+    try:
+        # тег не рекламируется: BLE не участвует, уведомление подаётся прямо в _cb_notify
+        fleet.add_tag(MAC)
+        entry = await async_add_entry(hass, MAC)
+        await hass.async_block_till_done()
+        client = entry.runtime_data.client
+        button = _entity(hass, ITagButton)
+        gesture = _entity(hass, ITagGesture)
+
+        results = {}
+        watches = [_Stopwatch(button), _Stopwatch(gesture)]
+        await _presses(client, button, watches)
+        results["signals"] = watches
+
+        # старый путь: сущности слушают шину, реестр подписчиков пуст
+        client.signals.async_forget(MAC)
+        client.signals.async_set_bus_bridge(MAC, True)
+        unsubs = _bus_subscribe(hass, button, gesture)
+        for watch in watches:
+            watch.close()
+        watches = [_Stopwatch(button), _Stopwatch(gesture)]
+        await _presses(client, button, watches)
+        results["bus"] = watches
+        for unsub in unsubs:
+            unsub()
+        for watch in watches:
+            watch.close()
+
+        await hass.config_entries.async_unload(entry.entry_id)
+        await hass.async_block_till_done()
+    finally:
+        fleet.uninstall()
+
+    rows = [
+        (
+            path,
+            type(watch.entity).__name__,
+            round(sum(watch.latencies) / len(watch.latencies) * 1e6, 1),
+            round(percentile(watch.latencies, 0.5) * 1e6, 1),
+            round(percentile(watch.latencies, 0.99) * 1e6, 1),
+        )
+        for path, pair in results.items()
+        for watch in pair
+    ]
+    print(f"_cb_notify -> async_write_ha_state сущности ({PRESSES} удержаний)")
+    table(("path", "entity", "avg us", "p50 us", "p99 us"), rows)
+
+
+if __name__ == "__main__":
+    run(main)
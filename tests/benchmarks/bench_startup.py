@@ -0,0 +1,91 @@
+"""Импорт пакета и настройка 1/10/100 записей.
+
+Импорт меряется в отдельном процессе с уже загруженным ядром HA: видно время
+самой интеграции и то, что пакет (config flow, загрузчик HA) не тянет bleak.
+Настройка — настоящие ConfigEntry через hass.config_entries поверх fakes.py:
+async_setup_entry и async_forward_entry_setups с созданием всех сущностей.
+Каждый размер — свежий HA, поэтому в строку попадает и импорт платформ.
+"""
+from __future__ import annotations
+
+import json
+import subprocess
+import sys
+import time
+
+from _harness import FakeFleet, async_add_entry, async_setup_ha, mac, run, table
+
+from homeassistant.config_entries import ConfigEntryState
+
+from fakes import ROOT
+
+SIZES = (1, 10, 100)
+
+_IMPORT_PROBE = """
+import importlib, json, sys, time
+sys.path.insert(0, {root!r})
+import homeassistant.config_entries, homeassistant.helpers.config_validation
+ready = set(sys.modules)
+started = time.perf_counter()
+importlib.import_module("custom_components.itag_bt")
+package = time.perf_counter() - started
+bleak_after_package = sorted(m for m in set(sys.modules) - ready if m.split(".")[0].startswith("bleak"))
+started = time.perf_counter()
+importlib.import_module("custom_components.itag_bt.coordinator")
+coordinator = time.perf_counter() - started
+print(json.dumps({{"package": package, "coordinator": coordinator, "bleak": bleak_after_package}}))
+"""
+
+
+def _import_times() -> dict:
+    probe = _IMPORT_PROBE.format(root=str(ROOT))
+    out = subprocess.run([sys.executable, "-c", probe], check=True, capture_output=True, text=True)
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def _setup(count: int):
+    async def _main(hass) -> tuple:
+        await async_setup_ha(hass)
+        fleet = FakeFleet(hass).install()
+        try:
+            started = time.perf_counter()
+            entries = [await async_add_entry(hass, mac(i)) for i in range(count)]
+            await hass.async_block_till_done()
+            elapsed = time.perf_counter() - started
+            loaded = sum(entry.state is ConfigEntryState.LOADED for entry in entries)
+            entities = len(hass.states.async_all())
+            for entry in entries:
+                await hass.config_entries.async_unload(entry.entry_id)
+            return (
+                count,
+                loaded,
+                entities,
+                round(elapsed * 1000, 2),
+                round(elapsed / count * 1000, 3),
+            )
+        finally:
+            fleet.uninstall()
+
+    return _main
+
+
+def main() -> None:
+    imports = _import_times()
+    print("Импорт (ядро HA уже загружено)")
+    table(
+        ("module", "ms", "bleak modules"),
+        [
+            ("itag_bt", round(imports["package"] * 1000, 1), len(imports["bleak"])),
+            ("itag_bt.coordinator", round(imports["coordinator"] * 1000, 1), "-"),
+        ],
+    )
+    print()
+    print("Настройка записей: async_setup_entry + платформы")
+    table(
+        ("entries", "loaded", "entities", "total ms", "ms/entry"),
+        [run(_setup(count)) for count in SIZES],
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,58 @@
+"""Общие фикстуры: настоящий HomeAssistant (ядро) на своём цикле и поддельный BLE (fakes.py).
+
+Нужны homeassistant, bleak и bleak-retry-connector (см. requirements_test.txt);
+без них тесты пропускаются. pytest-asyncio не требуется: async-тесты выполняет
+pytest_pyfunc_call ниже на цикле фикстуры loop.
+"""
+from __future__ import annotations
+
+import asyncio
+import inspect
+
+import pytest
+
+pytest.importorskip("homeassistant")
+pytest.importorskip("bleak_retry_connector")
+
+from homeassistant.core import HomeAssistant  # noqa: E402
+
+from fakes import FakeFleet  # noqa: E402
+
+
+@pytest.fixture
+def loop():
+    loop = asyncio.new_event_loop()
+    asyncio.set_event_loop(loop)
+    yield loop
+    loop.run_until_complete(loop.shutdown_asyncgens())
+    loop.close()
+    asyncio.set_event_loop(None)
+
+
+@pytest.fixture
+def hass(loop, tmp_path):
+    async def _create() -> HomeAssistant:
+        return HomeAssistant(str(tmp_path))
+
+    hass = loop.run_until_complete(_create())
+    yield hass
+    loop.run_until_complete(hass.async_stop(force=True))
+
+
+@pytest.fixture
+def fleet(hass):
+    fleet = FakeFleet(hass).install()
+    yield fleet
+    fleet.uninstall()
+
+
+@pytest.hookimpl(tryfirst=True)
+def pytest_pyfunc_call(pyfuncitem):
+    if not inspect.iscoroutinefunction(pyfuncitem.obj):
+        return None
+    loop = pyfuncitem.funcargs.get("loop")
+    if loop is None:
+        raise pytest.UsageError(f"{pyfuncitem.name}: async tests need the loop (or hass) fixture")
+    argnames = pyfuncitem._fixtureinfo.argnames
+    loop.run_until_complete(pyfuncitem.obj(**{name: pyfuncitem.funcargs[name] for name in argnames}))
+    return True
@@ -0,0 +1,416 @@
+"""Поддельный BLE: bleak-клиент, establish_connection и bluetooth-API HA для N брелков.
+
+Используется тестами (conftest.py) и бенчмарками (benchmarks/). Подмена ставится
+на атрибуты модулей homeassistant.components.bluetooth и bleak_retry_connector,
+поэтому coordinator.py, broker.py и остальные модули работают без изменений.
+"""
+from __future__ import annotations
+
+import asyncio
+import random
+import sys
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+ROOT = Path(__file__).resolve().parent.parent
+INTEGRATION_DIR = ROOT / "custom_components" / "itag_bt"
+
+# интеграция импортируется так же, как в HA: custom_components.itag_bt
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from bleak.exc import BleakError  # noqa: E402
+
+# Раскладка GATT настоящего брелка: роль -> (сервис, характеристика, handle, свойства)
+SVC_IMMEDIATE_ALERT = "00001802-0000-1000-8000-00805f9b34fb"
+SVC_FFE0 = "0000ffe0-0000-1000-8000-00805f9b34fb"
+SVC_BATTERY = "0000180f-0000-1000-8000-00805f9b34fb"
+LAYOUT = {
+    "alert": (SVC_IMMEDIATE_ALERT, "00002a06-0000-1000-8000-00805f9b34fb", 0x0B, ("write-without-response",)),
+    "button": (SVC_FFE0, "0000ffe1-0000-1000-8000-00805f9b34fb", 0x0E, ("notify",)),
+    "link_loss": (SVC_FFE0, "0000ffe2-0000-1000-8000-00805f9b34fb", 0x11, ("write",)),
+    "battery": (SVC_BATTERY, "00002a19-0000-1000-8000-00805f9b34fb", 0x15, ("read", "notify")),
+}
+
+
+class FakeCharacteristic:
+    __slots__ = ("uuid", "handle", "properties")
+
+    def __init__(self, uuid: str, handle: int, properties: Iterable[str]) -> None:
+        self.uuid = uuid
+        self.handle = handle
+        self.properties = list(properties)
+
+
+class FakeService:
+    __slots__ = ("uuid", "characteristics")
+
+    def __init__(self, uuid: str) -> None:
+        self.uuid = uuid
+        self.characteristics: List[FakeCharacteristic] = []
+
+
+class FakeServices:
+    """Подмножество BleakGATTServiceCollection, которое нужно coordinator.py."""
+
+    def __init__(self, missing: Iterable[str] = ()) -> None:
+        self._services: Dict[str, FakeService] = {}
+        self._by_handle: Dict[int, FakeCharacteristic] = {}
+        for role, (svc_uuid, uuid, handle, props) in LAYOUT.items():
+            if role in missing:
+                continue
+            svc = self._services.setdefault(svc_uuid, FakeService(svc_uuid))
+            ch = FakeCharacteristic(uuid, handle, props)
+            svc.characteristics.append(ch)
+            self._by_handle[handle] = ch
+
+    def __iter__(self):
+        return iter(self._services.values())
+
+    def get_characteristic(self, handle: int) -> Optional[FakeCharacteristic]:
+        return self._by_handle.get(handle)
+
+
+class FakeTag:
+    """Один брелок в эфире: RSSI с шумом, поведение соединения и GATT."""
+
+    def __init__(
+        self,
+        fleet: "FakeFleet",
+        mac: str,
+        source: str,
+        rssi: int,
+        missing: Iterable[str] = (),
+    ) -> None:
+        self.fleet = fleet
+        self.mac = mac
+        self.source = source
+        self.rssi = rssi
+        self.missing = tuple(missing)
+        self.battery = 87
+        self.present = False
+        self.last_advert = 0.0
+        self.connection: Optional[FakeBleakClient] = None
+        self.connects = 0
+        self.writes: List[tuple] = []
+
+    def sample_rssi(self) -> int:
+        noise = self.fleet.rssi_noise
+        return self.rssi + (random.randint(-noise, noise) if noise else 0)
+
+
+class FakeBleakClient:
+    """Подключённый BleakClientWithServiceCache одного FakeTag."""
+
+    def __init__(self, tag: FakeTag) -> None:
+        self.tag = tag
+        self.address = tag.mac
+        self.is_connected = True
+        self.services = FakeServices(tag.missing)
+        self._disconnected_cb: Optional[Callable[[Any], None]] = None
+        self._notify: Dict[str, Callable[[Any, bytearray], None]] = {}
+        self.cache_cleared = 0
+        # следующая запись упадёт (на живом соединении)
+        self.fail_next_write = False
+
+    def set_disconnected_callback(self, cb: Callable[[Any], None]) -> None:
+        self._disconnected_cb = cb
+
+    async def _gatt(self) -> None:
+        fleet = self.tag.fleet
+        if fleet.gatt_latency:
+            await asyncio.sleep(fleet.gatt_latency)
+        if not self.is_connected:
+            raise BleakError("Not connected")
+        if fleet.drop_rate and random.random() < fleet.drop_rate:
+            self.drop()
+            raise BleakError("Disconnected during operation")
+
+    async def write_gatt_char(self, target: Any, data: bytes, response: bool = False) -> None:
+        await self._gatt()
+        if self.fail_next_write:
+            self.fail_next_write = False
+            raise BleakError("Write failed: attribute not found")
+        uuid = target.uuid if isinstance(target, FakeCharacteristic) else target
+        self.tag.writes.append((uuid, bytes(data), response))
+
+    async def read_gatt_char(self, target: Any) -> bytearray:
+        await self._gatt()
+        return bytearray([self.tag.battery])
+
+    async def start_notify(self, target: Any, cb: Callable[[Any, bytearray], None]) -> None:
+        uuid = target.uuid if isinstance(target, FakeCharacteristic) else target
+        self._notify[uuid] = cb
+
+    async def stop_notify(self, target: Any) -> None:
+        uuid = target.uuid if isinstance(target, FakeCharacteristic) else target
+        self._notify.pop(uuid, None)
+
+    async def clear_cache(self) -> bool:
+        self.cache_cleared += 1
+        return True
+
+    async def disconnect(self) -> bool:
+        if self.is_connected:
+            self.drop()
+        return True
+
+    def press(self, data: bytes = b"\x01") -> None:
+        """Нажатие кнопки: уведомление FFE1 (как из потока bleak)."""
+        cb = self._notify.get(LAYOUT["button"][1])
+        if cb is not None:
+            cb(LAYOUT["button"][2], bytearray(data))
+
+    def drop(self) -> None:
+        """Разрыв связи со стороны брелка/адаптера."""
+        self.is_connected = False
+        if self.tag.connection is self:
+            self.tag.connection = None
+        if self._disconnected_cb is not None:
+            self._disconnected_cb(self)
+
+
+class _DirectClient:
+    """Прямой BleakClient (фолбэк без менеджера HA) в симуляции всегда недоступен."""
+
+    def __init__(self, *_args: Any, **_kwargs: Any) -> None:
+        pass
+
+    async def __aenter__(self) -> "_DirectClient":
+        raise BleakError("direct connect is not simulated")
+
+    async def __aexit__(self, *_args: Any) -> None:
+        return None
+
+
+class _ServiceInfo:
+    __slots__ = ("address", "rssi", "source", "time", "connectable")
+
+    def __init__(self, address: str, rssi: int, source: str, at: float, connectable: bool = True) -> None:
+        self.address = address
+        self.rssi = rssi
+        self.source = source
+        self.time = at
+        self.connectable = connectable
+
+
+class _Scanner:
+    __slots__ = ("source", "name")
+
+    def __init__(self, source: str) -> None:
+        self.source = source
+        self.name = source
+
+
+class _ScannerDevice:
+    __slots__ = ("scanner", "advertisement", "ble_device")
+
+    def __init__(self, tag: FakeTag, rssi: int) -> None:
+        self.scanner = _Scanner(tag.source)
+        self.advertisement = _ServiceInfo(tag.mac, rssi, tag.source, tag.last_advert)
+        self.ble_device = tag
+
+
+class FakeFleet:
+    """N брелков и подменённый bluetooth-стек HA.
+
+    advert_interval — период рекламы (сек), rssi_noise — ±dBm, drop_rate — вероятность
+    разрыва на каждой операции GATT, gatt_latency — задержка операции (сек),
+    connect_latency — время establish_connection, connect_fail_rate — доля неудачных
+    подключений, passive_sources — неподключаемые сканеры/прокси (их ADV видят только
+    матчеры с connectable=False). Колбэк рекламы, как и в HA, вызывается только для
+    первого ADV после пропажи (остальные с тем же содержимым лишь обновляют историю).
+    """
+
+    def __init__(
+        self,
+        hass: Any,
+        count: int = 0,
+        *,
+        advert_interval: float = 1.0,
+        rssi_noise: int = 0,
+        drop_rate: float = 0.0,
+        gatt_latency: float = 0.0,
+        connect_latency: float = 0.0,
+        connect_fail_rate: float = 0.0,
+        missing: Iterable[str] = (),
+        sources: Iterable[str] = ("hci0",),
+        passive_sources: Iterable[str] = (),
+    ) -> None:
+        self.hass = hass
+        self.advert_interval = advert_interval
+        self.rssi_noise = rssi_noise
+        self.drop_rate = drop_rate
+        self.gatt_latency = gatt_latency
+        self.connect_latency = connect_latency
+        self.connect_fail_rate = connect_fail_rate
+        self.sources = list(sources)
+        self.passive_sources = set(passive_sources)
+        self.tags: Dict[str, FakeTag] = {}
+        self.establish_calls = 0
+        # mac -> [(колбэк, только подключаемые сканеры)]
+        self._adv_callbacks: Dict[str, List[tuple]] = {}
+        self._unavailable: Dict[str, List[Callable[[Any], None]]] = {}
+        self._timers: List[asyncio.TimerHandle] = []
+        self._patches: List[tuple] = []
+        for i in range(count):
+            self.add_tag(f"AA:BB:CC:{i >> 16 & 0xFF:02X}:{i >> 8 & 0xFF:02X}:{i & 0xFF:02X}", missing=missing)
+
+    def add_tag(self, mac: str, rssi: int = -60, missing: Iterable[str] = ()) -> FakeTag:
+        source = self.sources[len(self.tags) % len(self.sources)]
+        tag = self.tags[mac] = FakeTag(self, mac, source, rssi, missing)
+        return tag
+
+    # -------- подмена модулей --------
+    def install(self) -> "FakeFleet":
+        import bleak_retry_connector
+        from homeassistant.components import bluetooth
+
+        replacements = {
+            bluetooth: {
+                "async_register_callback": self._register_callback,
+                "async_track_unavailable": self._track_unavailable,
+                "async_address_present": self._address_present,
+                "async_last_service_info": self._last_service_info,
+                "async_ble_device_from_address": self._ble_device,
+                "async_scanner_devices_by_address": self._scanner_devices,
+                "async_scanner_by_source": lambda _hass, _source: None,
+            },
+            bleak_retry_connector: {
+                "establish_connection": self._establish_connection,
+                "BleakClientWithServiceCache": _DirectClient,
+            },
+        }
+        for module, attrs in replacements.items():
+            for name, value in attrs.items():
+                self._patches.append((module, name, getattr(module, name)))
+                setattr(module, name, value)
+        return self
+
+    def uninstall(self) -> None:
+        self.stop_adverts()
+        for module, name, value in reversed(self._patches):
+            setattr(module, name, value)
+        self._patches.clear()
+
+    # -------- эфир --------
+    def advertise(self, mac: str, rssi: Optional[int] = None) -> None:
+        tag = self.tags[mac]
+        tag.last_advert = time.monotonic()
+        returned = not tag.present
+        tag.present = True
+        if not returned:
+            # только RSSI изменился — HA колбэк не вызывает
+            return
+        info = self._info(tag, tag.sample_rssi() if rssi is None else rssi)
+        for cb, connectable_only in list(self._adv_callbacks.get(mac, ())):
+            if info.connectable or not connectable_only:
+                cb(info, None)
+
+    def advertise_changed(self, mac: str, rssi: Optional[int] = None) -> None:
+        """ADV, который HA передаёт в колбэк (новое содержимое рекламы)."""
+        self.tags[mac].present = False
+        self.advertise(mac, rssi)
+
+    def vanish(self, mac: str) -> None:
+        """Брелок пропал из эфира: HA вызывает колбэки async_track_unavailable."""
+        tag = self.tags[mac]
+        if not tag.present:
+            return
+        tag.present = False
+        info = self._info(tag, tag.rssi)
+        for cb in list(self._unavailable.get(mac, ())):
+            cb(info)
+
+    def start_adverts(self) -> None:
+        """Периодическая реклама всех брелков со случайной фазой."""
+        loop = self.hass.loop
+        for mac in self.tags:
+            self._timers.append(
+                loop.call_later(random.uniform(0, self.advert_interval), self._advert_tick, mac)
+            )
+
+    def stop_adverts(self) -> None:
+        for timer in self._timers:
+            timer.cancel()
+        self._timers.clear()
+
+    def _advert_tick(self, mac: str) -> None:
+        self.advertise(mac)
+        self._timers.append(self.hass.loop.call_later(self.advert_interval, self._advert_tick, mac))
+
+    def drop_all(self) -> int:
+        """Массовый разрыв (перезагрузка адаптера): число разорванных соединений."""
+        dropped = 0
+        for tag in self.tags.values():
+            if tag.connection is not None:
+                tag.connection.drop()
+                dropped += 1
+        return dropped
+
+    # -------- bluetooth-API HA --------
+    def _info(self, tag: FakeTag, rssi: int) -> _ServiceInfo:
+        return _ServiceInfo(tag.mac, rssi, tag.source, tag.last_advert, tag.source not in self.passive_sources)
+
+    def _visible(self, address: str, connectable: bool) -> Optional[FakeTag]:
+        tag = self.tags.get(address.upper())
+        if tag is None or not tag.present:
+            return None
+        if connectable and tag.source in self.passive_sources:
+            return None
+        return tag
+
+    def _register_callback(self, _hass: Any, cb: Callable, matcher: Any, _mode: Any) -> Callable[[], None]:
+        mac = matcher["address"].upper()
+        entry = (cb, matcher.get("connectable", True))
+        callbacks = self._adv_callbacks.setdefault(mac, [])
+        callbacks.append(entry)
+        tag = self._visible(mac, entry[1])
+        if tag is not None:
+            # HA повторяет последнюю рекламу при регистрации
+            cb(self._info(tag, tag.rssi), None)
+        return lambda: callbacks.remove(entry)
+
+    def _track_unavailable(
+        self, _hass: Any, cb: Callable, address: str, connectable: bool = True
+    ) -> Callable[[], None]:
+        callbacks = self._unavailable.setdefault(address.upper(), [])
+        callbacks.append(cb)
+        return lambda: callbacks.remove(cb)
+
+    def _address_present(self, _hass: Any, address: str, connectable: bool = True) -> bool:
+        return self._visible(address, connectable) is not None
+
+    def _last_service_info(self, _hass: Any, address: str, connectable: bool = True) -> Optional[_ServiceInfo]:
+        tag = self._visible(address, connectable)
+        return self._info(tag, tag.rssi) if tag is not None else None
+
+    def _ble_device(self, _hass: Any, address: str, connectable: bool = True) -> Optional[FakeTag]:
+        return self._visible(address, connectable)
+
+    def _scanner_devices(self, _hass: Any, address: str, connectable: bool = True) -> List[_ScannerDevice]:
+        tag = self._visible(address, connectable)
+        return [_ScannerDevice(tag, tag.sample_rssi())] if tag is not None else []
+
+    async def _establish_connection(
+        self, _client_class: Any, device: FakeTag, _name: str, **_kwargs: Any
+    ) -> FakeBleakClient:
+        self.establish_calls += 1
+        if self.connect_latency:
+            await asyncio.sleep(self.connect_latency)
+        if not device.present or (self.connect_fail_rate and random.random() < self.connect_fail_rate):
+            raise BleakError(f"{device.mac}: device not found")
+        device.connects += 1
+        client = device.connection = FakeBleakClient(device)
+        return client
+
+
+class FakeEntry:
+    """ConfigEntry в объёме, который читают runtime.create_client/apply_options."""
+
+    def __init__(self, mac: str, options: Optional[Dict[str, Any]] = None) -> None:
+        self.entry_id = mac.replace(":", "").lower()
+        self.data = {"mac": mac}
+        self.options = options or {}
+        self.runtime_data: Any = None
@@ -0,0 +1,158 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+from custom_components.itag_bt import broker as broker_mod
+from custom_components.itag_bt.advert import AdvertDispatcher
+from custom_components.itag_bt.broker import STATE_CONNECTED, ConnectionBroker
+from custom_components.itag_bt.coordinator import ITagClient
+from custom_components.itag_bt.keepalive import KeepaliveScheduler
+
+
+def _allocation(free, slots=3, allocated=()):
+    return SimpleNamespace(source="hci0", slots=slots, free=free, allocated=list(allocated))
+
+
+@pytest.fixture
+def broker(hass):
+    return ConnectionBroker(hass)
+
+
+async def test_connect_through_broker(hass, fleet, broker):
+    tag = fleet.add_tag("AA:BB:CC:00:00:01")
+    fleet.advertise(tag.mac)
+    client = ITagClient(hass, tag.mac, broker=broker)
+    assert await client.connect()
+    assert broker.state(tag.mac) == STATE_CONNECTED
+    assert broker.stats["connections"] == {"hci0": 1}
+
+
+async def test_request_without_free_slot_expires(hass, fleet, broker, monkeypatch):
+    monkeypatch.setattr(broker_mod, "QUEUE_WAIT_MAX", 0.05)
+    monkeypatch.setattr(broker_mod, "_reported_allocation", lambda _source: _allocation(free=0))
+    tag = fleet.add_tag("AA:BB:CC:00:00:01")
+    fleet.advertise(tag.mac)
+    client = ITagClient(hass, tag.mac, broker=broker)
+    # раньше — ожидание навсегда
+    assert await client.connect() is False
+    assert broker.expired == 1
+    assert broker.stats["queue_depth"] == 0
+    assert fleet.establish_calls == 0
+
+
+def test_capacity_uses_free_slots_and_pending_grants(broker, monkeypatch):
+    # занятые другими интеграциями слоты видны только в free
+    monkeypatch.setattr(broker_mod, "_reported_allocation", lambda _source: _allocation(free=1))
+    assert broker._has_capacity("hci0")
+    # выданный, но ещё не подключённый слот занимает последний свободный
+    broker._held["AA:BB:CC:00:00:01"] = "hci0"
+    assert not broker._has_capacity("hci0")
+    # подключился — habluetooth уже учёл его в free/allocated
+    monkeypatch.setattr(
+        broker_mod,
+        "_reported_allocation",
+        lambda _source: _allocation(free=1, allocated=["AA:BB:CC:00:00:01"]),
+    )
+    assert broker._has_capacity("hci0")
+
+
+def test_capacity_without_report_uses_default_budget(broker, monkeypatch):
+    monkeypatch.setattr(broker_mod, "_reported_allocation", lambda _source: None)
+    broker._by_source["hci0"] = broker_mod.DEFAULT_SLOTS_PER_SOURCE
+    assert not broker._has_capacity("hci0")
+
+
+async def test_failed_connects_back_off(hass, fleet, broker):
+    tag = fleet.add_tag("AA:BB:CC:00:00:01")
+    fleet.advertise(tag.mac)
+    fleet.connect_fail_rate = 1.0
+    client = ITagClient(hass, tag.mac, broker=broker)
+    assert not await client.connect()
+    assert broker.state(tag.mac) == broker_mod.STATE_BACKING_OFF
+    # реклама во время backoff новую попытку не ставит
+    assert broker.async_request(client) is None
+
+
+async def _watched(hass, fleet, broker, monkeypatch):
+    monkeypatch.setattr(broker_mod, "RETRY_RECHECK", 0.05)
+    monkeypatch.setattr(broker_mod, "BACKOFF_BASE", 0.05)
+    fleet.advert_interval = 0.02
+    tag = fleet.add_tag("AA:BB:CC:00:00:01")
+    client = ITagClient(hass, tag.mac, broker=broker)
+    client.start_advert_watch(AdvertDispatcher(hass))
+    fleet.start_adverts()
+    return tag, client
+
+
+async def test_drop_reconnects_from_advert_history(hass, fleet, broker, monkeypatch):
+    tag, client = await _watched(hass, fleet, broker, monkeypatch)
+    await asyncio.sleep(0.1)
+    assert client.is_connected
+    # тег остаётся в эфире: HA колбэк больше не вызывает, только история обновляется
+    tag.connection.drop()
+    await asyncio.sleep(0.3)
+    assert client.is_connected
+    assert tag.connects == 2
+    assert broker.retries >= 1
+    client.stop_advert_watch()
+
+
+async def test_failed_connect_retries_after_backoff(hass, fleet, broker, monkeypatch):
+    fleet.connect_fail_rate = 1.0
+    tag, client = await _watched(hass, fleet, broker, monkeypatch)
+    await asyncio.sleep(0.05)
+    assert broker.state(tag.mac) == broker_mod.STATE_BACKING_OFF
+    fleet.connect_fail_rate = 0.0
+    await asyncio.sleep(0.4)
+    assert client.is_connected
+    assert fleet.establish_calls >= 2
+    client.stop_advert_watch()
+
+
+async def test_silent_tag_is_not_retried(hass, fleet, broker, monkeypatch):
+    tag, client = await _watched(hass, fleet, broker, monkeypatch)
+    await asyncio.sleep(0.1)
+    # реклама прекратилась вместе с разрывом, последняя — давно
+    fleet.stop_adverts()
+    tag.last_advert -= 60
+    client.last_seen -= 60
+    tag.connection.drop()
+    await asyncio.sleep(0.3)
+    assert not client.is_connected
+    assert tag.connects == 1
+    client.stop_advert_watch()
+
+
+async def test_forget_cancels_connect_in_flight(hass, fleet, broker):
+    # выгрузка записи, пока establish_connection ещё идёт
+    fleet.connect_latency = 0.05
+    tag = fleet.add_tag("AA:BB:CC:00:00:01")
+    fleet.advertise(tag.mac)
+    keepalive = KeepaliveScheduler(hass)
+    client = ITagClient(hass, tag.mac, keepalive=keepalive, broker=broker)
+    connecting = hass.async_create_task(client.connect())
+    await asyncio.sleep(0.01)
+    await client.disconnect()
+    assert await connecting is False
+    await asyncio.sleep(0.1)
+    assert not client.is_connected
+    assert keepalive.stats["tags"] == 0
+    assert broker.stats["connections"] == {"hci0": 0}
+    assert broker.state(tag.mac) == broker_mod.STATE_WAITING
+
+
+async def test_forget_drops_link_established_during_setup(hass, fleet, broker):
+    # отмена после establish_connection, во время настройки GATT
+    fleet.gatt_latency = 0.05
+    tag = fleet.add_tag("AA:BB:CC:00:00:01")
+    fleet.advertise(tag.mac)
+    client = ITagClient(hass, tag.mac, broker=broker)
+    connecting = hass.async_create_task(client.connect())
+    await asyncio.sleep(0.02)
+    link = tag.connection
+    assert link is not None
+    broker.async_forget(tag.mac)
+    await connecting
+    assert not client.is_connected
+    assert not link.is_connected
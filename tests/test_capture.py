@@ -0,0 +1,130 @@
+import asyncio
+
+from homeassistant.const import MATCH_ALL
+
+from custom_components.itag_bt import capture
+from custom_components.itag_bt.capture import (
+    MAGIC,
+    REC_ADVERT,
+    REC_CONNECT,
+    REC_DISCONNECT,
+    REC_NOTIFY,
+    REC_READ,
+    REC_WRITE,
+    WRITE_ALERT,
+    TrafficCapture,
+    async_replay,
+    iter_records,
+)
+from custom_components.itag_bt.signals import SIGNAL_BTN
+
+MAC = "AA:BB:CC:00:00:01"
+
+
+async def _flush(cap):
+    cap.async_shutdown()
+    await cap._flushing
+
+
+async def test_records_round_trip(hass, tmp_path):
+    cap = TrafficCapture(hass, str(tmp_path / "capture.bin"))
+    cap.advert(MAC, -61, "hci0")
+    cap.connected(MAC, "hci0", 0.8)
+    cap.notify(MAC, b"\x01")
+    cap.write(MAC, WRITE_ALERT, True, 1, 0.02)
+    cap.read(MAC, True, 87)
+    cap.disconnected(MAC)
+    cap.connected(MAC, None, 1.5)
+    await _flush(cap)
+
+    with open(cap.path, "rb") as f:
+        assert f.read(len(MAGIC)) == MAGIC
+    records = list(iter_records(cap.path))
+    assert [r[0] for r in records] == [
+        REC_ADVERT, REC_CONNECT, REC_NOTIFY, REC_WRITE, REC_READ, REC_DISCONNECT, REC_CONNECT,
+    ]
+    assert all(mac == MAC for _, _, mac, _ in records)
+    assert records[0][3] == (-61, "hci0")
+    assert records[2][3] == (b"\x01",)
+    assert records[3][3][:3] == (WRITE_ALERT, True, 1)
+    assert records[4][3] == (True, 87)
+    # прямой BleakClient — без источника
+    assert records[6][3][0] is None
+
+
+async def test_rotation_keeps_source_table(hass, tmp_path, monkeypatch):
+    monkeypatch.setattr(capture, "CAPTURE_MAX_BYTES", 200)
+    cap = TrafficCapture(hass, str(tmp_path / "capture.bin"))
+    for _ in range(3):
+        for _ in range(10):
+            cap.advert(MAC, -70, "proxy-kitchen")
+        await _flush(cap)
+    assert cap.rotations >= 1
+    assert (tmp_path / "capture.bin.1").exists()
+    # новый файл сам по себе читается: словарь источников записан в его начало
+    adverts = [r for r in iter_records(cap.path) if r[0] == REC_ADVERT]
+    assert adverts and all(r[3][1] == "proxy-kitchen" for r in adverts)
+
+
+async def test_replay_uses_isolated_clients(hass, tmp_path):
+    cap = TrafficCapture(hass, str(tmp_path / "capture.bin"))
+    for rssi in (-60, -60, -75, -75, -75):
+        cap.advert(MAC, rssi, "hci0")
+    cap.notify(MAC, b"\x01")
+    cap.write(MAC, WRITE_ALERT, True, 0, 0.01)
+    await _flush(cap)
+
+    events = []
+    hass.bus.async_listen(MATCH_ALL, events.append)
+    result = await async_replay(hass, cap.path, {}, speed=0)
+    await asyncio.sleep(0)
+
+    assert result["records"] == 7
+    assert result["tags"] == 1
+    assert result["by_type"]["advert"] == 5
+    assert result["by_type"]["write"] == 1
+    assert result["updates"]["button"] == 1
+    assert result["updates"]["gesture"] == 1
+    assert result["updates"]["rssi"] >= 2
+    assert result["entity_updates"] == sum(result["updates"].values())
+    # ни событий на шине (мост, состояния), ни новых записей в захват
+    assert events == []
+    assert cap.records == 8  # 7 + словарь источников
+
+
+async def test_replay_does_not_touch_live_clients(hass, tmp_path):
+    from custom_components.itag_bt.coordinator import ITagClient
+
+    cap = TrafficCapture(hass, str(tmp_path / "capture.bin"))
+    cap.advert(MAC, -60, "hci0")
+    cap.notify(MAC, b"\x01")
+    await _flush(cap)
+
+    live = ITagClient(hass, MAC)
+    live.rssi.deadband = 5
+    live.capture = cap
+    touched = []
+    live.async_subscribe_rssi(lambda: touched.append("rssi"))
+    live.signals.async_subscribe(MAC, SIGNAL_BTN, lambda: touched.append("button"))
+
+    result = await async_replay(hass, cap.path, {MAC: live}, speed=0)
+    assert result["tags"] == 1
+    assert touched == []
+    assert live.last_rssi is None and live.last_seen == 0.0
+
+
+async def test_truncated_tail_is_ignored(hass, tmp_path):
+    cap = TrafficCapture(hass, str(tmp_path / "capture.bin"))
+    cap.advert(MAC, -61, "hci0")
+    cap.notify(MAC, b"\x01\x02\x03")
+    await _flush(cap)
+    with open(cap.path, "rb") as f:
+        data = f.read()
+    # последняя запись (notify: заголовок 15 байт, длина, 3 байта данных) оборвана
+    # в данных, перед длиной и в заголовке
+    for cut in (1, 4, 10):
+        with open(cap.path, "wb") as f:
+            f.write(data[:-cut])
+        assert [r[0] for r in iter_records(cap.path)] == [REC_ADVERT]
+    result = await async_replay(hass, cap.path, {}, speed=0)
+    assert result["records"] == 1
@@ -0,0 +1,214 @@
+"""ITagClient поверх поддельного BLE (fakes.py): подключение, записи, разрывы."""
+import asyncio
+
+from custom_components.itag_bt.advert import AdvertDispatcher
+from custom_components.itag_bt.broker import ConnectionBroker
+from custom_components.itag_bt.coordinator import ITagClient
+from custom_components.itag_bt.gatt_cache import GattCache
+from custom_components.itag_bt.keepalive import KeepaliveScheduler
+from custom_components.itag_bt.signals import SIGNAL_BEEP, SIGNAL_GESTURE
+
+from fakes import LAYOUT
+
+MAC = "AA:BB:CC:00:00:01"
+UUID_ALERT = LAYOUT["alert"][1]
+UUID_LINK_LOSS = LAYOUT["link_loss"][1]
+
+
+async def _connected(hass, fleet, **kwargs):
+    tag = fleet.tags.get(MAC) or fleet.add_tag(MAC)
+    fleet.advertise(tag.mac)
+    client = ITagClient(hass, MAC, **kwargs)
+    assert await client.connect()
+    return tag, client
+
+
+async def test_connect_applies_safe_defaults(hass, fleet):
+    tag, client = await _connected(hass, fleet)
+    assert client.ready
+    # писк погашен, Link Loss выключен
+    assert (UUID_ALERT, b"\x00", False) in tag.writes
+    assert (UUID_LINK_LOSS, b"\x00", True) in tag.writes
+    assert client.link_loss_supported
+
+
+async def test_missing_link_loss_is_remembered(hass, fleet):
+    fleet.add_tag(MAC, missing=("link_loss",))
+    tag, client = await _connected(hass, fleet)
+    assert not client.link_loss_supported
+    assert all(uuid != UUID_LINK_LOSS for uuid, _, _ in tag.writes)
+
+
+async def test_concurrent_connects_share_one_attempt(hass, fleet):
+    fleet.connect_latency = 0.05
+    fleet.add_tag(MAC)
+    fleet.advertise(MAC)
+    client = ITagClient(hass, MAC)
+    results = await asyncio.gather(*(client.connect() for _ in range(20)))
+    assert all(results)
+    assert fleet.establish_calls == 1
+    assert client.metrics.connects_coalesced == 19
+
+
+async def test_failed_connect_result_is_reused_briefly(hass, fleet):
+    fleet.add_tag(MAC)
+    client = ITagClient(hass, MAC)
+    # тега нет в эфире
+    assert not await client.connect()
+    assert not await client.connect()
+    assert client.metrics.connects_coalesced == 1
+
+
+async def test_button_press_reaches_gesture_decoder(hass, fleet):
+    tag, client = await _connected(hass, fleet)
+    client.gestures.window = 0.02
+    gestures = []
+    client.signals.async_subscribe(MAC, SIGNAL_GESTURE, lambda g, _meta: gestures.append(g))
+    tag.connection.press()
+    tag.connection.press()
+    await asyncio.sleep(0.1)
+    assert gestures == ["double"]
+    # нажатие — «чужой» трафик для keepalive
+    assert client.last_traffic > 0
+
+
+async def test_keepalive_write_is_not_traffic(hass, fleet):
+    _tag, client = await _connected(hass, fleet)
+    before = client.last_traffic
+    await client.async_keepalive()
+    assert client.last_activity > before
+    assert client.last_traffic == before
+    await client.beep(True)
+    assert client.last_traffic > before
+
+
+async def test_link_drop_does_not_invalidate_gatt_layout(hass, fleet):
+    cache = GattCache(hass)
+    tag = fleet.add_tag(MAC)
+    fleet.advertise(MAC)
+    client = ITagClient(hass, MAC)
+    client.gatt_cache = cache
+    assert await client.connect()
+    assert cache.get(MAC) is not None
+    conn = tag.connection
+    conn.drop()
+    assert not await client._write_immediate_alert(b"\x00")
+    assert cache.get(MAC) is not None
+    assert conn.cache_cleared == 0
+
+
+async def test_repeated_write_failures_on_live_link_invalidate_layout(hass, fleet):
+    cache = GattCache(hass)
+    tag = fleet.add_tag(MAC, missing=())
+    fleet.advertise(MAC)
+    client = ITagClient(hass, MAC)
+    client.gatt_cache = cache
+    assert await client.connect()
+    conn = tag.connection
+    conn.fail_next_write = True
+    assert not await client._write_link_loss_exact(1)
+    # один отказ — ещё не повод
+    assert cache.get(MAC) is not None
+    conn.fail_next_write = True
+    assert not await client._write_link_loss_exact(1)
+    assert cache.get(MAC) is None
+    assert conn.cache_cleared == 1
+
+
+async def test_migration_releases_old_slot_once(hass, fleet):
+    broker = ConnectionBroker(hass)
+    tag, client = await _connected(hass, fleet, broker=broker)
+    assert broker.stats["connections"] == {"hci0": 1}
+    await client._async_migrate()
+    # отложенный колбэк дисконнекта старого соединения
+    await asyncio.sleep(0)
+    await asyncio.sleep(0)
+    assert client.is_connected
+    assert tag.connects == 2
+    assert broker.stats["connections"] == {"hci0": 1}
+    tag.connection.drop()
+    await asyncio.sleep(0)
+    assert broker.stats["connections"] == {"hci0": 0}
+
+
+async def test_keepalive_scheduler_drives_connected_tag(hass, fleet):
+    scheduler = KeepaliveScheduler(hass)
+    tag, client = await _connected(hass, fleet, keepalive=scheduler, keepalive_interval=0.1)
+    writes = len(tag.writes)
+    await asyncio.sleep(0.5)
+    assert len(tag.writes) > writes
+    assert scheduler.writes_saved == 0
+    scheduler.async_shutdown()
+
+
+async def test_beep_switch_state_follows_client(hass, fleet):
+    _tag, client = await _connected(hass, fleet)
+    seen = []
+    client.signals.async_subscribe(MAC, SIGNAL_BEEP, lambda: seen.append(client.beeping))
+    client.async_set_beeping(True)
+    client.async_set_beeping(True)
+    client.async_set_beeping(False)
+    assert seen == [True, False]
+
+
+async def test_advert_presence_tracks_unavailable(hass, fleet):
+    fleet.add_tag(MAC)
+    client = ITagClient(hass, MAC)
+    client.advert_only = True
+    updates = []
+    client.async_subscribe_rssi(lambda: updates.append(client.available))
+    client.start_advert_watch(AdvertDispatcher(hass))
+    assert not client.available
+    fleet.advertise(MAC, rssi=-60)
+    assert client.available
+    # только RSSI изменился — колбэка нет, но last_heard идёт по истории HA
+    await asyncio.sleep(0.01)
+    fleet.advertise(MAC, rssi=-61)
+    assert client.last_heard > client.last_seen
+    fleet.vanish(MAC)
+    assert not client.available
+    fleet.advertise(MAC, rssi=-60)
+    assert updates == [True, False, True]
+    client.stop_advert_watch()
+
+
+async def test_passive_proxy_adverts_reach_the_tag(hass, fleet):
+    fleet.passive_sources = {"hci0"}
+    fleet.add_tag(MAC)
+    client = ITagClient(hass, MAC)
+    client.start_advert_watch(AdvertDispatcher(hass))
+    fleet.advertise(MAC, rssi=-70)
+    # RSSI и last_seen — от пассивного прокси, как и присутствие
+    assert client.last_rssi == -70
+    assert client.last_seen > 0
+    assert client.available
+    # подключаться через него нельзя — попытки нет
+    assert fleet.establish_calls == 0
+    client.stop_advert_watch()
+
+
+async def test_scanner_rssi_follows_advert_history(hass, fleet, monkeypatch):
+    from custom_components.itag_bt import advert
+
+    monkeypatch.setattr(advert, "SWEEP_INTERVAL", 0.02)
+    tag = fleet.add_tag(MAC, rssi=-60)
+    client = ITagClient(hass, MAC)
+    client.advert_only = True
+    published = []
+    client.async_subscribe_rssi(lambda: published.append(dict(client.scanner_rssi)))
+    dispatcher = AdvertDispatcher(hass)
+    client.start_advert_watch(dispatcher)
+    fleet.advertise(MAC)
+    assert published[-1] == {"hci0": -60}
+    # тег отошёл: колбэка нет (изменился только RSSI), но обход истории HA его видит
+    tag.rssi = -80
+    fleet.advertise(MAC)
+    await asyncio.sleep(0.05)
+    assert published[-1] == {"hci0": -80}
+    # сдвиг внутри мёртвой зоны состояние не пишет
+    count = len(published)
+    tag.rssi = -81
+    await asyncio.sleep(0.05)
+    assert len(published) == count
+    client.stop_advert_watch()
+    dispatcher.async_shutdown()
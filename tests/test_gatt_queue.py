@@ -0,0 +1,89 @@
+import asyncio
+
+from custom_components.itag_bt.gatt_queue import MAX_RETRIES, SLOT_ALERT, SLOT_LINK_LOSS, GattWriteQueue
+
+
+class _Executor:
+    """Исполнитель записей вместо ITagClient: результат задаётся сценарием."""
+
+    def __init__(self, hass, results=None, drop=False):
+        self.hass = hass
+        self.mac = "AA:BB:CC:00:00:01"
+        self.ready = True
+        self.calls = []
+        self._results = list(results or [])
+        self._drop = drop
+        self.gate = asyncio.Event()
+        self.gate.set()
+
+    async def _async_execute_write(self, slot, payload, low):
+        await self.gate.wait()
+        self.calls.append((slot, payload, low))
+        ok = self._results.pop(0) if self._results else True
+        if not ok and self._drop:
+            self.ready = False
+        return ok
+
+
+async def test_pending_write_is_replaced_by_newer_one(hass):
+    client = _Executor(hass)
+    queue = GattWriteQueue(client)
+    client.gate.clear()
+    first = queue.submit(SLOT_ALERT, b"\x01")
+    await asyncio.sleep(0)
+    # первая запись уже исполняется; две следующие сливаются в одну
+    second = queue.submit(SLOT_ALERT, b"\x02")
+    third = queue.submit(SLOT_ALERT, b"\x00")
+    client.gate.set()
+    assert await asyncio.gather(first, second, third) == [True, True, True]
+    assert client.calls == [(SLOT_ALERT, b"\x01", False), (SLOT_ALERT, b"\x00", False)]
+    assert queue.stats["coalesced"] == 1
+
+
+async def test_keepalive_is_absorbed_and_does_not_displace_command(hass):
+    client = _Executor(hass)
+    queue = GattWriteQueue(client)
+    client.gate.clear()
+    busy = queue.submit(SLOT_LINK_LOSS, b"\x01")
+    await asyncio.sleep(0)
+    beep = queue.submit(SLOT_ALERT, b"\x01")
+    keepalive = queue.submit(SLOT_ALERT, b"\x00", low_priority=True)
+    client.gate.set()
+    await asyncio.gather(busy, beep, keepalive)
+    assert client.calls[-1] == (SLOT_ALERT, b"\x01", False)
+    assert len(client.calls) == 2
+
+
+async def test_write_cut_by_link_drop_is_retried(hass):
+    client = _Executor(hass, results=[False, True], drop=True)
+    queue = GattWriteQueue(client)
+    assert await queue.submit(SLOT_ALERT, b"\x01")
+    assert len(client.calls) == 2
+    assert queue.stats["retried"] == 1
+
+
+async def test_retries_are_bounded(hass):
+    client = _Executor(hass, results=[False] * 10, drop=True)
+    queue = GattWriteQueue(client)
+    assert not await queue.submit(SLOT_ALERT, b"\x01")
+    assert len(client.calls) == MAX_RETRIES + 1
+
+
+async def test_failed_keepalive_is_not_retried(hass):
+    client = _Executor(hass, results=[False], drop=True)
+    queue = GattWriteQueue(client)
+    assert not await queue.submit(SLOT_ALERT, b"\x00", low_priority=True)
+    assert len(client.calls) == 1
+
+
+async def test_cancel_resolves_pending_with_false(hass):
+    client = _Executor(hass)
+    queue = GattWriteQueue(client)
+    client.gate.clear()
+    running = queue.submit(SLOT_ALERT, b"\x01")
+    await asyncio.sleep(0)
+    pending = queue.submit(SLOT_LINK_LOSS, b"\x01")
+    queue.cancel()
+    assert await pending is False
+    client.gate.set()
+    assert await running is True
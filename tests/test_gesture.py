@@ -0,0 +1,70 @@
+import asyncio
+import time
+
+from custom_components.itag_bt.gesture import (
+    GESTURE_DOUBLE,
+    GESTURE_LONG,
+    GESTURE_SINGLE,
+    GESTURE_TRIPLE,
+    GestureDecoder,
+)
+
+WINDOW = 0.05
+
+
+def _decoder(loop):
+    events = []
+    decoder = GestureDecoder(loop, lambda gesture, meta: events.append((gesture, meta)), WINDOW)
+    return decoder, events
+
+
+async def test_single_press_waits_for_window(loop):
+    decoder, events = _decoder(loop)
+    decoder.feed(b"\x01", time.monotonic())
+    assert events == []
+    await asyncio.sleep(WINDOW * 2)
+    assert [g for g, _ in events] == [GESTURE_SINGLE]
+    assert events[0][1]["presses"] == 1
+
+
+async def test_double_press_within_window(loop):
+    decoder, events = _decoder(loop)
+    decoder.feed(b"\x01", time.monotonic())
+    await asyncio.sleep(WINDOW / 3)
+    decoder.feed(b"\x01", time.monotonic())
+    await asyncio.sleep(WINDOW * 2)
+    assert [g for g, _ in events] == [GESTURE_DOUBLE]
+
+
+async def test_presses_further_apart_than_window_are_separate(loop):
+    decoder, events = _decoder(loop)
+    decoder.feed(b"\x01", time.monotonic())
+    await asyncio.sleep(WINDOW * 2)
+    decoder.feed(b"\x01", time.monotonic())
+    await asyncio.sleep(WINDOW * 2)
+    assert [g for g, _ in events] == [GESTURE_SINGLE, GESTURE_SINGLE]
+
+
+async def test_third_press_emits_immediately(loop):
+    decoder, events = _decoder(loop)
+    now = time.monotonic()
+    for _ in range(3):
+        decoder.feed(b"\x01", now)
+    # без ожидания окна
+    assert [g for g, _ in events] == [GESTURE_TRIPLE]
+
+
+async def test_long_press_flushes_pending_series(loop):
+    decoder, events = _decoder(loop)
+    now = time.monotonic()
+    decoder.feed(b"\x01", now)
+    decoder.feed(b"\x02", now)
+    assert [g for g, _ in events] == [GESTURE_SINGLE, GESTURE_LONG]
+
+
+async def test_cancel_drops_pending_series(loop):
+    decoder, events = _decoder(loop)
+    decoder.feed(b"\x01", time.monotonic())
+    decoder.cancel()
+    await asyncio.sleep(WINDOW * 2)
+    assert events == []
@@ -0,0 +1,86 @@
+import asyncio
+import time
+
+from custom_components.itag_bt.keepalive import KeepaliveScheduler
+
+INTERVAL = 0.1
+
+
+class _Tag:
+    """Клиент в объёме KeepaliveScheduler: запись keepalive, как в ITagClient, трогает только last_activity."""
+
+    def __init__(self, mac, interval=INTERVAL):
+        self.mac = mac
+        self.keepalive_interval = interval
+        self.is_connected = True
+        self.last_activity = 0.0
+        self.last_traffic = 0.0
+        self.beeping = False
+        self.keepalives = []
+
+    async def async_keepalive(self):
+        self.last_activity = time.monotonic()
+        self.keepalives.append(self.last_activity)
+
+
+async def test_idle_tag_is_written_once_per_interval(hass):
+    scheduler = KeepaliveScheduler(hass)
+    tag = _Tag("AA:BB:CC:00:00:01")
+    scheduler.async_add(tag)
+    await asyncio.sleep(INTERVAL * 6)
+    scheduler.async_shutdown()
+    # сама запись keepalive не считается активностью: ни одной «сэкономленной»
+    assert scheduler.writes_saved == 0
+    assert 4 <= scheduler.writes <= 6
+    gaps = [b - a for a, b in zip(tag.keepalives, tag.keepalives[1:])]
+    assert max(gaps) < INTERVAL * 1.5
+
+
+async def test_recent_traffic_skips_keepalive(hass):
+    scheduler = KeepaliveScheduler(hass)
+    tag = _Tag("AA:BB:CC:00:00:01")
+    scheduler.async_add(tag)
+    for _ in range(8):
+        # кнопка/батарея/писк чаще интервала
+        tag.last_traffic = time.monotonic()
+        await asyncio.sleep(INTERVAL / 2)
+    scheduler.async_shutdown()
+    assert scheduler.writes == 0
+    assert scheduler.writes_saved >= 1
+
+
+async def test_beeping_tag_is_not_silenced(hass):
+    scheduler = KeepaliveScheduler(hass)
+    tag = _Tag("AA:BB:CC:00:00:01")
+    # писк beep_group: одна запись уровня, дальше тишина в GATT до конца duration
+    tag.beeping = True
+    scheduler.async_add(tag)
+    await asyncio.sleep(INTERVAL * 4)
+    assert tag.keepalives == []
+    assert scheduler.writes_saved >= 2
+    tag.beeping = False
+    await asyncio.sleep(INTERVAL * 2)
+    scheduler.async_shutdown()
+    assert tag.keepalives
+
+
+async def test_disconnected_tag_leaves_schedule(hass):
+    scheduler = KeepaliveScheduler(hass)
+    tag = _Tag("AA:BB:CC:00:00:01")
+    scheduler.async_add(tag)
+    tag.is_connected = False
+    await asyncio.sleep(INTERVAL * 2)
+    assert scheduler.stats["tags"] == 0
+    assert tag.keepalives == []
+
+
+async def test_many_tags_share_one_timer(hass):
+    scheduler = KeepaliveScheduler(hass)
+    tags = [_Tag(f"AA:BB:CC:00:00:{i:02X}") for i in range(50)]
+    for tag in tags:
+        scheduler.async_add(tag)
+    await asyncio.sleep(INTERVAL * 3)
+    # одна запись в куче на тег, без накопления
+    assert len(scheduler._heap) == len(tags)
+    scheduler.async_shutdown()
+    assert all(tag.keepalives for tag in tags)
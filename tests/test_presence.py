@@ -0,0 +1,129 @@
+import asyncio
+import time
+
+import pytest
+
+from custom_components.itag_bt import presence
+from custom_components.itag_bt.presence import PresenceEngine
+from custom_components.itag_bt.signals import SIGNAL_CONN, SIGNAL_PRESENCE, TagSignals
+
+AWAY = 0.2
+
+
+@pytest.fixture(autouse=True)
+def _fast_clock(monkeypatch):
+    monkeypatch.setattr(presence, "PRESENCE_RESOLUTION", 0.02)
+    monkeypatch.setattr(presence, "HOME_CONFIRM_WINDOW", 0.3)
+    monkeypatch.setattr(presence, "AWAY_RECHECK", 0.05)
+
+
+class _Tag:
+    """Клиент в объёме PresenceEngine. heard — история bluetooth-менеджера HA (last_heard),
+    last_seen — только ADV, дошедшие до колбэка."""
+
+    def __init__(self, mac="AA:BB:CC:00:00:01"):
+        self.mac = mac
+        self.consider_away = AWAY
+        self.last_seen = 0.0
+        self.heard = 0.0
+        self.is_connected = False
+        self.presence = None
+        self.presence_home = None
+
+    @property
+    def last_heard(self):
+        return max(self.last_seen, self.heard)
+
+
+def _engine(hass):
+    signals = TagSignals(hass)
+    engine = PresenceEngine(hass, signals)
+    return engine, signals
+
+
+def _transitions(signals, mac):
+    seen = []
+    signals.async_subscribe(mac, SIGNAL_PRESENCE, seen.append)
+    return seen
+
+
+async def _hear_for(tag, seconds, step=0.03):
+    end = time.monotonic() + seconds
+    while time.monotonic() < end:
+        tag.heard = time.monotonic()
+        await asyncio.sleep(step)
+
+
+async def test_silent_tag_goes_away(hass):
+    engine, signals = _engine(hass)
+    tag = _Tag()
+    seen = _transitions(signals, tag.mac)
+    engine.async_add(tag)
+    await asyncio.sleep(AWAY * 2)
+    assert tag.presence_home is False
+    assert seen == [False]
+    engine.async_shutdown()
+
+
+async def test_tag_heard_only_in_history_stays_home(hass):
+    # ADV с тем же содержимым колбэк не вызывают — last_seen не меняется
+    engine, signals = _engine(hass)
+    tag = _Tag()
+    seen = _transitions(signals, tag.mac)
+    engine.async_add(tag)
+    await _hear_for(tag, AWAY * 4)
+    assert tag.presence_home is True
+    assert False not in seen
+    engine.async_shutdown()
+
+
+async def test_away_tag_returns_without_callbacks(hass):
+    engine, signals = _engine(hass)
+    tag = _Tag()
+    seen = _transitions(signals, tag.mac)
+    engine.async_add(tag)
+    await asyncio.sleep(AWAY * 2)
+    assert tag.presence_home is False
+    await _hear_for(tag, 0.25)
+    assert tag.presence_home is True
+    assert seen == [False, True]
+    engine.async_shutdown()
+
+
+async def test_single_advert_does_not_confirm_home(hass):
+    engine, _signals = _engine(hass)
+    tag = _Tag()
+    engine.async_add(tag)
+    await asyncio.sleep(AWAY * 2)
+    now = time.monotonic()
+    engine.async_advert(tag, now)
+    # тот же ADV повторно (колбэк и перепроверка истории) не считается вторым
+    engine.async_advert(tag, now)
+    assert tag.presence_home is False
+    engine.async_advert(tag, now + 0.01)
+    assert tag.presence_home is True
+    engine.async_shutdown()
+
+
+async def test_connection_marks_home_immediately(hass):
+    engine, signals = _engine(hass)
+    tag = _Tag()
+    engine.async_add(tag)
+    await asyncio.sleep(AWAY * 2)
+    assert tag.presence_home is False
+    tag.is_connected = True
+    signals.async_send(tag.mac, SIGNAL_CONN)
+    assert tag.presence_home is True
+    engine.async_shutdown()
+
+
+async def test_removed_tag_is_not_updated(hass):
+    engine, signals = _engine(hass)
+    tag = _Tag()
+    seen = _transitions(signals, tag.mac)
+    engine.async_add(tag)
+    engine.async_remove(tag.mac)
+    await asyncio.sleep(AWAY * 2)
+    assert seen == []
+    assert tag.presence is None
+    engine.async_shutdown()
@@ -0,0 +1,49 @@
+from custom_components.itag_bt.rssi import RssiTracker
+
+
+def test_first_sample_is_published():
+    tracker = RssiTracker()
+    assert tracker.value is None
+    assert tracker.add(-70)
+    assert tracker.value == -70
+
+
+def test_deadband_suppresses_small_changes():
+    tracker = RssiTracker(alpha=1.0, deadband=3)
+    tracker.add(-70)
+    assert not tracker.add(-72)
+    assert tracker.value == -70
+    assert tracker.add(-74)
+    assert tracker.value == -74
+
+
+def test_ewma_smooths_single_outlier():
+    tracker = RssiTracker(alpha=0.3, deadband=2)
+    tracker.add(-60)
+    # одиночный всплеск до -90 сдвигает EWMA на 9 dBm, а не на 30
+    assert tracker.add(-90)
+    assert tracker.value == -69
+    assert tracker.last == -90
+
+
+def test_ring_buffer_keeps_last_window_in_order():
+    tracker = RssiTracker(size=4)
+    for rssi in (-50, -51, -52, -53, -54, -55):
+        tracker.add(rssi)
+    assert tracker.samples() == [-52, -53, -54, -55]
+
+
+def test_out_of_range_values_are_clamped():
+    tracker = RssiTracker()
+    tracker.add(-200)
+    assert tracker.last == -128
+
+
+def test_seed_only_before_first_sample():
+    tracker = RssiTracker()
+    tracker.seed(-65)
+    assert tracker.value == -65
+    assert tracker.samples() == []
+    tracker.add(-80)
+    tracker.seed(-40)
+    assert tracker.value != -40